@@ -15,7 +15,9 @@ def main():
             "available on your PYTHONPATH environment variable? Did you "
             "forget to activate a virtual environment?"
         ) from exc
-    execute_from_command_line(sys.argv[:2])
+    # only the command and the allowed options are passed
+    allowed_options = ["--daemon"]
+    execute_from_command_line(sys.argv[:2] + [i for i in sys.argv[2:] if i in allowed_options])
 
 
 if __name__ == '__main__':
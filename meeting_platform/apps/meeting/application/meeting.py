@@ -5,53 +5,116 @@
 # @FileName: meeting.py
 # @Software: PyCharm
 import datetime
+import json
 import logging
 import secrets
 import traceback
+import uuid
 
 from django.conf import settings
+from django.db import transaction
 from django.forms import model_to_dict
 
-from meeting_platform.utils.common import start_thread, get_cur_date
+from meeting_platform.utils.common import get_cur_date
+from meeting_platform.utils.executor import BoundedExecutor
 from meeting_platform.utils.operation_log import set_log_thread_local, log_key
 from meeting_platform.utils.ret_api import MyValidationError
 from meeting_platform.utils.ret_code import RetCode
+from meeting.domain.primitive.host_occupancy import HostOccupancy, SLOT_MINUTES, get_free_ranges
+from meeting.domain.primitive.operation_status import OperationStatus
 from meeting.infrastructure.adapter.meeting_adapter_impl.meeting_adapter_impl import MeetingAdapterImpl
-from meeting.infrastructure.dao import meeting_dao
-from meeting.infrastructure.adapter.message_adapter_impl.email_adapter_impl import CreateMessageEmailAdapterImpl, \
-    DeleteMessageEmailAdapterImpl, UpdateMessageEmailAdapterImpl
-from meeting.infrastructure.adapter.message_adapter_impl.kafka_adapter_impl import CreateMessageKafKaAdapterImpl, \
-    DeleteMessageKafKaAdapterImpl, UpdateMessageKafKaAdapterImpl
+from meeting.infrastructure.dao import meeting_dao, meeting_occupancy_dao, meeting_operation_dao
+from meeting.application.meeting_outbox import MeetingOutboxApp
 
 logger = logging.getLogger("log")
 
 
 class MeetingApp:
     meeting_dao = meeting_dao.MeetingDao
+    meeting_occupancy_dao = meeting_occupancy_dao.MeetingOccupancyDao
+    meeting_operation_dao = meeting_operation_dao.MeetingOperationDao
     meeting_adapter_impl = MeetingAdapterImpl()
-    create_message_adapter_impl = [CreateMessageEmailAdapterImpl, CreateMessageKafKaAdapterImpl]
-    update_message_adapter_impl = [UpdateMessageEmailAdapterImpl, UpdateMessageKafKaAdapterImpl]
-    delete_message_adapter_impl = [DeleteMessageEmailAdapterImpl, DeleteMessageKafKaAdapterImpl]
+    meeting_outbox_app = MeetingOutboxApp()
+    message_executor = BoundedExecutor("message", settings.MESSAGE_EXECUTOR_WORKERS,
+                                       settings.MESSAGE_EXECUTOR_QUEUE_SIZE,
+                                       settings.MESSAGE_EXECUTOR_SUBMIT_TIMEOUT,
+                                       settings.MESSAGE_EXECUTOR_DRAIN_TIMEOUT)
+    # the operation is left to the command execute_meeting_operation when the queue is full
+    operation_executor = BoundedExecutor("operation", settings.OPERATION_EXECUTOR_WORKERS,
+                                         settings.OPERATION_EXECUTOR_QUEUE_SIZE,
+                                         settings.OPERATION_EXECUTOR_SUBMIT_TIMEOUT,
+                                         settings.OPERATION_EXECUTOR_DRAIN_TIMEOUT, caller_runs=False)
+    # the interval between two meetings of the same host, and the unit is minute
+    host_buffer_minutes = 30
+
+    def get_host_occupancy(self, community, platform, date, meeting_id=None):
+        """get the occupancy of hosts in the date, exclude the meeting which is updating"""
+        meetings = self.meeting_dao.get_meeting_time_by_date(community, platform, date, meeting_id)
+        return HostOccupancy.build(meetings)
+
+    def _compute_bitmaps(self, community, platform, dates):
+        """date -> host_id -> bitmap, which is computed from the meetings"""
+        meetings = dict()
+        for date, host_id, start, end in self.meeting_dao.get_meeting_time_by_dates(community, platform, dates):
+            meetings.setdefault(date, list()).append((host_id, start, end))
+        return {date: HostOccupancy.build(meetings.get(date, list())).to_bitmaps() for date in dates}
+
+    def refresh_occupancy(self, community, platform, *dates):
+        """recompute the occupancy bitmap of hosts in the dates under the lock of the occupancy rows, and return the
+        bitmaps. it is called in the transaction which changes the meetings, so that the concurrent changes of the
+        same date are serialized and the bitmap is committed with the meetings"""
+        dates = sorted(set(dates))
+        try:
+            with transaction.atomic():
+                # the rows are locked in order of date to avoid the deadlock
+                occupancies = [self.meeting_occupancy_dao.get_for_update(community, platform, date) for date in dates]
+                bitmaps = self._compute_bitmaps(community, platform, dates)
+                for occupancy in occupancies:
+                    self.meeting_occupancy_dao.update_by_id(occupancy.id, json.dumps(bitmaps[occupancy.date]))
+            return bitmaps
+        except Exception as e:
+            logger.error("[MeetingApp/refresh_occupancy] {}/{}/{}: err:{}, and traceback:{}"
+                         .format(community, platform, dates, e, traceback.format_exc()))
+            return dict()
+
+    def _get_occupancy_bitmaps(self, community, platform, dates):
+        """date -> host_id -> bitmap, and the dates which have not been computed are computed from the meetings"""
+        bitmaps = {date: json.loads(occupancy) for date, occupancy in
+                   self.meeting_occupancy_dao.get_by_dates(community, platform, dates)}
+        missing_dates = [date for date in dates if date not in bitmaps]
+        if not missing_dates:
+            return bitmaps
+        bitmaps.update(self.refresh_occupancy(community, platform, *missing_dates))
+        # the dates failed to refresh are computed without saving
+        failed_dates = [date for date in missing_dates if date not in bitmaps]
+        if failed_dates:
+            bitmaps.update(self._compute_bitmaps(community, platform, failed_dates))
+        return bitmaps
+
+    def get_free_slots(self, community, platform, start_date, end_date):
+        """get the free ranges of every host in [start_date, end_date], the meeting could be booked in the ranges"""
+        begin = datetime.datetime.strptime(start_date, "%Y-%m-%d")
+        days = (datetime.datetime.strptime(end_date, "%Y-%m-%d") - begin).days + 1
+        dates = [(begin + datetime.timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+        bitmaps = self._get_occupancy_bitmaps(community, platform, dates)
+        host_list = [key["HOST"] for key in settings.COMMUNITY_HOST[community][platform]]
+        buffer_slots = self.host_buffer_minutes // SLOT_MINUTES
+        now = get_cur_date()
+        free_slots = dict()
+        for date in dates:
+            # the meeting must be started after now
+            now_minutes = now.hour * 60 + now.minute + 1 if date == now.strftime("%Y-%m-%d") else 0
+            free_slots[date] = {host_id: get_free_ranges(bitmaps[date].get(host_id, 0), buffer_slots, now_minutes)
+                                for host_id in host_list}
+        return free_slots
 
     def _get_and_check_conflict_meetings_by_date(self, meeting, meeting_id=None):
         """check the conflict the meeting, if not conflict and return meeting"""
-        community = meeting["community"]
-        platform = meeting["platform"]
-        date = meeting["date"]
-        start = meeting["start"]
-        end = meeting["end"]
-        start_search = datetime.datetime.strftime(
-            (datetime.datetime.strptime(start, '%H:%M') - datetime.timedelta(minutes=30)),
-            '%H:%M')
-        end_search = datetime.datetime.strftime(
-            (datetime.datetime.strptime(end, '%H:%M') + datetime.timedelta(minutes=30)),
-            '%H:%M')
-        meetings = self.meeting_dao.get_conflict_meeting(community, platform, date,
-                                                         start_search, end_search, meeting_id).values()
-        unavailable_host_ids = [meeting['host_id'] for meeting in meetings]
+        occupancy = self.get_host_occupancy(meeting["community"], meeting["platform"], meeting["date"], meeting_id)
         host_info = settings.COMMUNITY_HOST[meeting["community"]][meeting["platform"]]
         host_list = [key["HOST"] for key in host_info]
-        available_host_id = list(set(host_list) - set(unavailable_host_ids))
+        available_host_id = occupancy.get_free_hosts(host_list, meeting["start"], meeting["end"],
+                                                     self.host_buffer_minutes)
         if len(available_host_id) == 0:
             logger.info('[MeetingApp/_get_and_check_conflict_meetings_by_date] '
                         '{}/{}: no available host'.format(meeting["community"], meeting["platform"]))
@@ -59,43 +122,57 @@ class MeetingApp:
         return available_host_id
 
     def _is_in_prepare_meeting_duration_before_meeting(self, meeting):
-        start_date_str = "{} {}".format(meeting["date"], meeting["start"])
-        start_date = datetime.datetime.strptime(start_date_str, "%Y-%m-%d %H:%M")
+        start_date = meeting.get("start_at")
+        if start_date is None:
+            start_date_str = "{} {}".format(meeting["date"], meeting["start"])
+            start_date = datetime.datetime.strptime(start_date_str, "%Y-%m-%d %H:%M")
         if int((start_date - get_cur_date()).total_seconds()) < 60 * 60:
             raise MyValidationError(RetCode.STATUS_MEETING_CANNOT_BE_OPERATE)
 
-    def _send_message(self, meeting, message_handler):
-        """send the message"""
-        for handler in message_handler:
-            try:
-                handler().send_message(meeting)
-            except Exception as e:
-                logger.error("[MeetingApp/_send_message] err:{}, and traceback:{}".format(e, traceback.format_exc()))
+    def _send_message(self, keys):
+        """send the outboxes after the transaction committed, and the failed ones are retried by the dispatcher"""
+        transaction.on_commit(lambda: self.message_executor.submit(self.meeting_outbox_app.dispatch_by_keys, keys))
 
-    def create(self, meeting):
-        """create meeting"""
-        # check meeting-conflict
+    def _check_create(self, meeting):
+        """check meeting-conflict and choose the host"""
         available_host_id = self._get_and_check_conflict_meetings_by_date(meeting)
         meeting["host_id"] = secrets.choice(available_host_id)
+        self.meeting_dao.fill_datetime(meeting)
+
+    def create(self, meeting):
+        """create meeting"""
+        self._check_create(meeting)
         # create meeting
         meeting["mid"], meeting["m_mid"], meeting["join_url"] = self.meeting_adapter_impl.create(meeting["host_id"],
                                                                                                  meeting)
-        # create in database
-        result = self.meeting_dao.create(**meeting)
-        meeting["id"] = result.id
+        # create in database, and write the message into outbox in the same transaction
+        with transaction.atomic():
+            result = self.meeting_dao.create(**meeting)
+            meeting["id"], meeting["sequence"] = result.id, result.sequence
+            keys = self.meeting_outbox_app.add(meeting, "create")
+            self.refresh_occupancy(meeting["community"], meeting["platform"], meeting["date"])
         # send message
-        start_thread(self._send_message, (meeting, self.create_message_adapter_impl))
+        self._send_message(keys)
         logger.info('[MeetingApp/create] {}/{}: create meeting which mid is {} and id is {}.'.
                     format(meeting["community"], meeting["platform"], meeting["mid"], result))
         return meeting["id"]
 
-    def update(self, request, meeting_id, meeting_data):
-        """update meeting"""
+    def _check_no_operation(self, meeting_id):
+        """the meeting is changed by one operation at a time, so that the provider receives the changes in order"""
+        if self.meeting_operation_dao.is_unfinished_by_meeting_id(meeting_id):
+            logger.info('[MeetingApp/_check_no_operation] the meeting {} has the unfinished operation'
+                        .format(meeting_id))
+            raise MyValidationError(RetCode.STATUS_MEETING_IN_OPERATION)
+
+    def _check_update(self, request, meeting_id, meeting_data):
+        """check and return the old meeting and the new meeting"""
         meeting = self.meeting_dao.get_by_id(meeting_id)
         if not meeting:
             logger.error('[MeetingApp/update]Invalid meeting id:{}'.format(meeting_id))
             raise MyValidationError(RetCode.INFORMATION_CHANGE_ERROR)
-        meeting = model_to_dict(meeting)
+        self._check_no_operation(meeting_id)
+        old_meeting = model_to_dict(meeting)
+        meeting = dict(old_meeting)
         etherpad = meeting_data.get("etherpad")
         if etherpad and not etherpad.startswith(settings.COMMUNITY_ETHERPAD[meeting["community"]]):
             logger.error("invalid etherpad:{}".format(etherpad))
@@ -103,41 +180,206 @@ class MeetingApp:
         set_log_thread_local(request, log_key, [meeting["community"], meeting["topic"], meeting_id])
         meeting.update(meeting_data)
         meeting.update({"sequence": meeting["sequence"] + 1})
+        self.meeting_dao.fill_datetime(meeting)
         # check meeting-conflict
         self._get_and_check_conflict_meetings_by_date(meeting, meeting_id)
         # check not update in the before in start date
         self._is_in_prepare_meeting_duration_before_meeting(meeting)
+        return old_meeting, meeting
+
+    def update(self, request, meeting_id, meeting_data):
+        """update meeting"""
+        old_meeting, meeting = self._check_update(request, meeting_id, meeting_data)
         # update meeting
         self.meeting_adapter_impl.update(meeting)
-        # update in database
-        result = self.meeting_dao.update_by_id(meeting_id, **meeting)
+        # update in database, and write the message into outbox in the same transaction
+        with transaction.atomic():
+            result = self.meeting_dao.update_by_id(meeting_id, **meeting)
+            keys = self.meeting_outbox_app.add(meeting, "update")
+            self.refresh_occupancy(meeting["community"], meeting["platform"], old_meeting["date"], meeting["date"])
         # send message
-        start_thread(self._send_message, (meeting, self.update_message_adapter_impl))
+        self._send_message(keys)
         logger.info('[MeetingApp/update] {}/{}: update meeting which mid is {} and id is {}.'
                     .format(meeting["community"], meeting["platform"], meeting["mid"], meeting["id"]))
         return result
 
-    def delete(self, request, meeting_id):
-        """delete meeting"""
+    def _check_delete(self, request, meeting_id):
+        """check and return the meeting which will be deleted"""
         meeting = self.meeting_dao.get_by_id(meeting_id)
         if not meeting:
             logger.error('[MeetingApp/delete]Invalid meeting id:{}'.format(meeting_id))
             raise MyValidationError(RetCode.INFORMATION_CHANGE_ERROR)
+        self._check_no_operation(meeting_id)
         meeting = model_to_dict(meeting)
         set_log_thread_local(request, log_key, [meeting["community"], meeting["topic"], meeting_id])
         meeting.update({"sequence": meeting["sequence"] + 1})
         # check not delete in the before in start date
         self._is_in_prepare_meeting_duration_before_meeting(meeting)
-        # delete meeting
-        self.meeting_adapter_impl.delete(meeting)
-        # update is_delete=1 in database
-        result = self.meeting_dao.delete_by_id(meeting_id)
+        return meeting
+
+    def _save_delete(self, meeting_id, meeting):
+        # update is_delete=1 in database, and write the message into outbox in the same transaction
+        with transaction.atomic():
+            result = self.meeting_dao.delete_by_id(meeting_id)
+            keys = self.meeting_outbox_app.add(meeting, "delete")
+            self.refresh_occupancy(meeting["community"], meeting["platform"], meeting["date"])
         # send message
-        start_thread(self._send_message, (meeting, self.delete_message_adapter_impl))
+        self._send_message(keys)
         logger.info('[MeetingApp/delete] {}/{}: delete meeting which mid is {} and id is {}.'
                     .format(meeting["community"], meeting["platform"], meeting["mid"], meeting_id))
         return result
 
+    def delete(self, request, meeting_id):
+        """delete meeting"""
+        meeting = self._check_delete(request, meeting_id)
+        # delete meeting
+        self.meeting_adapter_impl.delete(meeting)
+        return self._save_delete(meeting_id, meeting)
+
+    def _add_operation(self, action, meeting_id, params):
+        """save the operation in the transaction, and execute it by the worker after committed"""
+        operation_id = uuid.uuid4().hex
+        self.meeting_operation_dao.create(operation_id=operation_id, action=action, meeting_id=meeting_id,
+                                          params=self.meeting_dao.dumps(params))
+        transaction.on_commit(lambda: self.operation_executor.submit(self.execute_operation, operation_id))
+        return operation_id
+
+    def create_async(self, meeting):
+        """reserve the host by the pending meeting which mid is empty, and create meeting in the worker. the pending
+        meeting is not listed or handled as recording until it was created"""
+        self._check_create(meeting)
+        meeting["mid"] = ""
+        with transaction.atomic():
+            result = self.meeting_dao.create(is_pending=True, **meeting)
+            meeting["id"], meeting["sequence"] = result.id, result.sequence
+            operation_id = self._add_operation("create", meeting["id"], {"meeting": meeting})
+            self.refresh_occupancy(meeting["community"], meeting["platform"], meeting["date"])
+        logger.info('[MeetingApp/create_async] {}/{}: accept to create meeting which id is {} by operation {}.'
+                    .format(meeting["community"], meeting["platform"], meeting["id"], operation_id))
+        return {"operation_id": operation_id, "id": meeting["id"]}
+
+    def update_async(self, request, meeting_id, meeting_data):
+        """reserve the new time by updating the meeting in database, and update meeting in the worker"""
+        old_meeting, meeting = self._check_update(request, meeting_id, meeting_data)
+        with transaction.atomic():
+            self.meeting_dao.update_by_id(meeting_id, **meeting)
+            operation_id = self._add_operation("update", meeting_id, {"meeting": meeting, "old_meeting": old_meeting})
+            self.refresh_occupancy(meeting["community"], meeting["platform"], old_meeting["date"], meeting["date"])
+        logger.info('[MeetingApp/update_async] {}/{}: accept to update meeting which id is {} by operation {}.'
+                    .format(meeting["community"], meeting["platform"], meeting_id, operation_id))
+        return {"operation_id": operation_id, "id": meeting_id}
+
+    def delete_async(self, request, meeting_id):
+        """delete meeting in the worker"""
+        meeting = self._check_delete(request, meeting_id)
+        with transaction.atomic():
+            operation_id = self._add_operation("delete", meeting_id, {"meeting": meeting})
+        logger.info('[MeetingApp/delete_async] {}/{}: accept to delete meeting which id is {} by operation {}.'
+                    .format(meeting["community"], meeting["platform"], meeting_id, operation_id))
+        return {"operation_id": operation_id, "id": meeting_id}
+
+    def _execute_create(self, meeting_id, params):
+        meeting = params["meeting"]
+        meeting["mid"], meeting["m_mid"], meeting["join_url"] = self.meeting_adapter_impl.create(meeting["host_id"],
+                                                                                                 meeting)
+        with transaction.atomic():
+            self.meeting_dao.update_by_id(meeting_id, mid=meeting["mid"], m_mid=meeting["m_mid"],
+                                          join_url=meeting["join_url"], is_pending=False)
+            keys = self.meeting_outbox_app.add(meeting, "create")
+        self._send_message(keys)
+
+    def _execute_update(self, meeting_id, params):
+        meeting = params["meeting"]
+        self.meeting_adapter_impl.update(meeting)
+        with transaction.atomic():
+            keys = self.meeting_outbox_app.add(meeting, "update")
+        self._send_message(keys)
+
+    def _execute_delete(self, meeting_id, params):
+        meeting = params["meeting"]
+        self.meeting_adapter_impl.delete(meeting)
+        self._save_delete(meeting_id, meeting)
+
+    def _compensate(self, action, meeting_id, params):
+        """release the host reserved by the failed create, or restore the meeting before the failed update"""
+        meeting = params["meeting"]
+        if action == "create":
+            with transaction.atomic():
+                self.meeting_dao.delete_by_id(meeting_id)
+                self.refresh_occupancy(meeting["community"], meeting["platform"], meeting["date"])
+        elif action == "update":
+            old_meeting = params["old_meeting"]
+            with transaction.atomic():
+                # the meeting which was changed by the later operation is not overwritten by the old one
+                if not self.meeting_dao.update_by_id_and_sequence(meeting_id, meeting["sequence"], **old_meeting):
+                    logger.warning("[MeetingApp/_compensate] {}/{}: the meeting {} was changed after sequence {}, "
+                                   "and skip to restore it".format(meeting["community"], meeting["platform"],
+                                                                    meeting_id, meeting["sequence"]))
+                    return
+                self.refresh_occupancy(meeting["community"], meeting["platform"], old_meeting["date"],
+                                       meeting["date"])
+
+    def execute_operation(self, operation_id):
+        """call the provider for the pending operation, return whether the operation was executed by this worker"""
+        lease_until = get_cur_date() + datetime.timedelta(seconds=settings.MEETING_OPERATION_LEASE)
+        if not self.meeting_operation_dao.claim(operation_id, lease_until):
+            return False
+        operation = self.meeting_operation_dao.get_by_operation_id(operation_id)
+        params = self.meeting_dao.loads(operation.params)
+        execute_func = getattr(self, "_execute_{}".format(operation.action))
+        try:
+            execute_func(operation.meeting_id, params)
+            self.meeting_operation_dao.mark_success(operation_id)
+            logger.info("[MeetingApp/execute_operation] {}/{}: success".format(operation.action, operation_id))
+        except Exception as e:
+            logger.error("[MeetingApp/execute_operation] {}/{}: err:{}, and traceback:{}"
+                         .format(operation.action, operation_id, e, traceback.format_exc()))
+            self._compensate(operation.action, operation.meeting_id, params)
+            code = getattr(e, "detail_code", None)
+            self.meeting_operation_dao.mark_failed(operation_id, code if isinstance(code, int) else
+                                                   RetCode.INTERNAL_ERROR)
+        return True
+
+    def fail_expired_operation(self, operation):
+        """the operation was interrupted when calling the provider, and the result is unknown, so fail it"""
+        if not self.meeting_operation_dao.claim_expired(operation.operation_id, get_cur_date()):
+            return False
+        logger.error("[MeetingApp/fail_expired_operation] {}/{}: interrupted"
+                     .format(operation.action, operation.operation_id))
+        self._compensate(operation.action, operation.meeting_id, self.meeting_dao.loads(operation.params))
+        self.meeting_operation_dao.mark_failed(operation.operation_id, RetCode.INTERNAL_ERROR)
+        return True
+
+    def execute_pending_operations(self, batch_size):
+        """execute the operations which were not executed by the request workers, return the count of them"""
+        operations = list(self.meeting_operation_dao.get_pending_and_expired(get_cur_date(), batch_size))
+        for operation in operations:
+            try:
+                if operation.status == OperationStatus.PENDING.value:
+                    self.execute_operation(operation.operation_id)
+                else:
+                    self.fail_expired_operation(operation)
+            except Exception as e:
+                logger.error("[MeetingApp/execute_pending_operations] {}: err:{}, and traceback:{}"
+                             .format(operation.operation_id, e, traceback.format_exc()))
+        return len(operations)
+
+    def get_operation(self, operation_id):
+        """get the status of the asynchronous operation"""
+        operation = self.meeting_operation_dao.get_by_operation_id(operation_id)
+        if not operation:
+            logger.error('[MeetingApp/get_operation]Invalid operation id:{}'.format(operation_id))
+            raise MyValidationError(RetCode.STATUS_PARAMETER_ERROR)
+        return {
+            "operation_id": operation.operation_id,
+            "action": operation.action,
+            "id": operation.meeting_id,
+            "status": OperationStatus(operation.status).name.lower(),
+            "code": operation.code,
+            "msg": RetCode.get_name_by_code(operation.code) if operation.code is not None else None,
+            "en_msg": RetCode.get_name_by_code(operation.code, True) if operation.code is not None else None,
+        }
+
     def get_participants(self, meeting_id):
         """get participants"""
         meeting = self.meeting_dao.get_by_id(meeting_id)
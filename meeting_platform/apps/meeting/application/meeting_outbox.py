@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/13 15:02
+# @Author  : Tom_zc
+# @FileName: meeting_outbox.py
+# @Software: PyCharm
+import datetime
+import logging
+import secrets
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from kafka.future import Future as KafkaFuture
+
+from meeting_platform.utils.common import get_cur_date
+from meeting.infrastructure.dao.meeting_dao import MeetingDao
+from meeting.infrastructure.dao.meeting_outbox_dao import MeetingOutboxDao
+from meeting.infrastructure.adapter.message_adapter_impl.email_adapter_impl import CreateMessageEmailAdapterImpl, \
+    DeleteMessageEmailAdapterImpl, UpdateMessageEmailAdapterImpl
+from meeting.infrastructure.adapter.message_adapter_impl.kafka_adapter_impl import CreateMessageKafKaAdapterImpl, \
+    DeleteMessageKafKaAdapterImpl, UpdateMessageKafKaAdapterImpl
+
+logger = logging.getLogger("log")
+
+
+class MeetingOutboxApp:
+    """the notifications are written into the outbox with the change of meeting, and sent at least once:
+        1.the outbox is claimed by the attempts before sending, so that one notification is sent by one dispatcher
+        2.the failed notification is retried with the exponential backoff until the max attempts
+        3.the kafka message is keyed by the idempotency key(mid-sequence), so that the consumer could drop duplicates
+    """
+    meeting_dao = MeetingDao
+    meeting_outbox_dao = MeetingOutboxDao
+    channel_adapter_impl = {
+        "email": {
+            "create": CreateMessageEmailAdapterImpl,
+            "update": UpdateMessageEmailAdapterImpl,
+            "delete": DeleteMessageEmailAdapterImpl,
+        },
+        "kafka": {
+            "create": CreateMessageKafKaAdapterImpl,
+            "update": UpdateMessageKafKaAdapterImpl,
+            "delete": DeleteMessageKafKaAdapterImpl,
+        },
+    }
+
+    def __init__(self):
+        self._executors = dict()
+
+    @staticmethod
+    def get_idempotency_key(mid, sequence, channel):
+        return "{}-{}-{}".format(mid, sequence, channel)
+
+    def add(self, meeting, action):
+        """it must be called in the transaction which changes the meeting, and return the idempotency keys"""
+        now = get_cur_date()
+        payload = self.meeting_dao.dumps(meeting)
+        outboxes = [{
+            "idempotency_key": self.get_idempotency_key(meeting["mid"], meeting["sequence"], channel),
+            "community": meeting["community"],
+            "mid": meeting["mid"],
+            "sequence": meeting["sequence"],
+            "action": action,
+            "channel": channel,
+            "payload": payload,
+            "next_retry_at": now,
+        } for channel in self.channel_adapter_impl.keys()]
+        self.meeting_outbox_dao.bulk_create_ignore_conflicts(outboxes)
+        return [outbox["idempotency_key"] for outbox in outboxes]
+
+    @staticmethod
+    def get_backoff_seconds(attempts):
+        """the exponential backoff with 10% jitter"""
+        backoff = min(settings.MEETING_OUTBOX_BACKOFF_BASE * 2 ** max(attempts - 1, 0),
+                      settings.MEETING_OUTBOX_BACKOFF_MAX)
+        return backoff + secrets.randbelow(backoff // 10 + 1)
+
+    def _get_executor(self, channel):
+        executor = self._executors.get(channel)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=settings.MEETING_OUTBOX_CHANNEL_WORKERS.get(channel, 1),
+                                          thread_name_prefix="outbox-{}".format(channel))
+            self._executors[channel] = executor
+        return executor
+
+    def _send(self, outbox):
+        meeting = self.meeting_dao.loads(outbox.payload)
+        adapter = self.channel_adapter_impl[outbox.channel][outbox.action]
+        return adapter().send_message(meeting)
+
+    def _submit(self, outbox, is_parallel):
+        if is_parallel:
+            return self._get_executor(outbox.channel).submit(self._send, outbox)
+        future = Future()
+        try:
+            future.set_result(self._send(outbox))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _retry_later(self, outbox, e):
+        last_error = "{}: {}".format(type(e).__name__, e)
+        if outbox.attempts >= settings.MEETING_OUTBOX_MAX_ATTEMPTS:
+            logger.error("[MeetingOutboxApp/_retry_later] {}: failed after {} attempts, err:{}"
+                         .format(outbox.idempotency_key, outbox.attempts, last_error))
+            self.meeting_outbox_dao.mark_failed(outbox.id, last_error)
+            return
+        backoff = self.get_backoff_seconds(outbox.attempts)
+        logger.info("[MeetingOutboxApp/_retry_later] {}: retry after {}s, err:{}"
+                    .format(outbox.idempotency_key, backoff, last_error))
+        self.meeting_outbox_dao.mark_retry(outbox.id, get_cur_date() + datetime.timedelta(seconds=backoff),
+                                           last_error)
+
+    def _dispatch(self, outboxes, is_parallel):
+        """claim and send the outboxes, return the count of the claimed outboxes"""
+        lease_until = get_cur_date() + datetime.timedelta(seconds=settings.MEETING_OUTBOX_LEASE)
+        claimed = list()
+        for outbox in outboxes:
+            if self.meeting_outbox_dao.claim(outbox, lease_until):
+                outbox.attempts += 1
+                claimed.append(outbox)
+        # the messages of kafka are sent in batch by the producer, and wait for the results after all sent
+        futures = [(outbox, self._submit(outbox, is_parallel)) for outbox in claimed]
+        for outbox, future in futures:
+            try:
+                result = future.result()
+                if isinstance(result, KafkaFuture):
+                    result.get(timeout=settings.MEETING_OUTBOX_SEND_TIMEOUT)
+                self.meeting_outbox_dao.mark_sent(outbox.id)
+            except Exception as e:
+                logger.error("[MeetingOutboxApp/_dispatch] {}: err:{}, and traceback:{}"
+                             .format(outbox.idempotency_key, e, traceback.format_exc()))
+                self._retry_later(outbox, e)
+        return len(claimed)
+
+    def dispatch_by_keys(self, keys):
+        """send the outboxes right after the transaction committed, the failed ones are left to the dispatcher"""
+        outboxes = list(self.meeting_outbox_dao.get_due_by_keys(get_cur_date(), keys))
+        return self._dispatch(outboxes, is_parallel=False)
+
+    def dispatch_batch(self, batch_size):
+        """send the due outboxes in batch by the executor of channels, return the count of the fetched outboxes"""
+        outboxes = list(self.meeting_outbox_dao.get_due(get_cur_date(), batch_size))
+        self._dispatch(outboxes, is_parallel=True)
+        return len(outboxes)
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
+        self._executors = dict()
@@ -9,20 +9,22 @@ from rest_framework.filters import SearchFilter
 from rest_framework.generics import CreateAPIView, DestroyAPIView, GenericAPIView, ListAPIView, RetrieveAPIView
 from rest_framework.permissions import IsAuthenticated
 
-from meeting_platform.utils.customized.my_pagination import MyPagination
+from meeting_platform.utils.customized.my_pagination import MyPagination, MyCursorPagination
 from meeting_platform.utils.customized.my_serializers import MySerializerParse, EmptySerializers
-from meeting_platform.utils.ret_api import ret_json, capture_my_validation_exception, MyValidationError
-from meeting_platform.utils.customized.my_view import MyRetrieveModelMixin, MyUpdateAPIView, MyListModelMixin
+from meeting_platform.utils.ret_api import ret_json, ret_accepted_json, capture_my_validation_exception, \
+    MyValidationError
+from meeting_platform.utils.customized.my_view import MyRetrieveModelMixin, MyUpdateAPIView, MyListModelMixin, \
+    MyAsyncMixin
 from meeting_platform.utils.operation_log import OperationLogModule, OperationLogDesc, OperationLogType, \
     logger_wrapper, set_log_thread_local, log_key
 
 from meeting.application.meeting import MeetingApp
 from meeting.controller.serializers.meeting_serializers import MeetingSerializer, \
-    SingleMeetingSerializer
+    SingleMeetingSerializer, MeetingFreeSlotsSerializer
 from meeting_platform.utils.ret_code import RetCode
 
 
-class MeetingView(MySerializerParse, MyListModelMixin, ListAPIView, CreateAPIView):
+class MeetingView(MySerializerParse, MyAsyncMixin, MyListModelMixin, ListAPIView, CreateAPIView):
     """create or list meeting"""
     serializer_class = MeetingSerializer
     authentication_classes = (BasicAuthentication,)
@@ -31,10 +33,25 @@ class MeetingView(MySerializerParse, MyListModelMixin, ListAPIView, CreateAPIVie
     filter_backends = [SearchFilter]
     search_fields = ['community', "mid", "id"]
     pagination_class = MyPagination
+    cursor_pagination_class = MyCursorPagination
     app_class = MeetingApp()
     order_by = ["date", "create_time", "update_time"]
     order_type = ["asc", "desc"]
 
+    @property
+    def paginator(self):
+        """use the keyset pagination when the cursor is in the params"""
+        if not hasattr(self, '_paginator'):
+            if self.is_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def is_cursor_pagination(self):
+        return self.request is not None and \
+            self.cursor_pagination_class.cursor_query_param in self.request.query_params
+
     @capture_my_validation_exception
     @logger_wrapper(OperationLogModule.OP_MODULE_MEETING, OperationLogType.OP_TYPE_CREATE,
                     OperationLogDesc.OP_DESC_MEETING_CREATE_CODE)
@@ -42,6 +59,8 @@ class MeetingView(MySerializerParse, MyListModelMixin, ListAPIView, CreateAPIVie
         """create meeting api"""
         set_log_thread_local(request, log_key, [request.data.get('community'), request.data.get('topic')])
         meeting = self.get_my_serializer_data(request)
+        if self.is_async(request):
+            return ret_accepted_json(data=self.app_class.create_async(meeting))
         data = self.app_class.create(meeting)
         return ret_json(data=data)
 
@@ -52,6 +71,8 @@ class MeetingView(MySerializerParse, MyListModelMixin, ListAPIView, CreateAPIVie
             raise MyValidationError(RetCode.STATUS_PARAMETER_ERROR)
         if not order_by:
             order_by = "date"
+        if order_by != "date" and self.is_cursor_pagination():
+            raise MyValidationError(RetCode.STATUS_PARAMETER_ERROR)
         order_type = self.request.query_params.get("order_type")
         if order_type and order_type not in self.order_type:
             raise MyValidationError(RetCode.STATUS_PARAMETER_ERROR)
@@ -62,7 +83,8 @@ class MeetingView(MySerializerParse, MyListModelMixin, ListAPIView, CreateAPIVie
         return self.queryset.order_by(order_by, 'start')
 
 
-class SingleMeetingView(MySerializerParse, MyRetrieveModelMixin, MyUpdateAPIView, RetrieveAPIView, DestroyAPIView):
+class SingleMeetingView(MySerializerParse, MyAsyncMixin, MyRetrieveModelMixin, MyUpdateAPIView, RetrieveAPIView,
+                        DestroyAPIView):
     """get or update or delete meeting"""
     lookup_field = "id"
     serializer_class = SingleMeetingSerializer
@@ -79,6 +101,8 @@ class SingleMeetingView(MySerializerParse, MyRetrieveModelMixin, MyUpdateAPIView
         set_log_thread_local(request, log_key, [request.data.get('community'),
                                                 request.data.get('topic'), kwargs.get('id')])
         meeting = self.get_my_serializer_data(request)
+        if self.is_async(request):
+            return ret_accepted_json(data=self.app_class.update_async(request, kwargs.get('id'), meeting))
         data = self.app_class.update(request, kwargs.get('id'), meeting)
         return ret_json(data=data)
 
@@ -88,6 +112,8 @@ class SingleMeetingView(MySerializerParse, MyRetrieveModelMixin, MyUpdateAPIView
     def destroy(self, request, *args, **kwargs):
         """delete meeting by mid"""
         set_log_thread_local(request, log_key, ["", "", kwargs.get('id')])
+        if self.is_async(request):
+            return ret_accepted_json(data=self.app_class.delete_async(request, kwargs.get('id')))
         data = self.app_class.delete(request, kwargs.get('id'))
         return ret_json(data=data)
 
@@ -102,3 +128,35 @@ class MeetingParticipantsView(RetrieveAPIView, GenericAPIView):
     def retrieve(self, *args, **kwargs):
         data = self.app_class.get_participants(kwargs.get('id'))
         return ret_json(data=data)
+
+
+class MeetingFreeSlotsView(GenericAPIView):
+    """get the free slots of hosts"""
+    serializer_class = MeetingFreeSlotsSerializer
+    authentication_classes = (BasicAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    app_class = MeetingApp()
+
+    @capture_my_validation_exception
+    def get(self, request, *args, **kwargs):
+        """get the free ranges of every host by community, platform, start_date and end_date"""
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        data = self.app_class.get_free_slots(params["community"], params["platform"],
+                                             params["start_date"], params["end_date"])
+        return ret_json(data=data)
+
+
+class MeetingOperationView(RetrieveAPIView, GenericAPIView):
+    """get the status of the asynchronous operation"""
+    lookup_field = "operation_id"
+    serializer_class = EmptySerializers
+    authentication_classes = (BasicAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    app_class = MeetingApp()
+
+    @capture_my_validation_exception
+    def retrieve(self, request, *args, **kwargs):
+        data = self.app_class.get_operation(kwargs.get('operation_id'))
+        return ret_json(data=data)
@@ -11,7 +11,7 @@ from datetime import datetime
 
 from django.conf import settings
 from rest_framework import serializers
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import ModelSerializer, Serializer
 
 from meeting_platform.utils.check_params import check_field, check_invalid_content, check_email_list, check_date, \
     check_time, check_link, check_duration
@@ -240,3 +240,49 @@ class SingleMeetingSerializer(ModelSerializer):
     def get_duration_time(self, obj):
         """get duration time"""
         return obj.start.split(':')[0] + ':00' + '-' + str(math.ceil(float(obj.end.replace(':', '.')))) + ':00'
+
+
+# noinspection PyAbstractClass
+class MeetingFreeSlotsSerializer(Serializer):
+    """MeetingFreeSlotsSerializer for the params of querying free slots"""
+    community = serializers.CharField(required=True)
+    platform = serializers.CharField(required=True)
+    start_date = serializers.CharField(required=True)
+    end_date = serializers.CharField(required=True)
+
+    def validate_community(self, value):
+        """check community"""
+        if value not in settings.COMMUNITY_SUPPORT:
+            logger.error("community {} is not exist in COMMUNITY_SUPPORT".format(value))
+            raise MyValidationError(RetCode.STATUS_PARAMETER_ERROR)
+        return value
+
+    def validate_start_date(self, value):
+        """check start_date"""
+        check_date(value)
+        return value
+
+    def validate_end_date(self, value):
+        """check end_date"""
+        check_date(value)
+        return value
+
+    def validate(self, attrs):
+        """the date range must be in the 60 days which could be booked"""
+        if attrs["platform"] not in settings.COMMUNITY_HOST[attrs["community"]].keys():
+            logger.error('platform {} is not exist in COMMUNITY_HOST.'.format(attrs["platform"]))
+            raise MyValidationError(RetCode.STATUS_PARAMETER_ERROR)
+        today = datetime.now().date()
+        start_date = datetime.strptime(attrs["start_date"], "%Y-%m-%d").date()
+        end_date = datetime.strptime(attrs["end_date"], "%Y-%m-%d").date()
+        if start_date < today:
+            logger.error('The start date {} should not be earlier than today'.format(attrs["start_date"]))
+            raise MyValidationError(RetCode.STATUS_START_GT_NOW)
+        if start_date > end_date:
+            logger.error('The start date {} should not be later than the end date {}'.
+                         format(attrs["start_date"], attrs["end_date"]))
+            raise MyValidationError(RetCode.STATUS_START_LT_END)
+        if (end_date - today).days >= 60:
+            logger.error('The end date {} is at most 60 days later than today'.format(attrs["end_date"]))
+            raise MyValidationError(RetCode.STATUS_START_LT_LIMIT)
+        return attrs
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/11 10:05
+# @Author  : Tom_zc
+# @FileName: host_occupancy.py
+# @Software: PyCharm
+import bisect
+
+# the bitmap of one day is from 08:00 to 22:00, and every bit is a slot of 15 minutes
+SLOT_BEGIN_MINUTES = 8 * 60
+SLOT_MINUTES = 15
+SLOT_COUNT = 56
+SLOT_FULL_BITMAP = (1 << SLOT_COUNT) - 1
+
+
+def time_to_minutes(time_str):
+    """HH:MM -> the minutes from 00:00"""
+    hour, minute = time_str.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def minutes_to_time(minutes):
+    """the minutes from 00:00 -> HH:MM"""
+    return "{:02d}:{:02d}".format(minutes // 60, minutes % 60)
+
+
+def dilate_bitmap(bitmap, slots):
+    """extend every occupied slot to the slots before and after it"""
+    dilated = bitmap
+    for i in range(1, slots + 1):
+        dilated |= (bitmap << i) | (bitmap >> i)
+    return dilated & SLOT_FULL_BITMAP
+
+
+def get_free_ranges(bitmap, buffer_slots=0, begin_minutes=0):
+    """get the free ranges such as ["08:00-09:30"] from the occupied bitmap, the meeting can be booked in the range
+    which is not within buffer_slots of the occupied slots and starts after begin_minutes"""
+    occupied = dilate_bitmap(bitmap, buffer_slots)
+    past_slots = min(max(-(-(begin_minutes - SLOT_BEGIN_MINUTES) // SLOT_MINUTES), 0), SLOT_COUNT)
+    occupied |= (1 << past_slots) - 1
+    ranges = list()
+    begin = None
+    for i in range(SLOT_COUNT + 1):
+        is_free = i < SLOT_COUNT and not (occupied >> i) & 1
+        if is_free and begin is None:
+            begin = i
+        elif not is_free and begin is not None:
+            ranges.append("{}-{}".format(minutes_to_time(SLOT_BEGIN_MINUTES + begin * SLOT_MINUTES),
+                                         minutes_to_time(SLOT_BEGIN_MINUTES + i * SLOT_MINUTES)))
+            begin = None
+    return ranges
+
+
+class HostOccupancy:
+    """the occupancy of hosts in one day, the intervals of every host are saved in minutes and sorted by start"""
+
+    def __init__(self):
+        self._starts = dict()
+        self._ends = dict()
+
+    @classmethod
+    def build(cls, meetings):
+        """meetings: the iterable of (host_id, start, end)"""
+        occupancy = cls()
+        intervals = dict()
+        for host_id, start, end in meetings:
+            intervals.setdefault(host_id, list()).append((time_to_minutes(start), time_to_minutes(end)))
+        for host_id, host_intervals in intervals.items():
+            occupancy._set_intervals(host_id, host_intervals)
+        return occupancy
+
+    def _set_intervals(self, host_id, intervals):
+        """merge the overlapped intervals, so that the ends are sorted as well as the starts"""
+        merged = list()
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self._starts[host_id] = [i[0] for i in merged]
+        self._ends[host_id] = [i[1] for i in merged]
+
+    def is_free(self, host_id, start, end):
+        """whether the host is free in [start, end), start and end are the minutes"""
+        starts = self._starts.get(host_id)
+        if not starts:
+            return True
+        # the first interval which ends after start is the only one could overlap with [start, end)
+        index = bisect.bisect_right(self._ends[host_id], start)
+        return index == len(starts) or starts[index] >= end
+
+    def to_bitmaps(self):
+        """host_id -> the bitmap of the occupied slots in 08:00-22:00"""
+        bitmaps = dict()
+        for host_id, starts in self._starts.items():
+            bitmap = 0
+            for start, end in zip(starts, self._ends[host_id]):
+                begin_slot = max((start - SLOT_BEGIN_MINUTES) // SLOT_MINUTES, 0)
+                end_slot = min(-(-(end - SLOT_BEGIN_MINUTES) // SLOT_MINUTES), SLOT_COUNT)
+                for slot in range(begin_slot, end_slot):
+                    bitmap |= 1 << slot
+            bitmaps[host_id] = bitmap
+        return bitmaps
+
+    def get_free_hosts(self, host_ids, start, end, buffer=0):
+        """get the hosts which are free in [start - buffer, end + buffer), start and end are HH:MM"""
+        start_minutes = time_to_minutes(start) - buffer
+        end_minutes = time_to_minutes(end) + buffer
+        return [host_id for host_id in host_ids if self.is_free(host_id, start_minutes, end_minutes)]
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/14 10:05
+# @Author  : Tom_zc
+# @FileName: operation_status.py
+# @Software: PyCharm
+from meeting_platform.utils.base_enum import EnumBase
+
+
+class OperationStatus(EnumBase):
+    """异步会议操作状态"""
+    PENDING = (0, '等待执行')
+    RUNNING = (1, '执行中')
+    SUCCESS = (2, '执行成功')
+    FAILED = (3, '执行失败')
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/13 14:10
+# @Author  : Tom_zc
+# @FileName: outbox_status.py
+# @Software: PyCharm
+from meeting_platform.utils.base_enum import EnumBase
+
+
+class OutboxStatus(EnumBase):
+    """通知发件箱状态"""
+    PENDING = (0, '待发送')
+    SENT = (1, '已发送')
+    FAILED = (2, '重试耗尽发送失败')
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/17 10:10
+# @Author  : Tom_zc
+# @FileName: recording_job_status.py
+# @Software: PyCharm
+from meeting_platform.utils.base_enum import EnumBase
+
+
+class RecordingJobStatus(EnumBase):
+    """录制处理任务状态, 只会向前推进, 重试时从最后完成的检查点继续"""
+    LISTED = (0, '待处理')
+    DOWNLOADING = (1, '下载中')
+    DOWNLOADED = (2, '已经下载')
+    COVERED = (3, '已经生成封面')
+    OBS_UPLOADED = (4, '已经上传OBS')
+    BILI_UPLOADED = (5, '已经上传BILI')
+    VERIFIED = (6, 'BILI审核通过')
@@ -13,6 +13,10 @@ class BiliAdapter(ABC):
     def upload(self, *args, **kwargs):
         raise NotImplementedError
 
+    @abstractmethod
+    def iter_video_pages(self, *args, **kwargs):
+        raise NotImplementedError
+
     @abstractmethod
     def search_all_videos(self, *args, **kwargs):
         raise NotImplementedError
@@ -20,3 +24,7 @@ class BiliAdapter(ABC):
     @abstractmethod
     def get_replay_url(self, *args, **kwargs):
         raise NotImplementedError
+
+    @abstractmethod
+    def get_bvid(self, *args, **kwargs):
+        raise NotImplementedError
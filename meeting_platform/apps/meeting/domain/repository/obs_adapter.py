@@ -24,3 +24,7 @@ class ObsAdapter(ABC):
     @abstractmethod
     def upload_file(self, *args, **kwargs):
         raise NotImplementedError
+
+    @abstractmethod
+    def upload_stream(self, *args, **kwargs):
+        raise NotImplementedError
@@ -6,49 +6,140 @@
 # @Software: PyCharm
 
 import importlib
-import inspect
+import logging
 import os
 import pkgutil
-import sys
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
 
-from django.conf import settings
+logger = logging.getLogger("log")
 
+# the download url of recording, the headers to request it and the id of recording file in the platform
+VideoSource = namedtuple("VideoSource", ["url", "headers", "file_id"])
 
-class _ApiMods:
-    _mod_list = list()
+
+class _ApiRegistry:
+    """platform -> api class, which is registered when the module of api was imported"""
+    _api_classes = dict()
+    _instances = dict()
+    _loaded = False
+    _lock = threading.Lock()
+
+    @classmethod
+    def register(cls, api_cls):
+        cls._api_classes[str(api_cls.meeting_type).lower()] = api_cls
+        return api_cls
+
+    @classmethod
+    def _load_mods(cls):
+        """import all the modules of apis only once, and the classes are registered by the decorator"""
+        if cls._loaded:
+            return
+        with cls._lock:
+            if cls._loaded:
+                return
+            apis_path = os.path.dirname(os.path.abspath(__file__))
+            for _, mod_name, _ in pkgutil.iter_modules([apis_path]):
+                if mod_name == "base_api":
+                    continue
+                importlib.import_module("{}.{}".format(__package__, mod_name))
+            cls._loaded = True
+
+    @classmethod
+    def get_instance(cls, community, platform, host_id):
+        """get the api instance shared by (community, platform, host_id)"""
+        key = (community, platform.lower(), host_id)
+        instance = cls._instances.get(key)
+        if instance is not None:
+            return instance
+        cls._load_mods()
+        api_cls = cls._api_classes.get(platform.lower())
+        if api_cls is None:
+            raise RuntimeError("the platform/{} is not registered".format(platform))
+        instance = api_cls(community, platform, host_id)
+        cls._instances[key] = instance
+        return instance
+
+
+class RecordingIndex:
+    """the recordings of (community, platform, host_id) are listed once in one run of handling recordings, and
+    grouped by the meeting id, so that every meeting looks up its recordings without listing them again"""
+    _indexes = dict()
+    _locks = dict()
+    _lock = threading.Lock()
+    _is_enabled = False
+
+    @classmethod
+    @contextmanager
+    def scope(cls):
+        """the index is only kept in the scope, and the recordings are listed every time out of the scope"""
+        with cls._lock:
+            cls._indexes, cls._locks, cls._is_enabled = dict(), dict(), True
+        try:
+            yield
+        finally:
+            with cls._lock:
+                cls._indexes, cls._locks, cls._is_enabled = dict(), dict(), False
+
+    @classmethod
+    def invalidate(cls, community):
+        """drop the indexes of community in the scope, so that its recordings are listed again by the next lookup"""
+        with cls._lock:
+            for key in [i for i in cls._indexes if i[0] == community]:
+                cls._indexes.pop(key)
+
+    @classmethod
+    def _get_lock(cls, key):
+        with cls._lock:
+            lock = cls._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                cls._locks[key] = lock
+            return lock
+
+    @staticmethod
+    def _build(recordings, get_meeting_id):
+        index = dict()
+        for recording in recordings:
+            index.setdefault(str(get_meeting_id(recording)), list()).append(recording)
+        return index
 
     @classmethod
-    def _get_mods(cls):
-        if not cls._mod_list:
-            apis_path = os.path.join(settings.BASE_DIR, "apps", "meeting", "infrastructure", "adapter",
-                                     "meeting_adapter_impl", "apis")
-            meeting_apis_path = os.path.dirname(apis_path)
-            if meeting_apis_path not in sys.path:
-                sys.path.append(meeting_apis_path)
-            cls._mod_list = [mod for _, mod, _ in pkgutil.iter_modules([apis_path])]
-        return cls._mod_list
-
-    @property
-    def get_mods(self):
-        return self._get_mods()
-
-
-def handler_meeting(community, platform, host_id, action):
-    mods = _ApiMods().get_mods
-    for mod_name in mods:
-        if mod_name == "base_api":
-            continue
-        mod = importlib.import_module(".apis.{}".format(mod_name),
-                                      package="meeting_platform.apps.meeting.infrastructure.adapter."
-                                              "meeting_adapter_impl")
-        for _, cls in mod.__dict__.items():
-            if not inspect.isclass(cls):
-                continue
-            if str(cls.__dict__.get("meeting_type")).lower() != platform.lower():
-                continue
-            instance = cls(community, platform, host_id)
-            if not hasattr(instance, action.function_action):
-                raise RuntimeError("class/{} must have the action attribute/{}".
-                                   format(str(cls), str(action.function_action)))
-            fun = getattr(instance, action.function_action)
-            return fun(action)
+    def get(cls, key, meeting_id, list_recordings, get_meeting_id):
+        """key: (community, platform, host_id), list_recordings returns all the recordings or None if failed,
+        get_meeting_id returns the meeting id of recording, and return the recordings of the meeting id"""
+        if not cls._is_enabled:
+            recordings = list_recordings()
+            return cls._build(recordings or list(), get_meeting_id).get(str(meeting_id), list())
+        index = cls._indexes.get(key)
+        if index is None:
+            with cls._get_lock(key):
+                index = cls._indexes.get(key)
+                if index is None:
+                    recordings = list_recordings()
+                    # the failed listing is not cached, and it will be listed again by the next meeting
+                    if recordings is None:
+                        return list()
+                    index = cls._build(recordings, get_meeting_id)
+                    cls._indexes[key] = index
+                    logger.info("[RecordingIndex/get] {}: index {} recordings of {} meetings"
+                                .format("/".join(key), len(recordings), len(index)))
+        return index.get(str(meeting_id), list())
+
+
+def register_api(api_cls):
+    """the decorator to register the api class by meeting_type"""
+    return _ApiRegistry.register(api_cls)
+
+
+def handler_meeting(community, platform, host_id, action, function_action=None):
+    """function_action overrides the function of action, such as get_video_source which shares the action of
+    get_video"""
+    instance = _ApiRegistry.get_instance(community, platform, host_id)
+    function_action = function_action or action.function_action
+    if not hasattr(instance, function_action):
+        raise RuntimeError("class/{} must have the action attribute/{}".
+                           format(str(instance.__class__), str(function_action)))
+    fun = getattr(instance, function_action)
+    return fun(action)
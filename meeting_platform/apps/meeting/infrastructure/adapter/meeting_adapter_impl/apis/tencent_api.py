@@ -9,21 +9,24 @@ import hashlib
 import hmac
 import json
 import logging
-import requests
 import time
 from datetime import datetime
 
 from django.conf import settings
 
+from meeting_platform.utils.client.http_client import HttpSessionPool
 from meeting_platform.utils.common import make_nonce, get_video_path
 from meeting_platform.utils.file_stream import download_big_file
 from meeting.domain.repository.meeting_adapter import MeetingAdapter
+from meeting.infrastructure.adapter.meeting_adapter_impl.apis.base_api import register_api, RecordingIndex, \
+    VideoSource
 from meeting.infrastructure.adapter.meeting_adapter_impl.actions.tencent_action import TencentCreateAction, \
     TencentDeleteAction, TencentGetParticipantsAction, TencentGetVideo, TencentUpdateAction
 
 logger = logging.getLogger('log')
 
 
+@register_api
 class TencentApi(MeetingAdapter):
     meeting_type = "tencent"  # it is platform
 
@@ -52,6 +55,7 @@ class TencentApi(MeetingAdapter):
         self.platform = platform
         self.host_id = host_id
         self.time_out = settings.REQUEST_TIMEOUT
+        self.session = HttpSessionPool.get_session(platform, host_id)
         self.bili_upload_date = settings.BILI_UPLOAD_DATE
         self.bili_video_min_size = settings.BILI_VIDEO_MIN_SIZE
 
@@ -113,7 +117,7 @@ class TencentApi(MeetingAdapter):
         uri = self.create_path
         url = self._get_url(uri)
         signature, headers = self._get_signature('POST', uri, json.dumps(payload))
-        r = requests.post(url, headers=headers, data=json.dumps(payload), timeout=self.time_out)
+        r = self.session.post(url, headers=headers, data=json.dumps(payload), timeout=self.time_out)
         resp_dict = {
             'host_id': self.host_id
         }
@@ -157,7 +161,7 @@ class TencentApi(MeetingAdapter):
         uri = self.update_path.format(action.m_mid)
         url = self._get_url(uri)
         signature, headers = self._get_signature('PUT', uri, json.dumps(payload))
-        r = requests.put(url, headers=headers, data=json.dumps(payload), timeout=self.time_out)
+        r = self.session.put(url, headers=headers, data=json.dumps(payload), timeout=self.time_out)
         if r.status_code != 200:
             logger.error('[TencentApi] Fail to update meeting, status_code is {},and err:{}'
                          .format(r.status_code, r.content.decode("utf-8")))
@@ -177,8 +181,8 @@ class TencentApi(MeetingAdapter):
         uri = self.delete_path.format(action.m_mid)
         url = self._get_url(uri)
         signature, headers = self._get_signature('POST', uri, payload)
-        r = requests.post(url, headers=headers, data=payload,
-                          timeout=self.time_out)
+        r = self.session.post(url, headers=headers, data=payload,
+                              timeout=self.time_out)
         if r.status_code != 200:
             logger.error('Fail to cancel meeting {}'.format(mid))
             logger.error(r.json())
@@ -194,7 +198,7 @@ class TencentApi(MeetingAdapter):
         uri = self.participants_path.format(m_mid, self.host_id)
         url = self._get_url(uri)
         signature, headers = self._get_signature('GET', uri, "")
-        r = requests.get(url, headers=headers, timeout=self.time_out)
+        r = self.session.get(url, headers=headers, timeout=self.time_out)
         if r.status_code == 200:
             res = {
                 'total_records': r.json()['total_count'],
@@ -205,7 +209,7 @@ class TencentApi(MeetingAdapter):
         return r.status_code, r.json()
 
     def _get_records(self):
-        """get records"""
+        """get the records of corp in the last days, return None if failed"""
         end_time = int(time.time())
         start_time = end_time - 3600 * 24 * self.bili_upload_date
         page = 1
@@ -213,11 +217,11 @@ class TencentApi(MeetingAdapter):
         while True:
             uri = self.record_path.format(start_time, end_time, page)
             signature, headers = self._get_signature('GET', uri, "")
-            r = requests.get(self._get_url(uri), headers=headers, timeout=self.time_out)
+            r = self.session.get(self._get_url(uri), headers=headers, timeout=self.time_out)
             if r.status_code != 200:
                 logger.error("[TencentApi/_get_records] {}/{} request record failed, and return is:{}."
                              .format(self.community, self.platform, r.content.decode("utf-8")))
-                return []
+                return None
             if 'record_meetings' not in r.json().keys():
                 logger.info("[TencentApi/_get_records] {}/{} request record format failed, and return is:{}."
                             .format(self.community, self.platform, r.content.decode("utf-8")))
@@ -272,29 +276,19 @@ class TencentApi(MeetingAdapter):
         """get video download url"""
         uri = self.video_download_path.format(record_file_id, user_id)
         signature, headers = self._get_signature('GET', uri, "")
-        r = requests.get(self._get_url(uri), headers=headers, timeout=self.time_out)
+        r = self.session.get(self._get_url(uri), headers=headers, timeout=self.time_out)
         if r.status_code != 200:
             logger.error('[TencentApi/_filter_records] {}/{}: get video download failed:{}'.
                          format(self.community, record_file_id, r.content.decode("utf-8")))
             return
         return r.json().get("download_address")
 
-    def _download_video(self, action, available_record):
-        """download the video"""
-        mid = action.mid
-        download_url = self._get_video_download(available_record.get('record_file_id'), available_record.get('userid'))
-        if not download_url:
-            logger.error("[TencentApi/_download_video] {}/{}: get empty download url".format(self.community, mid))
-            return
-        target_filename = get_video_path(mid, self.community)
-        download_big_file(download_url, target_filename)
-        return target_filename
-
-    def get_video(self, action):
-        """get video"""
+    def get_video_source(self, action):
+        """get the download url of video"""
         if not isinstance(action, TencentGetVideo):
             raise RuntimeError("[TencentApi] action must be the subclass of TencentGetVideo")
-        recordings = self._get_records()
+        recordings = RecordingIndex.get((self.community, self.platform, self.host_id), action.m_mid,
+                                        self._get_records, lambda x: x.get("meeting_id"))
         if not recordings:
             logger.error("[TencentApi/get_video] {}/{}:find no recordings".format(self.community, action.mid))
             return
@@ -302,4 +296,19 @@ class TencentApi(MeetingAdapter):
         if not available_record:
             logger.info('[TencentApi/get_video] {}/{}:filter no available recording'.format(self.community, action.mid))
             return
-        return self._download_video(action, available_record)
+        record_file_id = available_record.get('record_file_id')
+        download_url = self._get_video_download(record_file_id, available_record.get('userid'))
+        if not download_url:
+            logger.error("[TencentApi/get_video_source] {}/{}: get empty download url"
+                         .format(self.community, action.mid))
+            return
+        return VideoSource(download_url, None, record_file_id)
+
+    def get_video(self, action):
+        """get video"""
+        video_source = self.get_video_source(action)
+        if not video_source:
+            return
+        target_filename = get_video_path(action.mid, self.community)
+        download_big_file(video_source.url, target_filename, headers=video_source.headers)
+        return target_filename
@@ -7,15 +7,17 @@
 import datetime
 import json
 import logging
-import os
-import requests
 import time
 
 from django.conf import settings
 
+from meeting_platform.utils.client.http_client import HttpSessionPool
 from meeting_platform.utils.common import get_video_path
 from meeting_platform.utils.file_stream import download_big_file
+from meeting_platform.utils.token_cache import TokenCache
 from meeting.domain.repository.meeting_adapter import MeetingAdapter
+from meeting.infrastructure.adapter.meeting_adapter_impl.apis.base_api import register_api, RecordingIndex, \
+    VideoSource
 from meeting.infrastructure.adapter.meeting_adapter_impl.actions.wk_action import WkCreateAction, WkUpdateAction, \
     WkDeleteAction, WkGetParticipantsAction, WkGetVideo
 
@@ -23,6 +25,7 @@ logger = logging.getLogger('log')
 
 
 # noinspection SpellCheckingInspection
+@register_api
 class WkApi(MeetingAdapter):
     meeting_type = "welink"  # it is platform
 
@@ -35,6 +38,8 @@ class WkApi(MeetingAdapter):
     download_url_path = "/v1/mmc/management/record/downloadurls"
     list_recordings_path = "/v1/mmc/management/record/files"
 
+    proxy_token_cache = TokenCache(refresh_ahead=settings.TOKEN_REFRESH_AHEAD)
+
     def __init__(self, community, platform, host_id):
         platform_info = settings.COMMUNITY_HOST[community][platform]
         cur_platforms = [i for i in platform_info if i["HOST"] == host_id]
@@ -50,14 +55,16 @@ class WkApi(MeetingAdapter):
         self.community = community
         self.platform = platform
         self.time_out = settings.REQUEST_TIMEOUT
+        self.session = HttpSessionPool.get_session(platform, host_id)
+        self.token_default_expire = settings.WELINK_TOKEN_DEFAULT_EXPIRE
         self.bili_upload_date = settings.BILI_UPLOAD_DATE
         self.bili_video_min_size = settings.BILI_VIDEO_MIN_SIZE
 
     def _get_url(self, uri):
         return self.api_prefix + uri
 
-    def _create_proxy_token(self):
-        """获取代理鉴权token"""
+    def _request_proxy_token(self):
+        """获取代理鉴权token, 返回token以及有效时长(秒)"""
         headers = {
             'Content-Type': 'application/json; charset=UTF-8'
         }
@@ -68,12 +75,27 @@ class WkApi(MeetingAdapter):
             'account': self.account,
             'pwd': self.pwd
         }
-        response = requests.post(self._get_url(self.proxy_token_path), headers=headers, data=json.dumps(payload),
-                                 timeout=self.time_out)
+        response = self.session.post(self._get_url(self.proxy_token_path), headers=headers, data=json.dumps(payload),
+                                     timeout=self.time_out)
         if response.status_code != 200:
             logger.error('[WkApi] Fail to get proxy token, status_code: {}'.format(response.status_code))
-            return None
-        return response.json()['accessToken']
+            return None, 0
+        ret_json = response.json()
+        valid_period = ret_json.get('validPeriod') or self.token_default_expire
+        logger.info('[WkApi] {}/{}: refresh proxy token, and valid period is {}s'
+                    .format(self.community, self.host_id, valid_period))
+        return ret_json['accessToken'], int(valid_period)
+
+    def _create_proxy_token(self):
+        """获取缓存的代理鉴权token, 在有效期结束前刷新"""
+        return self.proxy_token_cache.get((self.community, self.host_id), self._request_proxy_token)
+
+    def _check_proxy_token(self, response):
+        """token失效后清理缓存, 下一次请求重新获取"""
+        if response.status_code == 401:
+            logger.info('[WkApi] {}/{}: proxy token is unauthorized, and clean the cache'
+                        .format(self.community, self.host_id))
+            self.proxy_token_cache.invalidate((self.community, self.host_id))
 
     def create(self, action):
         """创建会议"""
@@ -108,8 +130,9 @@ class WkApi(MeetingAdapter):
         if action.is_record:
             data['isAutoRecord'] = 1
             data['recordType'] = 2
-        response = requests.post(self._get_url(self.create_path), headers=headers, data=json.dumps(data),
-                                 timeout=self.time_out)
+        response = self.session.post(self._get_url(self.create_path), headers=headers, data=json.dumps(data),
+                                     timeout=self.time_out)
+        self._check_proxy_token(response)
         resp_dict = {}
         if response.status_code != 200:
             logger.error('[WkApi] Fail to create meeting, status_code is {}'.format(response.status_code))
@@ -151,8 +174,9 @@ class WkApi(MeetingAdapter):
         else:
             data['isAutoRecord'] = 0
             data['recordType'] = 0
-        response = requests.put(self._get_url(self.update_path), params=params, headers=headers, data=json.dumps(data),
-                                timeout=self.time_out)
+        response = self.session.put(self._get_url(self.update_path), params=params, headers=headers,
+                                    data=json.dumps(data), timeout=self.time_out)
+        self._check_proxy_token(response)
         return response.status_code
 
     def delete(self, action):
@@ -167,8 +191,9 @@ class WkApi(MeetingAdapter):
             'conferenceID': action.mid,
             'type': 1
         }
-        response = requests.delete(self._get_url(self.delete_path), headers=headers, params=params,
-                                   timeout=self.time_out)
+        response = self.session.delete(self._get_url(self.delete_path), headers=headers, params=params,
+                                       timeout=self.time_out)
+        self._check_proxy_token(response)
         if response.status_code != 200 and response.json().get("error_msg") != "CONF_DATA_NOT_FOUND":
             logger.error('[WkApi] Fail to cancel meeting {}, and return data:{}'.format(action.mid, response.json()))
             return response.status_code
@@ -192,8 +217,9 @@ class WkApi(MeetingAdapter):
             'endDate': end_date,
             'limit': 500
         }
-        response = requests.get(self._get_url(self.list_history_path), headers=headers, params=params,
-                                timeout=self.time_out)
+        response = self.session.get(self._get_url(self.list_history_path), headers=headers, params=params,
+                                    timeout=self.time_out)
+        self._check_proxy_token(response)
         if response.status_code != 200:
             logger.error('[WkApi] Fail to get history meetings list')
             logger.error(response.json())
@@ -224,8 +250,9 @@ class WkApi(MeetingAdapter):
                     'confUUID': conf_uuid,
                     'limit': 500
                 }
-                response = requests.get(self._get_url(self.participants_path), headers=headers, params=params,
-                                        timeout=self.time_out)
+                response = self.session.get(self._get_url(self.participants_path), headers=headers, params=params,
+                                            timeout=self.time_out)
+                self._check_proxy_token(response)
                 if response.status_code == 200:
                     participants['total_records'] += response.json()['count']
                     for participant_info in response.json()['data']:
@@ -248,10 +275,20 @@ class WkApi(MeetingAdapter):
             'endDate': (tn - self.bili_upload_date * 3600 * 24) * 1000,
             'limit': 100
         }
-        response = requests.get(self._get_url(self.list_recordings_path), headers=headers, params=params,
-                                timeout=self.time_out)
+        response = self.session.get(self._get_url(self.list_recordings_path), headers=headers, params=params,
+                                    timeout=self.time_out)
+        self._check_proxy_token(response)
         return response.status_code, response.json()
 
+    def _get_all_recordings(self):
+        """get all the recordings in the last days, return None if failed"""
+        status, recordings = self._list_recordings()
+        if status != 200:
+            logger.error('[WkApi/_get_all_recordings] {}/{}:Fail to get welink recordings, and return is:{}.'.
+                         format(self.community, self.host_id, status))
+            return None
+        return recordings.get('data') or list()
+
     def _get_download_url(self, conf_uuid):
         """获取录像下载地址"""
         headers = {
@@ -260,17 +297,11 @@ class WkApi(MeetingAdapter):
         params = {
             'confUUID': conf_uuid
         }
-        response = requests.get(self._get_url(self.download_url_path), headers=headers, params=params,
-                                timeout=self.time_out)
+        response = self.session.get(self._get_url(self.download_url_path), headers=headers, params=params,
+                                    timeout=self.time_out)
+        self._check_proxy_token(response)
         return response.status_code, response.json()
 
-    def _download_recording(self, token, target_filename, download_url):
-        """下载云录制的视频"""
-        if os.path.exists(target_filename):
-            os.remove(target_filename)
-        headers = {"Authorization": token}
-        download_big_file(download_url, target_filename, headers=headers)
-
     # noinspection PyPep8Naming
     def _get_records(self, action):
         """get the records"""
@@ -280,18 +311,14 @@ class WkApi(MeetingAdapter):
         end = action.end
         start_time = date + ' ' + start
         end_time = date + ' ' + end
-        status, recordings = self._list_recordings()
-        if status != 200:
-            logger.error('[WkApi/_get_records] {}/{}:Fail to get welink recordings, and return is:{}.'.
-                         format(self.community, mid, status))
-            return []
-        if recordings['count'] == 0:
+        recordings_data = RecordingIndex.get((self.community, self.platform, self.host_id), mid,
+                                             self._get_all_recordings, lambda x: x["confID"])
+        if not recordings_data:
             logger.error('[WkApi/_get_records] {}/{}:get empty welink recordings.'
                          .format(self.community, mid))
             return []
         available_recordings = []
         start_order_set = set()
-        recordings_data = recordings['data']
         for recording in recordings_data:
             if recording['confID'] != mid:
                 continue
@@ -318,33 +345,31 @@ class WkApi(MeetingAdapter):
                     available_recordings.append(recording)
         return available_recordings
 
-    def _download_video(self, action, recordings):
-        """download video"""
+    def _get_video_source(self, action, recordings):
+        """get the download url of video"""
         mid = action.mid
         waiting_download_recordings = []
         for available_recording in recordings:
             conf_uuid = available_recording['confUUID']
             status, res = self._get_download_url(conf_uuid)
             if status != 200:
-                logger.error('[WkApi/_download_video] {}/{}:Fail to get welink recordings, and return is:{}.'.
+                logger.error('[WkApi/_get_video_source] {}/{}:Fail to get welink recordings, and return is:{}.'.
                              format(self.community, mid, status))
                 continue
             record_urls = res['recordUrls'][0]['urls']
             for record_url in record_urls:
                 if record_url['fileType'].lower() in ['hd', 'aux']:
-                    waiting_download_recordings.append(record_url)
+                    waiting_download_recordings.append((conf_uuid, record_url))
         if not waiting_download_recordings:
-            logger.info('[WkApi/_download_video] {}/{} filter to no available recordings'.
+            logger.info('[WkApi/_get_video_source] {}/{} filter to no available recordings'.
                         format(self.community, mid))
             return
-        token = waiting_download_recordings[-1]['token']
-        download_url = waiting_download_recordings[-1]['url']
-        target_filename = get_video_path(mid, self.community)
-        self._download_recording(token, target_filename, download_url)
-        return target_filename
+        conf_uuid, record_url = waiting_download_recordings[-1]
+        file_id = "{}/{}".format(conf_uuid, record_url['fileType'])
+        return VideoSource(record_url['url'], {"Authorization": record_url['token']}, file_id)
 
-    def get_video(self, action):
-        """download video to local"""
+    def get_video_source(self, action):
+        """get the download url of video"""
         if not isinstance(action, WkGetVideo):
             raise RuntimeError("[WkApi/get_video] action must be the subclass of WkGetVideo")
         recordings = self._get_records(action)
@@ -352,4 +377,13 @@ class WkApi(MeetingAdapter):
             logger.info('[WkApi/get_video] {} filter to no available recordings which mid is：{}'
                         .format(self.community, action.mid))
             return
-        return self._download_video(action, recordings)
+        return self._get_video_source(action, recordings)
+
+    def get_video(self, action):
+        """download video to local"""
+        video_source = self.get_video_source(action)
+        if not video_source:
+            return
+        target_filename = get_video_path(action.mid, self.community)
+        download_big_file(video_source.url, target_filename, headers=video_source.headers)
+        return target_filename
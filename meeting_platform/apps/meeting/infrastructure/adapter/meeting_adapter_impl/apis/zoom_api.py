@@ -7,21 +7,25 @@
 import datetime
 import json
 import secrets
-import requests
 import logging
 
 from django.conf import settings
 
+from meeting_platform.utils.client.http_client import HttpSessionPool
+from meeting_platform.utils.token_cache import TokenCache
 from meeting.infrastructure.adapter.obs_adapter_impl import ObsAdapterImp
 from meeting_platform.utils.common import get_video_path
 from meeting_platform.utils.file_stream import download_big_file
 from meeting.domain.repository.meeting_adapter import MeetingAdapter
+from meeting.infrastructure.adapter.meeting_adapter_impl.apis.base_api import register_api, RecordingIndex, \
+    VideoSource
 from meeting.infrastructure.adapter.meeting_adapter_impl.actions.zoom_action import ZoomCreateAction, \
     ZoomUpdateAction, ZoomDeleteAction, ZoomGetParticipantsAction, ZoomGetVideo
 
 logger = logging.getLogger("log")
 
 
+@register_api
 class ZoomApi(MeetingAdapter):
     meeting_type = "zoom"  # it is platform
 
@@ -32,6 +36,10 @@ class ZoomApi(MeetingAdapter):
     records_path = "/v2/users/{}/recordings"
 
     my_obs_adapter_impl = ObsAdapterImp
+    # community -> the token cached until the revalidation ttl
+    oauth_token_cache = TokenCache(refresh_ahead=0)
+    # community -> (token, etag, last_modified) of the obs object which saved the token
+    oauth_token_validators = dict()
 
     def __init__(self, community, platform, host_id):
         platform_info = settings.COMMUNITY_HOST[community][platform]
@@ -47,27 +55,61 @@ class ZoomApi(MeetingAdapter):
         self.host_id = host_id
         self.api_prefix = settings.API_PREFIX["ZOOM_API_PREFIX"]
         self.time_out = settings.REQUEST_TIMEOUT
+        self.session = HttpSessionPool.get_session(platform, host_id)
         self.bili_upload_date = settings.BILI_UPLOAD_DATE
         self.bili_video_min_size = settings.BILI_VIDEO_MIN_SIZE
+        self.token_revalidate_ttl = settings.ZOOM_TOKEN_REVALIDATE_TTL
 
     def _get_url(self, uri):
         """get url"""
         return self.api_prefix + uri
 
-    def _get_oauth_token(self):
-        """get oauth token"""
-        obs_client = self.my_obs_adapter_impl(self.obs_token["AK"], self.obs_token["SK"], self.obs_token["ENDPOINT"])
-        res = obs_client.get_object_metadata(self.obs_token["BUCKET"], self.obs_token["OBJECT"])
-        token = ''
+    def _get_obs_client(self):
+        """get the obs client shared by community"""
+        return self.my_obs_adapter_impl.get_instance(self.community, self.obs_token["AK"], self.obs_token["SK"],
+                                                     self.obs_token["ENDPOINT"])
+
+    def _request_oauth_token(self):
+        """get oauth token from the metadata of obs object, and revalidate it by etag/last-modified"""
+        validator = self.oauth_token_validators.get(self.community)
+        extension_headers = None
+        if validator and validator[1]:
+            extension_headers = {"If-None-Match": validator[1]}
+        elif validator and validator[2]:
+            extension_headers = {"If-Modified-Since": validator[2]}
+        res = self._get_obs_client().get_object_metadata(self.obs_token["BUCKET"], self.obs_token["OBJECT"],
+                                                         extension_headers=extension_headers)
+        if res.get('status') == 304 and validator:
+            return validator[0], self.token_revalidate_ttl
         if res.get('status') != 200:
             logger.error('[ZoomApi/_get_oauth_token] {}:Fail to get zoom token'.format(self.community))
-            return token
+            return None, 0
+        token, etag, last_modified = '', '', ''
         for k, v in res.get('header'):
             if k == 'access_token':
                 token = v
-                break
+            elif k == 'etag':
+                etag = v
+            elif k == 'last-modified':
+                last_modified = v
+        if not token:
+            logger.error('[ZoomApi/_get_oauth_token] {}:Lack of zoom token in metadata'.format(self.community))
+            return None, 0
+        self.oauth_token_validators[self.community] = (token, etag, last_modified)
         logger.info('[ZoomApi/_get_oauth_token] {}:Get zoom token successfully'.format(self.community))
-        return token
+        return token, self.token_revalidate_ttl
+
+    def _get_oauth_token(self):
+        """get oauth token"""
+        return self.oauth_token_cache.get(self.community, self._request_oauth_token) or ''
+
+    def _check_oauth_token(self, status_code):
+        """clean the cache when the token is expired, and read it from obs in the next request"""
+        if status_code == 401:
+            logger.info('[ZoomApi/_check_oauth_token] {}:Zoom token is unauthorized, and clean the cache'
+                        .format(self.community))
+            self.oauth_token_cache.invalidate(self.community)
+            self.oauth_token_validators.pop(self.community, None)
 
     def create(self, action):
         """create meeting"""
@@ -101,8 +143,9 @@ class ZoomApi(MeetingAdapter):
             }
         }
         uri = self.create_path.format(self.host_id)
-        response = requests.post(self._get_url(uri), data=json.dumps(payload), headers=headers,
-                                 timeout=self.time_out)
+        response = self.session.post(self._get_url(uri), data=json.dumps(payload), headers=headers,
+                                     timeout=self.time_out)
+        self._check_oauth_token(response.status_code)
         resp_dict = {}
         if response.status_code != 201:
             return response.status_code, resp_dict
@@ -146,8 +189,9 @@ class ZoomApi(MeetingAdapter):
             "authorization": "Bearer {}".format(token)
         }
         uri = self.update_path.format(action.mid)
-        response = requests.patch(self._get_url(uri), data=json.dumps(new_data),
-                                  headers=headers, timeout=self.time_out)
+        response = self.session.patch(self._get_url(uri), data=json.dumps(new_data),
+                                      headers=headers, timeout=self.time_out)
+        self._check_oauth_token(response.status_code)
         return response.status_code
 
     def delete(self, action):
@@ -159,8 +203,9 @@ class ZoomApi(MeetingAdapter):
         headers = {
             "authorization": "Bearer {}".format(token)
         }
-        response = requests.request("DELETE", self._get_url(uri),
-                                    headers=headers, timeout=self.time_out)
+        response = self.session.request("DELETE", self._get_url(uri),
+                                        headers=headers, timeout=self.time_out)
+        self._check_oauth_token(response.status_code)
         return response.status_code
 
     def get_participants(self, action):
@@ -171,7 +216,8 @@ class ZoomApi(MeetingAdapter):
         token = self._get_oauth_token()
         headers = {
             "authorization": "Bearer {}".format(token)}
-        r = requests.get(self._get_url(uri), headers=headers, timeout=self.time_out)
+        r = self.session.get(self._get_url(uri), headers=headers, timeout=self.time_out)
+        self._check_oauth_token(r.status_code)
         if r.status_code == 200:
             ret_json = r.json()
             total_records = ret_json['total_records']
@@ -183,28 +229,40 @@ class ZoomApi(MeetingAdapter):
         else:
             return r.status_code, r.json()
 
-    def get_records(self, action):
-        """get all records"""
-        mid = action.mid
+    def _list_records(self):
+        """get all the records of host in the last days by pages, return None if failed"""
         uri = self.records_path.format(self.host_id)
-        headers = {
-            'authorization': 'Bearer {}'.format(self._get_oauth_token())
-        }
         params = {
             'from': (datetime.datetime.now() - datetime.timedelta(days=self.bili_upload_date)).strftime("%Y-%m-%d"),
             'page_size': 50
         }
-        response = requests.get(self._get_url(uri), headers=headers, params=params, timeout=self.time_out)
-        if response.status_code != 200:
-            logger.error('[ZoomApi/get_records] {}/{} get recordings failed: {} {}'.
-                         format(self.community, self.platform, response.status_code, response.content.decode("utf-8")))
-            return
-        ret_json = response.json()
-        if "meetings" not in ret_json:
-            logger.error('[ZoomApi/get_records] {}/{} get recordings format failed: {} {}'.
-                         format(self.community, self.platform, response.status_code, ret_json.get("message")))
-            return
-        records = list(filter(lambda x: x if x['id'] == int(mid) else None, ret_json['meetings']))
+        records = list()
+        while True:
+            headers = {
+                'authorization': 'Bearer {}'.format(self._get_oauth_token())
+            }
+            response = self.session.get(self._get_url(uri), headers=headers, params=params, timeout=self.time_out)
+            self._check_oauth_token(response.status_code)
+            if response.status_code != 200:
+                logger.error('[ZoomApi/_list_records] {}/{} get recordings failed: {} {}'.
+                             format(self.community, self.platform, response.status_code,
+                                    response.content.decode("utf-8")))
+                return None
+            ret_json = response.json()
+            if "meetings" not in ret_json:
+                logger.error('[ZoomApi/_list_records] {}/{} get recordings format failed: {} {}'.
+                             format(self.community, self.platform, response.status_code, ret_json.get("message")))
+                return None
+            records.extend(ret_json['meetings'])
+            if not ret_json.get("next_page_token"):
+                return records
+            params["next_page_token"] = ret_json["next_page_token"]
+
+    def get_records(self, action):
+        """get the largest record of the meeting"""
+        mid = action.mid
+        records = RecordingIndex.get((self.community, self.platform, self.host_id), mid, self._list_records,
+                                     lambda x: x['id'])
         if not records:
             logger.info('[ZoomApi/get_records] {}/{} meeting {} have no recordings yet'.
                         format(self.community, self.platform, mid))
@@ -212,44 +270,45 @@ class ZoomApi(MeetingAdapter):
         sorted_data = sorted(records, key=lambda x: x['total_size'], reverse=True)
         return sorted_data[0]
 
-    def _get_download_url(self, action, recordings):
-        """get download url"""
+    def _get_recording_file(self, action, recordings):
+        """get the biggest mp4 file of recordings"""
         mid = action.mid
         recordings_list = list(
             filter(lambda x: x if x['file_extension'] == 'MP4' else None, recordings['recording_files']))
         if len(recordings_list) == 0:
-            logger.info('[ZoomApi/_get_download_url] {}/{}: file_extension not is mp4 and result is empty'.
+            logger.info('[ZoomApi/_get_recording_file] {}/{}: file_extension not is mp4 and result is empty'.
                         format(self.community, mid))
             return
         sorted_data = sorted(recordings_list, key=lambda x: x['file_size'], reverse=True)
         total_size = sorted_data[0]['file_size']
-        logger.info('[ZoomApi/_get_download_url] {}/{}: the full size of the recording file is {}'.
+        logger.info('[ZoomApi/_get_recording_file] {}/{}: the full size of the recording file is {}'.
                     format(self.community, mid, total_size))
         if total_size < self.bili_video_min_size:
-            logger.info('[ZoomApi/_get_download_url] {}/{} the size of file is lt 1M'.
+            logger.info('[ZoomApi/_get_recording_file] {}/{} the size of file is lt 1M'.
                         format(self.community, mid))
             return
-        return sorted_data[0]['download_url']
-
-    def _download_video(self, action, download_url):
-        """download video"""
-        mid = action.mid
-        video_path = get_video_path(mid, self.community)
-        r = requests.get(url=download_url, allow_redirects=False, timeout=self.time_out)
-        url = r.headers['location']
-        filename = download_big_file(url, video_path)
-        return filename
+        return sorted_data[0]
 
-    def get_video(self, action):
-        """get video"""
+    def get_video_source(self, action):
+        """get the download url of video, which is redirected by zoom"""
         if not isinstance(action, ZoomGetVideo):
             raise RuntimeError("[ZoomApi/get_video] action must be the subclass of ZoomGetVideo")
         records = self.get_records(action)
         if not records:
             logger.error("[ZoomApi/get_video] {}/{}: get empty records.".format(self.community, action.mid))
             return
-        download_url = self._get_download_url(action, records)
-        if not download_url:
+        recording_file = self._get_recording_file(action, records)
+        if not recording_file:
             logger.error("[ZoomApi/get_video] {}/{}: get empty download_url.".format(self.community, action.mid))
             return
-        return self._download_video(action, download_url)
+        r = self.session.get(url=recording_file['download_url'], allow_redirects=False, timeout=self.time_out)
+        return VideoSource(r.headers['location'], None, recording_file['id'])
+
+    def get_video(self, action):
+        """get video"""
+        video_source = self.get_video_source(action)
+        if not video_source:
+            return
+        video_path = get_video_path(action.mid, self.community)
+        filename = download_big_file(video_source.url, video_path, headers=video_source.headers)
+        return filename
@@ -196,3 +196,8 @@ class MeetingAdapterImpl(MeetingAdapter):
     def get_video(self, meeting):
         action = self.meeting_action.get_video_action(meeting["platform"], meeting)
         return handler_meeting(meeting["community"], meeting["platform"], meeting["host_id"], action)
+
+    def get_video_source(self, meeting):
+        action = self.meeting_action.get_video_action(meeting["platform"], meeting)
+        return handler_meeting(meeting["community"], meeting["platform"], meeting["host_id"], action,
+                               function_action="get_video_source")
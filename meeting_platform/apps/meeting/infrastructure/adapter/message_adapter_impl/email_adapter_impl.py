@@ -15,12 +15,19 @@ from email.mime.multipart import MIMEMultipart
 from django.conf import settings
 
 from meeting.domain.repository.message_adapter import MessageAdapter
-from meeting_platform.utils.client.email_client import EmailClient
-from meeting_platform.utils.common import func_retry
-from meeting_platform.utils.file_stream import read_content
+from meeting_platform.utils.client.email_client import SmtpConnectionPool
+from meeting_platform.utils.template_cache import template_cache
 
 logger = logging.getLogger("log")
 
+# (has agenda, is record) -> the name of template
+_CREATE_TEMPLATE_NAMES = {
+    (False, False): "TEMPLATE_NOT_SUMMARY_NOT_RECORDING",
+    (True, False): "TEMPLATE_SUMMARY_NOT_RECORDING",
+    (False, True): "TEMPLATE_NOT_SUMMARY_RECORDING",
+    (True, True): "TEMPLATE_SUMMARY_RECORDING",
+}
+
 
 class EmailAdapter:
     """email Adapter"""
@@ -29,8 +36,7 @@ class EmailAdapter:
         self.community = community
         smtp_info = settings.COMMUNITY_SMTP[community]
         self.smtp_message_from = smtp_info["SMTP_MESSAGE_FROM"]
-        self.email_adapter = EmailClient(smtp_info["SMTP_SERVER_HOST"], smtp_info["SMTP_SERVER_PORT"],
-                                         smtp_info["SMTP_SERVER_USER"], smtp_info["SMTP_SERVER_PASS"])
+        self.email_adapter = SmtpConnectionPool.get_instance(smtp_info)
 
     def send_message(self, receive_str, msg):
         msg['From'] = '{} conference <{}>'.format(self.community, self.smtp_message_from)
@@ -60,6 +66,8 @@ class EmailTemplate:
         self.start = meeting["start"]
         self.end = meeting["end"]
         self.start_time = ' '.join([self.date, self.start])
+        self.start_at = meeting.get("start_at")
+        self.end_at = meeting.get("end_at")
         portal_info = settings.COMMUNITY_PORTAL[meeting["community"]]
         self.portal_zh = portal_info["PORTAL_ZH"]
         self.portal_en = portal_info["PORTAL_EN"]
@@ -67,38 +75,26 @@ class EmailTemplate:
         self.mid = meeting["mid"]
         self.sequence = meeting.get("sequence") or 0
 
-    # noinspection DuplicatedCode
     def get_create_meeting_template_by_meetings_info(self):
-        if not self.agenda and not self.record:
-            body = read_content(settings.TEMPLATE.get("TEMPLATE_NOT_SUMMARY_NOT_RECORDING"))
-        elif self.agenda and not self.record:
-            body = read_content(settings.TEMPLATE.get("TEMPLATE_SUMMARY_NOT_RECORDING"))
-        elif not self.agenda and self.record:
-            body = read_content(settings.TEMPLATE.get("TEMPLATE_NOT_SUMMARY_RECORDING"))
-        elif self.agenda and self.record:
-            body = read_content(settings.TEMPLATE.get("TEMPLATE_SUMMARY_RECORDING"))
-        else:
-            raise Exception("invalid {}/{}".format(self.agenda, self.record))
-        body_of_email = body.replace('{{sig_name}}', '{0}').replace('{{start_time}}', '{1}'). \
-            replace('{{join_url}}', '{2}').replace('{{topic}}', '{3}'). \
-            replace('{{etherpad}}', '{4}').replace('{{platform}}', '{5}'). \
-            replace('{{portal_zh}}', '{6}').replace('{{portal_en}}', '{7}'). \
-            format(self.sig_name, self.start_time, self.join_url, self.topic, self.etherpad, self.platform,
-                   self.portal_zh, self.portal_en)
+        template_name = _CREATE_TEMPLATE_NAMES[(bool(self.agenda), bool(self.record))]
+        template = template_cache.get(settings.TEMPLATE.get(template_name))
+        body_of_email = template.render(sig_name=self.sig_name, start_time=self.start_time, join_url=self.join_url,
+                                        topic=self.topic, etherpad=self.etherpad, platform=self.platform,
+                                        portal_zh=self.portal_zh, portal_en=self.portal_en, summary=self.agenda)
         return MIMEText(body_of_email, _charset='utf-8')
 
     def get_delete_meeting_template_by_meeting_info(self):
-        body = read_content(settings.TEMPLATE.get("TEMPLATE_CANCEL_EMAIL"))
-        body_of_email = body.replace('{{platform}}', self.platform). \
-            replace('{{start_time}}', self.start_time). \
-            replace('{{sig_name}}', self.sig_name)
+        template = template_cache.get(settings.TEMPLATE.get("TEMPLATE_CANCEL_EMAIL"))
+        body_of_email = template.render(platform=self.platform, start_time=self.start_time, sig_name=self.sig_name)
         return MIMEText(body_of_email, _charset='utf-8')
 
     def __get_before_start_and_end(self):
-        before_start = datetime.datetime.strptime(self.date + ' ' + self.start, '%Y-%m-%d %H:%M') - \
-                       datetime.timedelta(hours=8)
-        before_end = datetime.datetime.strptime(self.date + ' ' + self.end, '%Y-%m-%d %H:%M') - datetime.timedelta(
-            hours=8)
+        start_at, end_at = self.start_at, self.end_at
+        if start_at is None or end_at is None:
+            start_at = datetime.datetime.strptime(self.date + ' ' + self.start, '%Y-%m-%d %H:%M')
+            end_at = datetime.datetime.strptime(self.date + ' ' + self.end, '%Y-%m-%d %H:%M')
+        before_start = start_at - datetime.timedelta(hours=8)
+        before_end = end_at - datetime.timedelta(hours=8)
         dt_start = before_start.replace(tzinfo=pytz.utc)
         dt_end = before_end.replace(tzinfo=pytz.utc)
         return dt_start, dt_end
@@ -154,7 +150,6 @@ class EmailTemplate:
 
 
 class CreateMessageEmailAdapterImpl(MessageAdapter):
-    @func_retry()
     def send_message(self, meeting):
         email_template = EmailTemplate(meeting)
         if not email_template.toaddrs_list:
@@ -179,7 +174,6 @@ class CreateMessageEmailAdapterImpl(MessageAdapter):
 
 
 class UpdateMessageEmailAdapterImpl(MessageAdapter):
-    @func_retry()
     def send_message(self, meeting):
         meeting["topic"] = '[Update] ' + meeting["topic"]
         email_template = EmailTemplate(meeting)
@@ -205,7 +199,6 @@ class UpdateMessageEmailAdapterImpl(MessageAdapter):
 
 
 class DeleteMessageEmailAdapterImpl(MessageAdapter):
-    @func_retry()
     def send_message(self, meeting):
         meeting["topic"] = '[Cancel] ' + meeting["topic"]
         email_template = EmailTemplate(meeting)
@@ -11,7 +11,6 @@ from abc import ABC
 from django.conf import settings
 
 from meeting_platform.utils.client.kafka_client import KafKaClient
-from meeting_platform.utils.common import func_retry
 from meeting.domain.repository.message_adapter import MessageAdapter
 
 logger = logging.getLogger("log")
@@ -25,59 +24,65 @@ class MessageKafKaAdapterImpl(MessageAdapter, ABC):
         else:
             return kafka_info.get("KAFKA_TOPIC"), kafka_info.get("KAFKA_CLIENT")
 
+    @staticmethod
+    def send_msg_async(kafka_client, kafka_topic, data, log_prefix):
+        """the msg is sent by the shared producer in batch, and the result is logged in the callback, the msg is keyed
+        by mid-sequence so that the consumer could drop the duplicated msg"""
+        meeting = data["msg"]
+        meeting_info = "{}/{}/{}/{}/{}".format(meeting["community"], meeting["platform"], meeting["topic"],
+                                               meeting["mid"], meeting["id"])
+
+        def on_success(_):
+            logger.info("[{}] {} send {} kafka msg success".format(log_prefix, meeting_info, data["action"]))
+
+        def on_error(e):
+            logger.error("[{}] {} send {} kafka msg failed, err:{}".format(log_prefix, meeting_info,
+                                                                          data["action"], e))
+
+        key = "{}-{}".format(meeting["mid"], meeting["sequence"])
+        return KafKaClient.get_instance(kafka_client).send_msg_async(kafka_topic, data, key, on_success, on_error)
+
 
 class CreateMessageKafKaAdapterImpl(MessageKafKaAdapterImpl):
 
-    @func_retry()
     def send_message(self, meeting):
         kafka_topic, kafka_client = self.get_client(meeting)
         if not kafka_topic or not kafka_client:
             logger.info("[CreateMessageAdapterImpl] {} kafka config is empty, Please ignore."
                         .format(meeting["community"]))
             return
-        with KafKaClient(settings.KAFKA_CLIENT) as client:
-            data = {
-                "action": "create_meeting",
-                "msg": meeting
-            }
-            client.send_msg(settings.KAFKA_TOPIC, data)
-            logger.info("[CreateMessageAdapterImpl] {}/{}/{}/{}/{} send create kafka msg success".format(
-                meeting["community"], meeting["platform"], meeting["topic"], meeting["mid"], meeting["id"]))
+        data = {
+            "action": "create_meeting",
+            "msg": meeting
+        }
+        return self.send_msg_async(kafka_client, kafka_topic, data, "CreateMessageAdapterImpl")
 
 
 class UpdateMessageKafKaAdapterImpl(MessageKafKaAdapterImpl):
 
-    @func_retry()
     def send_message(self, meeting):
         kafka_topic, kafka_client = self.get_client(meeting)
         if not kafka_topic or not kafka_client:
             logger.info("[UpdateMessageKafKaAdapterImpl] {} kafka config is empty, Please ignore."
                         .format(meeting["community"]))
             return
-        with KafKaClient(settings.KAFKA_CLIENT) as client:
-            data = {
-                "action": "update_meeting",
-                "msg": meeting
-            }
-            client.send_msg(settings.KAFKA_TOPIC, data)
-            logger.info("[UpdateMessageKafKaAdapterImpl] {}/{}/{}/{}/{} send update kafka msg success".format(
-                meeting["community"], meeting["platform"], meeting["topic"], meeting["mid"], meeting["id"]))
+        data = {
+            "action": "update_meeting",
+            "msg": meeting
+        }
+        return self.send_msg_async(kafka_client, kafka_topic, data, "UpdateMessageKafKaAdapterImpl")
 
 
 class DeleteMessageKafKaAdapterImpl(MessageKafKaAdapterImpl):
 
-    @func_retry()
     def send_message(self, meeting):
         kafka_topic, kafka_client = self.get_client(meeting)
         if not kafka_topic or not kafka_client:
             logger.info("[DeleteMessageKafKaAdapterImpl] {} kafka config is empty, Please ignore."
                         .format(meeting["community"]))
             return
-        with KafKaClient(settings.KAFKA_CLIENT) as client:
-            data = {
-                "action": "delete_meeting",
-                "msg": meeting
-            }
-            client.send_msg(settings.KAFKA_TOPIC, data)
-            logger.info("[UpdateMessageKafKaAdapterImpl] {}/{}/{}/{}/{} send delete kafka msg success".format(
-                meeting["community"], meeting["platform"], meeting["topic"], meeting["mid"], meeting["id"]))
+        data = {
+            "action": "delete_meeting",
+            "msg": meeting
+        }
+        return self.send_msg_async(kafka_client, kafka_topic, data, "DeleteMessageKafKaAdapterImpl")
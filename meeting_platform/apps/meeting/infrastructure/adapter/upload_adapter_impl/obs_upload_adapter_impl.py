@@ -11,6 +11,7 @@ import logging
 from django.conf import settings
 
 from meeting_platform.utils.common import func_retry
+from meeting_platform.utils.file_stream import iter_big_file_parts, open_big_file
 from meeting.domain.repository.upload_adapter import UploadAdapter
 from meeting.infrastructure.adapter.obs_adapter_impl import ObsAdapterImp
 
@@ -46,14 +47,13 @@ class ObsUploadAdapterImpl(UploadAdapter):
             return
         return os.path.getsize(file_path)
 
-    def _generate_obs_metadata(self, video_object, video_path):
+    def _generate_obs_metadata(self, video_object, download_file_size):
         date = self.meeting["date"]
         start = self.meeting["start"]
         end = self.meeting["end"]
         start_time = date + 'T' + start + ':00Z'
         end_time = date + 'T' + end + ':00Z'
         download_url = self._get_obs_video_download_url(self.endpoint, self.bucket, video_object)
-        download_file_size = self._get_size_of_file(video_path)
         metadata = {
             "meeting_id": self.meeting["mid"],
             "meeting_topic": self.meeting["topic"],
@@ -68,12 +68,7 @@ class ObsUploadAdapterImpl(UploadAdapter):
         }
         return metadata
 
-    @func_retry()
-    def upload(self, video_path, cover_path):
-        # 1.upload the video
-        video_object = self._get_obs_video_object()
-        metadata = self._generate_obs_metadata(video_object, video_path)
-        upload_video_res = self.obs_adapter_imp.upload_file(self.bucket, video_object, video_path, metadata)
+    def _check_upload_video_res(self, upload_video_res):
         if upload_video_res.get('status') != 200:
             logger.error('[ObsUploadAdapterImpl/upload] {}/{}: fail to upload video to OBS, the reason is {}'.
                          format(self.meeting["community"], self.meeting["mid"], upload_video_res))
@@ -82,7 +77,9 @@ class ObsUploadAdapterImpl(UploadAdapter):
             logger.error('[ObsUploadAdapterImpl/upload] {}/{} Unexpected upload video result to OBS: {}'.
                          format(self.meeting["community"], self.meeting["mid"], upload_video_res))
             return
-        # 2.upload the cover png
+        return True
+
+    def _upload_cover(self, video_object, cover_path):
         upload_cover_res = self.obs_adapter_imp.upload_file(self.bucket,
                                                             self._get_obs_cover_object(video_object),
                                                             cover_path)
@@ -92,6 +89,33 @@ class ObsUploadAdapterImpl(UploadAdapter):
             return
         if not isinstance(upload_cover_res, dict) or 'status' not in upload_cover_res.keys():
             logger.error('[ObsUploadAdapterImpl/upload] {}/{} Unexpected upload cover result to OBS: {}'.
-                         format(self.meeting["community"], self.meeting["mid"], upload_video_res))
+                         format(self.meeting["community"], self.meeting["mid"], upload_cover_res))
             return
         return True
+
+    @func_retry()
+    def upload(self, video_path, cover_path):
+        # 1.upload the video
+        video_object = self._get_obs_video_object()
+        metadata = self._generate_obs_metadata(video_object, self._get_size_of_file(video_path))
+        upload_video_res = self.obs_adapter_imp.upload_file(self.bucket, video_object, video_path, metadata)
+        if not self._check_upload_video_res(upload_video_res):
+            return
+        # 2.upload the cover png
+        return self._upload_cover(video_object, cover_path)
+
+    @func_retry()
+    def upload_stream(self, video_source, cover_path, tee_path=None):
+        """upload the video from the download url to OBS part by part without the local file, and the video is
+        written to tee_path at the same time if it is needed by the next step"""
+        # 1.upload the video, and the size of video is got from the response
+        video_object = self._get_obs_video_object()
+        response = open_big_file(video_source.url, headers=video_source.headers)
+        content_length = response.headers.get("Content-Length")
+        metadata = self._generate_obs_metadata(video_object, int(content_length) if content_length else None)
+        parts = iter_big_file_parts(response, settings.RECORDING_STREAM_PART_SIZE, tee_path)
+        upload_video_res = self.obs_adapter_imp.upload_stream(self.bucket, video_object, parts, metadata)
+        if not self._check_upload_video_res(upload_video_res):
+            return
+        # 2.upload the cover png
+        return self._upload_cover(video_object, cover_path)
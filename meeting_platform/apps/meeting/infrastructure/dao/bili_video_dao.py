@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/16 15:20
+# @Author  : Tom_zc
+# @FileName: bili_video_dao.py
+# @Software: PyCharm
+from django.db.models import Max
+
+from meeting.models import BiliVideo
+
+
+class BiliVideoDao:
+    dao = BiliVideo
+
+    @classmethod
+    def get_high_water(cls, community):
+        """the publish time of the newest indexed video, or None if nothing was indexed"""
+        return cls.dao.objects.filter(community=community).aggregate(high_water=Max("created"))["high_water"]
+
+    @classmethod
+    def get_exist_bvids(cls, bvids):
+        return set(cls.dao.objects.filter(bvid__in=list(bvids)).values_list("bvid", flat=True))
+
+    @classmethod
+    def bulk_create_ignore_conflicts(cls, videos):
+        """the video which has the same bvid is ignored"""
+        return cls.dao.objects.bulk_create([cls.dao(**video) for video in videos], ignore_conflicts=True)
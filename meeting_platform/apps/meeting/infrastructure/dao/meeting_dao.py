@@ -4,50 +4,113 @@
 # @Author  : Tom_zc
 # @FileName: meeting_adapter.py
 # @Software: PyCharm
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+
 from meeting.models import Meeting
 
 
 class MeetingDao:
     dao = Meeting
+    datetime_fields = ("start_at", "end_at", "update_time")
+
+    @staticmethod
+    def dumps(meeting):
+        """the meeting dict -> json, which is saved in the outbox or the operation"""
+        return json.dumps(meeting, cls=DjangoJSONEncoder)
+
+    @classmethod
+    def loads(cls, content):
+        """json -> the meeting dict, and the datetime fields are parsed back"""
+        meeting = json.loads(content)
+        for key in cls.datetime_fields:
+            if meeting.get(key):
+                meeting[key] = parse_datetime(meeting[key])
+        return meeting
+
+    @staticmethod
+    def get_start_and_end_at(date, start, end):
+        """parse the legacy date/start/end into the datetime"""
+        start_at = datetime.datetime.strptime("{} {}".format(date, start), "%Y-%m-%d %H:%M")
+        end_at = datetime.datetime.strptime("{} {}".format(date, end), "%Y-%m-%d %H:%M")
+        return start_at, end_at
+
+    @classmethod
+    def fill_datetime(cls, meeting):
+        """keep start_at/end_at same as date/start/end"""
+        if all(meeting.get(key) for key in ("date", "start", "end")):
+            meeting["start_at"], meeting["end_at"] = cls.get_start_and_end_at(meeting["date"], meeting["start"],
+                                                                               meeting["end"])
+        return meeting
+
+    @classmethod
+    def _get_by_dates(cls, community, platform, dates, fields, meeting_id=None):
+        """scan the range of start_at, and union the meetings which have not been backfilled by date"""
+        dates = [str(date) for date in dates]
+        begin = datetime.datetime.strptime(min(dates), "%Y-%m-%d")
+        end = datetime.datetime.strptime(max(dates), "%Y-%m-%d") + datetime.timedelta(days=1)
+        queryset = cls.dao.objects.filter(community=community, platform=platform, is_delete=0)
+        if meeting_id is not None:
+            queryset = queryset.exclude(id=meeting_id)
+        in_range = queryset.filter(start_at__gte=begin, start_at__lt=end).values_list(*fields)
+        not_backfilled = queryset.filter(start_at__isnull=True, date__in=dates).values_list(*fields)
+        return in_range.union(not_backfilled, all=True)
+
+    @classmethod
+    def get_meeting_time_by_date(cls, community, platform, date, meeting_id=None):
+        return cls._get_by_dates(community, platform, [date], ("host_id", "start", "end"), meeting_id)
+
+    @classmethod
+    def get_meeting_time_by_dates(cls, community, platform, dates):
+        return cls._get_by_dates(community, platform, dates, ("date", "host_id", "start", "end"))
 
     @classmethod
-    def get_conflict_meeting(cls, community, platform, date, start_search, end_search, meeting_id=None):
-        if meeting_id is None:
-            return cls.dao.objects.filter(community=community, platform=platform, is_delete=0,
-                                          date=date, end__gt=start_search, start__lt=end_search)
-        return cls.dao.objects.filter(community=community, platform=platform, is_delete=0,
-                                      date=date, end__gt=start_search, start__lt=end_search).exclude(id=meeting_id)
+    def get_without_datetime(cls, last_id, limit):
+        return cls.dao.objects.filter(id__gt=last_id, start_at__isnull=True).order_by("id")[:limit]
+
+    @classmethod
+    def bulk_update_datetime(cls, meetings):
+        return cls.dao.objects.bulk_update(meetings, ["start_at", "end_at"])
 
     @classmethod
     def get_queryset(cls):
-        return cls.dao.objects.filter(is_delete=0)
+        return cls.dao.objects.filter(is_delete=0, is_pending=False)
 
     @classmethod
     def create(cls, **kwargs):
-        return cls.dao.objects.create(**kwargs)
+        return cls.dao.objects.create(**cls.fill_datetime(kwargs))
 
     @classmethod
     def get_by_id(cls, meeting_id):
-        return cls.dao.objects.filter(id=meeting_id, is_delete=0).first()
+        return cls.dao.objects.filter(id=meeting_id, is_delete=0, is_pending=False).first()
 
     @classmethod
     def update_by_id(cls, meeting_id, **kwargs):
-        return cls.dao.objects.filter(id=meeting_id, is_delete=0).update(**kwargs)
+        return cls.dao.objects.filter(id=meeting_id, is_delete=0).update(**cls.fill_datetime(kwargs))
+
+    @classmethod
+    def update_by_id_and_sequence(cls, meeting_id, expected_sequence, **kwargs):
+        """update the meeting only if it was not changed by the others after the expected sequence"""
+        return cls.dao.objects.filter(id=meeting_id, sequence=expected_sequence, is_delete=0) \
+            .update(**cls.fill_datetime(kwargs))
 
     @classmethod
     def delete_by_id(cls, meeting_id):
         return cls.dao.objects.filter(id=meeting_id, is_delete=0).update(is_delete=1)
 
     @classmethod
-    def get_uploaded_mid_by_community_and_status(cls, community, status):
-        return cls.dao.objects.filter(is_delete=0, community=community, is_record=True, upload_status=status) \
-            .values_list('mid', flat=True)
+    def get_replay_url_by_community_and_status(cls, community, status):
+        return cls.dao.objects.filter(is_delete=0, is_pending=False, community=community, is_record=True,
+                                      upload_status=status).values_list('id', 'replay_url')
 
     @classmethod
-    def update_upload_status_by_community_and_mid(cls, community, mid, status):
-        return cls.dao.objects.filter(is_delete=0, community=community, is_record=True).filter(mid__in=mid). \
-            update(upload_status=status)
+    def update_upload_status_by_ids(cls, ids, status):
+        return cls.dao.objects.filter(id__in=ids, is_delete=0).update(upload_status=status)
 
     @classmethod
     def get_upload_all_by_community_and_status(cls, community, status):
-        return cls.dao.objects.filter(is_delete=0, community=community, is_record=True, upload_status=status).all()
+        return cls.dao.objects.filter(is_delete=0, is_pending=False, community=community, is_record=True,
+                                      upload_status=status).all()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/11 10:40
+# @Author  : Tom_zc
+# @FileName: meeting_occupancy_dao.py
+# @Software: PyCharm
+from meeting.models import MeetingOccupancy
+
+
+class MeetingOccupancyDao:
+    dao = MeetingOccupancy
+
+    @classmethod
+    def get_by_dates(cls, community, platform, dates):
+        return cls.dao.objects.filter(community=community, platform=platform, date__in=dates) \
+            .values_list("date", "occupancy")
+
+    @classmethod
+    def get_for_update(cls, community, platform, date):
+        """lock the occupancy of the date until the transaction ends, and it is created if not exists"""
+        cls.dao.objects.get_or_create(community=community, platform=platform, date=date)
+        return cls.dao.objects.select_for_update().get(community=community, platform=platform, date=date)
+
+    @classmethod
+    def update_by_id(cls, occupancy_id, occupancy):
+        return cls.dao.objects.filter(id=occupancy_id).update(occupancy=occupancy)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/14 10:30
+# @Author  : Tom_zc
+# @FileName: meeting_operation_dao.py
+# @Software: PyCharm
+from django.db.models import Q
+
+from meeting.domain.primitive.operation_status import OperationStatus
+from meeting.models import MeetingOperation
+
+
+class MeetingOperationDao:
+    dao = MeetingOperation
+
+    @classmethod
+    def create(cls, **kwargs):
+        return cls.dao.objects.create(**kwargs)
+
+    @classmethod
+    def get_by_operation_id(cls, operation_id):
+        return cls.dao.objects.filter(operation_id=operation_id).first()
+
+    @classmethod
+    def is_unfinished_by_meeting_id(cls, meeting_id):
+        """the meeting has the operation which is waiting or running"""
+        return cls.dao.objects.filter(meeting_id=meeting_id, status__in=[OperationStatus.PENDING.value,
+                                                                         OperationStatus.RUNNING.value]).exists()
+
+    @classmethod
+    def get_pending_and_expired(cls, now, limit):
+        """the pending operations, and the running operations which were interrupted"""
+        return cls.dao.objects.filter(Q(status=OperationStatus.PENDING.value) |
+                                      Q(status=OperationStatus.RUNNING.value, lease_until__lt=now)) \
+                   .order_by("create_time")[:limit]
+
+    @classmethod
+    def claim(cls, operation_id, lease_until):
+        """only one worker could change the pending operation into running"""
+        return cls.dao.objects.filter(operation_id=operation_id, status=OperationStatus.PENDING.value) \
+                   .update(status=OperationStatus.RUNNING.value, lease_until=lease_until) == 1
+
+    @classmethod
+    def claim_expired(cls, operation_id, now):
+        """only one worker could take over the running operation which lease expired"""
+        return cls.dao.objects.filter(operation_id=operation_id, status=OperationStatus.RUNNING.value,
+                                      lease_until__lt=now).update(lease_until=None) == 1
+
+    @classmethod
+    def mark_success(cls, operation_id):
+        return cls.dao.objects.filter(operation_id=operation_id).update(status=OperationStatus.SUCCESS.value)
+
+    @classmethod
+    def mark_failed(cls, operation_id, code):
+        return cls.dao.objects.filter(operation_id=operation_id).update(status=OperationStatus.FAILED.value,
+                                                                        code=code)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/13 14:40
+# @Author  : Tom_zc
+# @FileName: meeting_outbox_dao.py
+# @Software: PyCharm
+from django.db.models import F
+
+from meeting.domain.primitive.outbox_status import OutboxStatus
+from meeting.models import MeetingOutbox
+
+
+class MeetingOutboxDao:
+    dao = MeetingOutbox
+
+    @classmethod
+    def bulk_create_ignore_conflicts(cls, outboxes):
+        """the outbox which has the same idempotency_key is ignored"""
+        return cls.dao.objects.bulk_create([cls.dao(**outbox) for outbox in outboxes], ignore_conflicts=True)
+
+    @classmethod
+    def get_due(cls, now, limit):
+        return cls.dao.objects.filter(status=OutboxStatus.PENDING.value, next_retry_at__lte=now) \
+                   .order_by("next_retry_at")[:limit]
+
+    @classmethod
+    def get_due_by_keys(cls, now, keys):
+        return cls.dao.objects.filter(idempotency_key__in=keys, status=OutboxStatus.PENDING.value,
+                                      next_retry_at__lte=now)
+
+    @classmethod
+    def claim(cls, outbox, lease_until):
+        """claim the outbox by the attempts which was read, and the other dispatchers can not claim it until the
+        lease expired"""
+        return cls.dao.objects.filter(id=outbox.id, status=OutboxStatus.PENDING.value, attempts=outbox.attempts) \
+                   .update(attempts=F("attempts") + 1, next_retry_at=lease_until) == 1
+
+    @classmethod
+    def mark_sent(cls, outbox_id):
+        return cls.dao.objects.filter(id=outbox_id).update(status=OutboxStatus.SENT.value, last_error="")
+
+    @classmethod
+    def mark_retry(cls, outbox_id, next_retry_at, last_error):
+        return cls.dao.objects.filter(id=outbox_id).update(next_retry_at=next_retry_at, last_error=last_error)
+
+    @classmethod
+    def mark_failed(cls, outbox_id, last_error):
+        return cls.dao.objects.filter(id=outbox_id).update(status=OutboxStatus.FAILED.value, last_error=last_error)
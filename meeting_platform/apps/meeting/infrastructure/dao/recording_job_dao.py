@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/17 10:40
+# @Author  : Tom_zc
+# @FileName: recording_job_dao.py
+# @Software: PyCharm
+from django.db.models import F, Q
+
+from meeting.domain.primitive.recording_job_status import RecordingJobStatus
+from meeting.models import RecordingJob
+
+
+class RecordingJobDao:
+    dao = RecordingJob
+
+    @classmethod
+    def get_or_create(cls, meeting):
+        job, _ = cls.dao.objects.get_or_create(meeting_id=meeting["id"],
+                                               defaults={"community": meeting["community"], "mid": meeting["mid"]})
+        return job
+
+    @classmethod
+    def get_by_id(cls, job_id):
+        return cls.dao.objects.get(id=job_id)
+
+    @classmethod
+    def update_by_id(cls, job_id, **kwargs):
+        return cls.dao.objects.filter(id=job_id).update(**kwargs)
+
+    @classmethod
+    def add_attempts(cls, job_id):
+        return cls.dao.objects.filter(id=job_id).update(attempts=F("attempts") + 1)
+
+    @classmethod
+    def add_time(cls, job_id, field, seconds):
+        return cls.dao.objects.filter(id=job_id).update(**{field: F(field) + seconds})
+
+    @classmethod
+    def mark_verified_by_meeting_ids(cls, meeting_ids):
+        return cls.dao.objects.filter(meeting_id__in=meeting_ids).update(status=RecordingJobStatus.VERIFIED.value)
+
+    @classmethod
+    def claim(cls, job_id, owner, now, lease_until):
+        """only one node could hold the lease of job, and the expired lease could be taken over by the other node"""
+        return cls.dao.objects.filter(Q(lease_until__isnull=True) | Q(lease_until__lt=now) | Q(lease_owner=owner),
+                                      id=job_id).update(lease_owner=owner, lease_until=lease_until) == 1
+
+    @classmethod
+    def renew(cls, job_id, owner, lease_until):
+        """return False if the lease was taken over by the other node"""
+        return cls.dao.objects.filter(id=job_id, lease_owner=owner).update(lease_until=lease_until) == 1
+
+    @classmethod
+    def release(cls, job_id, owner):
+        return cls.dao.objects.filter(id=job_id, lease_owner=owner).update(lease_owner='', lease_until=None)
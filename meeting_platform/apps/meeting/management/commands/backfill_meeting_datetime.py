@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/12 10:30
+# @Author  : Tom_zc
+# @FileName: backfill_meeting_datetime.py
+# @Software: PyCharm
+import logging
+import time
+import traceback
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from meeting.infrastructure.dao.meeting_dao import MeetingDao
+
+logger = logging.getLogger("log")
+
+
+class BackfillMeetingDatetime:
+    meeting_dao = MeetingDao
+
+    def __init__(self, batch_size, interval):
+        self.batch_size = batch_size
+        self.interval = interval
+
+    def backfill(self):
+        """fill start_at/end_at by date/start/end in batches, the meetings are walked by id"""
+        last_id, total = 0, 0
+        while True:
+            meetings = list(self.meeting_dao.get_without_datetime(last_id, self.batch_size))
+            if not meetings:
+                break
+            last_id = meetings[-1].id
+            filled = list()
+            for meeting in meetings:
+                try:
+                    meeting.start_at, meeting.end_at = self.meeting_dao.get_start_and_end_at(meeting.date,
+                                                                                             meeting.start,
+                                                                                             meeting.end)
+                    filled.append(meeting)
+                except ValueError as e:
+                    logger.error("[BackfillMeetingDatetime/backfill] {}: invalid date/start/end, err:{}"
+                                 .format(meeting.id, e))
+            self.meeting_dao.bulk_update_datetime(filled)
+            total += len(filled)
+            logger.info("[BackfillMeetingDatetime/backfill] backfill {} meetings until id {}".format(total, last_id))
+            time.sleep(self.interval)
+        return total
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        logger.info('-' * 20 + ' start to backfill meeting datetime' + '-' * 20)
+        try:
+            total = BackfillMeetingDatetime(settings.MEETING_BACKFILL_BATCH_SIZE,
+                                            settings.MEETING_BACKFILL_INTERVAL).backfill()
+            logger.info('-' * 20 + 'All done, backfill {} meetings'.format(total) + '-' * 20)
+        except Exception as e:
+            logger.error("[backfill_meeting_datetime/handle] err:{}, traceback:{}"
+                         .format(str(e), traceback.format_exc()))
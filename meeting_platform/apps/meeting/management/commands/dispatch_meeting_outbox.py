@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/13 16:10
+# @Author  : Tom_zc
+# @FileName: dispatch_meeting_outbox.py
+# @Software: PyCharm
+import logging
+import signal
+import threading
+import traceback
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from meeting.application.meeting_outbox import MeetingOutboxApp
+
+logger = logging.getLogger("log")
+
+
+class MeetingOutboxDispatcher:
+    """drain the outbox in batches until stopped, and sleep for the interval when there is nothing more to send"""
+
+    def __init__(self, batch_size, interval):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.meeting_outbox_app = MeetingOutboxApp()
+        self._stop_event = threading.Event()
+
+    def stop(self, *_):
+        logger.info("[MeetingOutboxDispatcher/stop] receive the signal to stop")
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                count = 0
+                try:
+                    close_old_connections()
+                    count = self.meeting_outbox_app.dispatch_batch(self.batch_size)
+                except Exception as e:
+                    logger.error("[MeetingOutboxDispatcher/run] err:{}, traceback:{}"
+                                 .format(e, traceback.format_exc()))
+                if count < self.batch_size:
+                    self._stop_event.wait(self.interval)
+        finally:
+            self.meeting_outbox_app.shutdown()
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        logger.info('-' * 20 + ' start to dispatch meeting outbox' + '-' * 20)
+        dispatcher = MeetingOutboxDispatcher(settings.MEETING_OUTBOX_BATCH_SIZE, settings.MEETING_OUTBOX_INTERVAL)
+        signal.signal(signal.SIGTERM, dispatcher.stop)
+        signal.signal(signal.SIGINT, dispatcher.stop)
+        dispatcher.run()
+        logger.info('-' * 20 + 'All done, stop to dispatch meeting outbox' + '-' * 20)
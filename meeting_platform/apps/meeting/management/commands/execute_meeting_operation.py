@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/14 11:30
+# @Author  : Tom_zc
+# @FileName: execute_meeting_operation.py
+# @Software: PyCharm
+import logging
+import signal
+import threading
+import traceback
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from meeting.application.meeting import MeetingApp
+
+logger = logging.getLogger("log")
+
+
+class MeetingOperationExecutor:
+    """execute the asynchronous operations which were rejected by the request workers, and fail the interrupted
+    ones until stopped"""
+
+    def __init__(self, batch_size, interval):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.meeting_app = MeetingApp()
+        self._stop_event = threading.Event()
+
+    def stop(self, *_):
+        logger.info("[MeetingOperationExecutor/stop] receive the signal to stop")
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            count = 0
+            try:
+                close_old_connections()
+                count = self.meeting_app.execute_pending_operations(self.batch_size)
+            except Exception as e:
+                logger.error("[MeetingOperationExecutor/run] err:{}, traceback:{}".format(e, traceback.format_exc()))
+            if count < self.batch_size:
+                self._stop_event.wait(self.interval)
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        logger.info('-' * 20 + ' start to execute meeting operation' + '-' * 20)
+        executor = MeetingOperationExecutor(settings.MEETING_OPERATION_BATCH_SIZE, settings.MEETING_OPERATION_INTERVAL)
+        signal.signal(signal.SIGTERM, executor.stop)
+        signal.signal(signal.SIGINT, executor.stop)
+        executor.run()
+        logger.info('-' * 20 + 'All done, stop to execute meeting operation' + '-' * 20)
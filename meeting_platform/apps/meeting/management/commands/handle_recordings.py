@@ -4,195 +4,490 @@
 # @Author  : Tom_zc
 # @FileName: handle_recordings.py
 # @Software: PyCharm
+import datetime
+import functools
 import os
-import shutil
 import logging
+import random
+import signal
+import socket
+import threading
+import time
 import traceback
 from multiprocessing.dummy import Pool as ThreadPool
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections, transaction
 from django.forms import model_to_dict
 
-from meeting_platform.utils.common import execute_cmd3, get_temp_dir, rm_dir
-from meeting_platform.utils.file_stream import write_content
+from meeting_platform.utils.artifact_cache import artifact_cache
+from meeting_platform.utils.common import get_cur_date, get_temp_dir, rm_dir
+from meeting_platform.utils.cover_renderer import cover_renderer
+from meeting_platform.utils.file_stream import download_big_file, get_downloaded_size
+from meeting_platform.utils.pipeline import Stage, StagePipeline
+from meeting.domain.primitive.recording_job_status import RecordingJobStatus
 from meeting.domain.primitive.upload_status import UploadStatus
 from meeting.infrastructure.adapter.bilibili_adapter_impl import BiliAdapterImpl
+from meeting.infrastructure.adapter.meeting_adapter_impl.apis.base_api import RecordingIndex
 from meeting.infrastructure.adapter.meeting_adapter_impl.meeting_adapter_impl import MeetingAdapterImpl
 from meeting.infrastructure.adapter.upload_adapter_impl.bili_upload_adapter_impl import BiliUploadAdapterImpl
 from meeting.infrastructure.adapter.upload_adapter_impl.obs_upload_adapter_impl import ObsUploadAdapterImpl
+from meeting.infrastructure.dao.bili_video_dao import BiliVideoDao
 from meeting.infrastructure.dao.meeting_dao import MeetingDao
+from meeting.infrastructure.dao.recording_job_dao import RecordingJobDao
 
 logger = logging.getLogger("log")
 
 
 class HandleRecording:
     meeting_dao = MeetingDao
+    bili_video_dao = BiliVideoDao
     meeting_adapter_impl = MeetingAdapterImpl()
     bili_adapter_impl = BiliAdapterImpl
     upload_obs_adapter_impl = ObsUploadAdapterImpl
     upload_bili_adapter_impl = BiliUploadAdapterImpl
+    recording_job_dao = RecordingJobDao
+    stage_time_fields = {
+        "download": "download_time",
+        "generate_cover": "cover_time",
+        "upload_obs": "obs_time",
+        "upload_bili": "bili_time",
+    }
 
     def __init__(self, community):
         self.community = community
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        # the node which holds the lease of recording job, and every process is regarded as a node
+        self.lease_owner = "{}/{}".format(socket.gethostname(), os.getpid())
 
-    # noinspection LongLine
-    def _cover_content(self, topic, group_name, date, start_time, end_time):
-        """get the cover html template"""
-        content = """
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <title>cover</title>
-        </head>
-        <body>
-            <div style="display: inline-block; height: 688px; width: 1024px; text-align: center; background-image: url('cover.png')">
-                <p style="font-size: 100px;margin-top: 150px; color: white"><b>{0}</b></p>
-                <p style="font-size: 80px; margin: 0; color: white">SIG: {1}</p>
-                <p style="font-size: 60px; margin: 0; color: white">Time: {2} {3}-{4}</p>
-            </div>
-        </body>
-        </html>
-        """.format(topic, group_name, date, start_time, end_time)
-        return content
-
-    def _get_video_path(self, meeting):
-        """get video path in local file system"""
-        video_path = self.meeting_adapter_impl.get_video(meeting)
-        if not video_path:
-            logger.error('[HandleRecording/_get_video_path]  {}/{}: video path could not be empty'.
-                         format(self.community, meeting["mid"]))
-            return
-        if not os.path.exists(video_path):
-            logger.error('[HandleRecording/_get_video_path]  {}/{}: video path could not be exist'.
-                         format(self.community, meeting["mid"]))
-            return
-        if os.path.getsize(video_path) == 0:
-            logger.error('[HandleRecording/_get_video_path] {}/{}: download but size is 0'.
-                         format(self.community, meeting["mid"]))
-            return
-        return video_path
-
-    def _get_video_cover_path(self, video_path, meeting):
-        """get cover image"""
-        # parse parameter
-        html_path = video_path.replace('.mp4', '.html')
-        image_path = video_path.replace('.mp4', '.png')
-        mid = meeting["mid"]
-        topic = meeting["topic"]
-        group_name = meeting["group_name"]
-        date = meeting["date"]
-        start = meeting["start"]
-        end = meeting["end"]
-        community = meeting["community"]
-        content = self._cover_content(topic, group_name, date, start, end)
-        # write content to html
-        write_content(html_path, content, model="w")
-        if not os.path.exists(os.path.join(os.path.dirname(video_path), 'cover.png')):
-            shutil.copy("meeting_platform/templates/image/{}/cover.png".format(community), os.path.dirname(video_path))
-        execute_cmd3("wkhtmltoimage --enable-local-file-access {} {}".format(html_path, image_path))
-        logger.info("[HandleRecording/_generate_cover] {}/{}: generate cover success".format(self.community, mid))
-        if not os.path.exists(image_path):
-            logger.error('[HandleRecording/_get_video_cover_path] {}/{}: fail to generate cover for meeting video'
-                         .format(self.community, meeting["mid"]))
-            return
-        return image_path
+    def _index_bili_videos(self, adapter_impl):
+        """index the new published videos of bili incrementally, and return the count of new videos:
+            1.the videos are listed page by page from the newest, and stop at the first known video which was
+              published before the high water mark minus the overlap
+            2.the overlap is kept because the video is listed after the review, which may be later than the newer one
+        """
+        high_water = self.bili_video_dao.get_high_water(self.community)
+        stop_at = high_water - datetime.timedelta(seconds=settings.BILI_VIDEO_INDEX_OVERLAP) if high_water else None
+        count = 0
+        for videos in adapter_impl.iter_video_pages():
+            videos = [i for i in videos if i.get('bvid')]
+            exist_bvids = self.bili_video_dao.get_exist_bvids([i['bvid'] for i in videos])
+            new_videos = [{
+                "community": self.community,
+                "bvid": i['bvid'],
+                "created": datetime.datetime.fromtimestamp(i['created']),
+            } for i in videos if i['bvid'] not in exist_bvids]
+            self.bili_video_dao.bulk_create_ignore_conflicts(new_videos)
+            count += len(new_videos)
+            if stop_at is not None and any(i['bvid'] in exist_bvids and
+                                           datetime.datetime.fromtimestamp(i['created']) < stop_at for i in videos):
+                break
+        return count
 
     def refresh_upload_status(self):
         """refresh_upload_status: if bili passed the video, and set the upload_status=UploadStatus.UPLOAD_ALL"""
+        if not self._is_need_bili():
+            logger.info('[HandleRecording/check_upload_results] {}: skip to check bili without the config of bili'
+                        .format(self.community))
+            return
         logger.info('[HandleRecording/check_upload_results] {}:Start to check results for uploaded videos to bili'.
                     format(self.community))
         adapter_impl = self.bili_adapter_impl(self.community)
-        all_vid = adapter_impl.search_all_videos()
-        uploaded_bili_mid = self.meeting_dao.get_uploaded_mid_by_community_and_status(self.community,
-                                                                                      UploadStatus.UPLOAD_BILI.value)
-        exist_mid = list(set(all_vid) - set(uploaded_bili_mid))
-        logger.info('[HandleRecording/check_upload_results] {}:Find uploaded bili video:{}'.
-                    format(self.community, ",".join(exist_mid)))
-        self.meeting_dao.update_upload_status_by_community_and_mid(self.community, exist_mid,
-                                                                   UploadStatus.UPLOAD_ALL.value)
-
-    def upload_all(self):
-        """upload all: get video --> upload obs ---> upload bili"""
-        meeting_infos = self.meeting_dao.get_upload_all_by_community_and_status(self.community, UploadStatus.INIT.value)
-        upload_mid = ",".join([str(i.mid) for i in meeting_infos])
-        logger.info("[HandleRecording/upload_all] {}: Find need to upload mid({})".format(upload_mid, self.community))
-        for meeting in meeting_infos:
-            try:
-                meeting = model_to_dict(meeting)
-                video_path = self._get_video_path(meeting)
-                if not video_path:
-                    continue
-                cover_path = self._get_video_cover_path(video_path, meeting)
-                if not cover_path:
-                    continue
-                ret = self.upload_obs_adapter_impl(meeting).upload(video_path, cover_path)
-                if not ret:
-                    raise Exception("upload obs failed")
-                self.meeting_dao.update_by_id(meeting["id"], upload_status=UploadStatus.UPLOAD_OBS.value)
-                replay_url = self.upload_bili_adapter_impl(meeting).upload(video_path, cover_path)
-                if not replay_url:
-                    raise Exception("upload bili failed")
-                self.meeting_dao.update_by_id(meeting["id"], upload_status=UploadStatus.UPLOAD_BILI.value,
-                                              replay_url=replay_url)
-            except Exception as e:
-                logger.error("[HandleRecording/upload] e:{}, traceback:{}".format(str(e), traceback.format_exc()))
-
-    def upload_bili(self):
-        """upload bili: get video --> upload bili, this is pointer to upload bili failed"""
-        meeting_infos = self.meeting_dao.get_upload_all_by_community_and_status(self.community,
-                                                                                UploadStatus.UPLOAD_OBS.value)
+        count = self._index_bili_videos(adapter_impl)
+        replay_urls = self.meeting_dao.get_replay_url_by_community_and_status(self.community,
+                                                                              UploadStatus.UPLOAD_BILI.value)
+        uploaded_bvids = {adapter_impl.get_bvid(replay_url): meeting_id for meeting_id, replay_url in replay_urls}
+        uploaded_bvids.pop(None, None)
+        exist_bvids = self.bili_video_dao.get_exist_bvids(uploaded_bvids.keys())
+        logger.info('[HandleRecording/check_upload_results] {}:index {} new videos, and find uploaded bili video:{}'.
+                    format(self.community, count, ",".join(exist_bvids)))
+        meeting_ids = [uploaded_bvids[i] for i in exist_bvids]
+        self.meeting_dao.update_upload_status_by_ids(meeting_ids, UploadStatus.UPLOAD_ALL.value)
+        self.recording_job_dao.mark_verified_by_meeting_ids(meeting_ids)
+
+    def get_pending_meetings(self):
+        """get the meetings to upload, and both of them are fetched before uploading, so that the meeting which
+        reached UPLOAD_OBS in this run is not uploaded to bili twice"""
+        meeting_infos = list(self.meeting_dao.get_upload_all_by_community_and_status(self.community,
+                                                                                     UploadStatus.INIT.value))
+        meeting_infos.extend(self.meeting_dao.get_upload_all_by_community_and_status(self.community,
+                                                                                     UploadStatus.UPLOAD_OBS.value))
         upload_mid = ",".join([str(i.mid) for i in meeting_infos])
-        logger.info("[HandleRecording/upload_bili] {}: Find need to upload mid({})".format(upload_mid, self.community))
-        for meeting in meeting_infos:
+        logger.info("[HandleRecording/get_pending_meetings] {}: Find need to upload mid({})"
+                    .format(self.community, upload_mid))
+        return [model_to_dict(i) for i in meeting_infos]
+
+    def _is_need_bili(self):
+        return self.community in settings.COMMUNITY_BILI
+
+    def _checkpoint(self, job, status, **kwargs):
+        """the status of job only moves forward, and the artifacts are saved with it"""
+        job.status = max(job.status, status.value)
+        for key, value in kwargs.items():
+            setattr(job, key, value)
+        self.recording_job_dao.update_by_id(job.id, status=job.status, **kwargs)
+
+    @staticmethod
+    def _is_downloaded(job, video_path):
+        return job.total_bytes > 0 and os.path.exists(video_path) and os.path.getsize(video_path) == job.total_bytes
+
+    def _is_stream(self, job, meeting):
+        return settings.RECORDING_STREAM_TO_OBS and job.status < RecordingJobStatus.OBS_UPLOADED.value and \
+            meeting["upload_status"] == UploadStatus.INIT.value
+
+    @staticmethod
+    def _get_lease_until():
+        return get_cur_date() + datetime.timedelta(seconds=settings.RECORDING_JOB_LEASE)
+
+    def run_stage(self, stage, task):
+        """run the stage of task, and record the time and the error of stage into the job. the lease of job is renewed
+        before the stage, and the task is dropped if the lease was taken over by the other node"""
+        job = task["job"]
+        if not self.recording_job_dao.renew(job.id, self.lease_owner, self._get_lease_until()):
+            logger.info("[HandleRecording/run_stage] {}/{}: the lease is taken over by the other node before {}"
+                        .format(self.community, job.mid, stage))
+            return
+        begin = time.time()
+        try:
+            return getattr(self, stage)(task)
+        except Exception as e:
+            self.recording_job_dao.update_by_id(job.id, last_error="{}: {}: {}".format(stage, type(e).__name__, e))
+            raise
+        finally:
+            self.recording_job_dao.add_time(job.id, self.stage_time_fields[stage], time.time() - begin)
+
+    @staticmethod
+    def _set_artifact(task, name, path):
+        """the artifact of task is pinned in the cache until the task leaves the pipeline"""
+        task[name] = path
+        artifact_cache.pin(path)
+
+    def download(self, task):
+        """download the video into the artifact cache, and it is resumed from the partial file. the video cached by
+        the retry or the other run is reused, and the download url is only got if the video will be streamed"""
+        job, meeting = task["job"], task["meeting"]
+        if job.video_path and self._is_downloaded(job, job.video_path) and artifact_cache.hit(job.video_path):
+            self._set_artifact(task, "video_path", job.video_path)
+            logger.info('[HandleRecording/download] {}/{}: reuse the downloaded video'
+                        .format(self.community, meeting["mid"]))
+            return task
+        video_source = self.meeting_adapter_impl.get_video_source(meeting)
+        if not video_source:
+            logger.error('[HandleRecording/download] {}/{}: get empty video source'
+                         .format(self.community, meeting["mid"]))
+            return
+        key = artifact_cache.get_key(meeting["community"], meeting["mid"], video_source.file_id)
+        video_path = artifact_cache.get_path(key, ".mp4")
+        self._set_artifact(task, "video_path", video_path)
+        if artifact_cache.hit(video_path):
+            size = os.path.getsize(video_path)
+            logger.info('[HandleRecording/download] {}/{}: reuse the cached video of {}'
+                        .format(self.community, meeting["mid"], video_source.file_id))
+            self._checkpoint(job, RecordingJobStatus.DOWNLOADED, video_path=video_path, downloaded_bytes=size,
+                             total_bytes=size)
+            return task
+        if self._is_stream(job, meeting):
+            # the download url is short-lived, so it is got again by the obs stage which opens it
+            task["is_stream"] = True
+            return task
+        partial_path = artifact_cache.get_partial_path(video_path)
+        offset = get_downloaded_size(partial_path)
+        logger.info('[HandleRecording/download] {}/{}: start to download from {} bytes'
+                    .format(self.community, meeting["mid"], offset))
+        self._checkpoint(job, RecordingJobStatus.DOWNLOADING, video_path=video_path, downloaded_bytes=offset)
+        download_big_file(video_source.url, partial_path, headers=video_source.headers)
+        size = os.path.getsize(partial_path)
+        if size == 0:
+            logger.error('[HandleRecording/download] {}/{}: download but size is 0'
+                         .format(self.community, meeting["mid"]))
+            return
+        artifact_cache.commit(video_path)
+        self._checkpoint(job, RecordingJobStatus.DOWNLOADED, downloaded_bytes=size, total_bytes=size)
+        return task
+
+    def generate_cover(self, task):
+        """the cover is addressed by the hash of its texts, and it is rendered only if it is not cached"""
+        job, meeting = task["job"], task["meeting"]
+        texts = cover_renderer.get_texts(meeting["topic"], meeting["group_name"], meeting["date"], meeting["start"],
+                                         meeting["end"])
+        cover_path = artifact_cache.get_path(cover_renderer.get_content_hash(meeting["community"], texts), ".png")
+        self._set_artifact(task, "cover_path", cover_path)
+        if not artifact_cache.hit(cover_path):
+            content = cover_renderer.render(meeting["community"], meeting["topic"], meeting["group_name"],
+                                            meeting["date"], meeting["start"], meeting["end"])
+            artifact_cache.put(cover_path, content)
+            logger.info("[HandleRecording/generate_cover] {}/{}: generate cover success"
+                        .format(self.community, meeting["mid"]))
+        self._checkpoint(job, RecordingJobStatus.COVERED, cover_path=cover_path)
+        return task
+
+    def upload_obs(self, task):
+        """upload obs, and the meeting which was uploaded to obs is passed to bili directly"""
+        job, meeting = task["job"], task["meeting"]
+        if job.status >= RecordingJobStatus.OBS_UPLOADED.value or \
+                meeting["upload_status"] == UploadStatus.UPLOAD_OBS.value:
+            self._checkpoint(job, RecordingJobStatus.OBS_UPLOADED)
+            return task
+        kwargs = dict()
+        if task.get("is_stream"):
+            video_source = self.meeting_adapter_impl.get_video_source(meeting)
+            if not video_source:
+                raise Exception("{}/{}: get empty video source".format(self.community, meeting["mid"]))
+            tee_path = artifact_cache.get_partial_path(task["video_path"]) if self._is_need_bili() else None
+            ret = self.upload_obs_adapter_impl(meeting).upload_stream(video_source, task["cover_path"], tee_path)
+            if ret and tee_path:
+                video_path = artifact_cache.commit(task["video_path"])
+                size = os.path.getsize(video_path)
+                kwargs = {"video_path": video_path, "downloaded_bytes": size, "total_bytes": size}
+        else:
+            ret = self.upload_obs_adapter_impl(meeting).upload(task["video_path"], task["cover_path"])
+        if not ret:
+            raise Exception("{}/{}: upload obs failed".format(self.community, meeting["mid"]))
+        with transaction.atomic():
+            self.meeting_dao.update_by_id(meeting["id"], upload_status=UploadStatus.UPLOAD_OBS.value)
+            self._checkpoint(job, RecordingJobStatus.OBS_UPLOADED, **kwargs)
+        meeting["upload_status"] = UploadStatus.UPLOAD_OBS.value
+        return task
+
+    def upload_bili(self, task):
+        job, meeting = task["job"], task["meeting"]
+        if not self._is_need_bili():
+            logger.info('[HandleRecording/upload_bili] {}/{}: skip to upload bili without the config of bili'
+                        .format(self.community, meeting["mid"]))
+            return
+        if not self._is_downloaded(job, task["video_path"]):
+            raise Exception("{}/{}: the video to upload bili is not found".format(self.community, meeting["mid"]))
+        replay_url = self.upload_bili_adapter_impl(meeting).upload(task["video_path"], task["cover_path"])
+        if not replay_url:
+            raise Exception("{}/{}: upload bili failed".format(self.community, meeting["mid"]))
+        with transaction.atomic():
+            self.meeting_dao.update_by_id(meeting["id"], upload_status=UploadStatus.UPLOAD_BILI.value,
+                                          replay_url=replay_url)
+            self._checkpoint(job, RecordingJobStatus.BILI_UPLOADED)
+        return task
+
+    def upload_all(self, pipeline, stop_event=None):
+        """upload all: get video --> get cover --> upload obs ---> upload bili, the meeting which was uploaded to obs
+        but failed to upload bili is retried from bili. the meeting is only put into the pipeline if this node claimed
+        the lease of its job, so that the nodes split the pending meetings, and the lease expired is taken over. no
+        more meeting is claimed after stop_event is set, and the others are left to the next start"""
+        for meeting in self.get_pending_meetings():
+            if stop_event is not None and stop_event.is_set():
+                logger.info("[HandleRecording/upload_all] {}: stop to claim the meetings".format(self.community))
+                return
+            if not self.add_in_flight(meeting["id"]):
+                logger.info("[HandleRecording/upload_all] {}/{}: skip the meeting in the pipeline"
+                            .format(self.community, meeting["mid"]))
+                continue
             try:
-                meeting = model_to_dict(meeting)
-                video_path = self._get_video_path(meeting)
-                if not video_path:
+                job = self.recording_job_dao.get_or_create(meeting)
+                if not self.recording_job_dao.claim(job.id, self.lease_owner, get_cur_date(), self._get_lease_until()):
+                    logger.info("[HandleRecording/upload_all] {}/{}: skip the meeting leased by the other node"
+                                .format(self.community, meeting["mid"]))
+                    self.remove_in_flight(meeting["id"])
                     continue
-                cover_path = self._get_video_cover_path(video_path, meeting)
-                if not cover_path:
+                # the meeting may be finished by the other node after it was listed
+                job = self.recording_job_dao.get_by_id(job.id)
+                if self.is_finished(job):
+                    self.recording_job_dao.release(job.id, self.lease_owner)
+                    self.remove_in_flight(meeting["id"])
                     continue
-                replay_url = self.upload_bili_adapter_impl(meeting).upload(video_path, cover_path)
-                if not replay_url:
-                    raise Exception("upload bili failed")
-                self.meeting_dao.update_by_id(meeting["id"], upload_status=UploadStatus.UPLOAD_BILI.value,
-                                              replay_url=replay_url)
-            except Exception as e:
-                logger.error("[HandleRecording/upload_bili] e:{}, traceback:{}".format(str(e), traceback.format_exc()))
+                self.recording_job_dao.add_attempts(job.id)
+            except Exception:
+                self.remove_in_flight(meeting["id"])
+                raise
+            # the lease is renewed while the put is blocked by the full queue, and until the meeting leaves the pipeline
+            heartbeat = LeaseHeartbeat(self, job).start()
+            pipeline.put({"handler": self, "meeting": meeting, "job": job, "heartbeat": heartbeat})
+
+    def is_finished(self, job):
+        if job.status >= RecordingJobStatus.BILI_UPLOADED.value:
+            return True
+        return job.status >= RecordingJobStatus.OBS_UPLOADED.value and not self._is_need_bili()
+
+    def add_in_flight(self, meeting_id):
+        """return False if the meeting is in the pipeline, because the daemon polls it again before it finished"""
+        with self._in_flight_lock:
+            if meeting_id in self._in_flight:
+                return False
+            self._in_flight.add(meeting_id)
+            return True
+
+    def remove_in_flight(self, meeting_id):
+        with self._in_flight_lock:
+            self._in_flight.discard(meeting_id)
+
+
+class LeaseHeartbeat:
+    """renew the lease of job in the background until the meeting leaves the pipeline, because the transfer of stage
+    and the wait in the queues may exceed the lease which is renewed at the beginning of every stage"""
+
+    def __init__(self, handler, job):
+        self.handler = handler
+        self.job = job
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-{}".format(job.id), daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        try:
+            while not self._stop_event.wait(settings.RECORDING_JOB_LEASE_RENEW_INTERVAL):
+                close_old_connections()
+                try:
+                    if not self.handler.recording_job_dao.renew(self.job.id, self.handler.lease_owner,
+                                                                self.handler._get_lease_until()):
+                        logger.info("[LeaseHeartbeat/_run] {}/{}: the lease is taken over by the other node"
+                                    .format(self.handler.community, self.job.mid))
+                        return
+                except Exception as e:
+                    logger.error("[LeaseHeartbeat/_run] {}/{}: renew the lease err:{}"
+                                 .format(self.handler.community, self.job.mid, e))
+        finally:
+            connections.close_all()
+
+
+def _clear_task(task):
+    """unpin the artifacts and release the lease when the meeting leaves the pipeline, and the artifacts are kept in
+    the artifact cache for the retry and the next run until they are evicted"""
+    handler = task["handler"]
+    if task.get("heartbeat"):
+        task["heartbeat"].stop()
+    for name in ["video_path", "cover_path"]:
+        if task.get(name):
+            artifact_cache.unpin(task[name])
+    handler.recording_job_dao.release(task["job"].id, handler.lease_owner)
+    handler.remove_in_flight(task["meeting"]["id"])
 
 
-def work_flow(handle_recording: HandleRecording):
+def get_recording_pipeline():
+    """the stages have their own workers, and the hand-off between the stages is bounded by the queue size"""
+    workers = settings.RECORDING_PIPELINE_WORKERS
+    queue_size = settings.RECORDING_PIPELINE_QUEUE_SIZE
+    stages = [
+        Stage("download", lambda task: task["handler"].run_stage("download", task), workers["download"], queue_size),
+        Stage("cover", lambda task: task["handler"].run_stage("generate_cover", task), workers["cover"], queue_size),
+        Stage("obs", lambda task: task["handler"].run_stage("upload_obs", task), workers["obs"], queue_size),
+        Stage("bili", lambda task: task["handler"].run_stage("upload_bili", task), workers["bili"], queue_size),
+    ]
+    return StagePipeline("recording", stages, on_exit=_clear_task, on_worker_exit=connections.close_all)
+
+
+def work_flow(handle_recording: HandleRecording, pipeline: StagePipeline, stop_event=None):
     """按照社区进行分类操作
         1.先将之前上传B站的数据状态更新
-        2.下载本地再上传到OBS, 再上传bilibili
+        2.将待上传的会议放入流水线: 下载本地, 生成封面, 再上传到OBS, 再上传bilibili
     :param handle_recording:
+    :param pipeline:
+    :param stop_event: 守护进程收到停止信号后不再领取新的会议
     :return:
     """
     try:
         handle_recording.refresh_upload_status()
-        handle_recording.upload_all()
-        handle_recording.upload_bili()
+        handle_recording.upload_all(pipeline, stop_event)
     except Exception as e:
         logger.error("[work_flow] e:{}, traceback:{}".format(e, traceback.format_exc()))
 
 
+class RecordingScheduler:
+    """poll every community in its own thread on its own interval with the jitter until stopped, so that the
+    community blocked by the full pipeline does not delay the others. the pipeline, the clients of platforms and the
+    artifact cache are kept warm between the polls"""
+
+    def __init__(self, handle_recordings, pipeline):
+        self.handle_recordings = handle_recordings
+        self.pipeline = pipeline
+        self._stop_event = threading.Event()
+
+    def stop(self, *_):
+        logger.info("[RecordingScheduler/stop] receive the signal to stop")
+        self._stop_event.set()
+
+    @staticmethod
+    def get_interval(community):
+        interval = settings.RECORDING_SCHEDULE_INTERVALS.get(community, settings.RECORDING_SCHEDULE_INTERVAL)
+        return interval + random.uniform(0, settings.RECORDING_SCHEDULE_JITTER)
+
+    def _poll(self, handle_recording):
+        community = handle_recording.community
+        self._stop_event.wait(random.uniform(0, settings.RECORDING_SCHEDULE_JITTER))
+        try:
+            while not self._stop_event.is_set():
+                close_old_connections()
+                RecordingIndex.invalidate(community)
+                work_flow(handle_recording, self.pipeline, self._stop_event)
+                self._stop_event.wait(self.get_interval(community))
+        finally:
+            connections.close_all()
+
+    def run(self):
+        """the meetings in the pipeline are finished after stopped, and the others are left to the next start"""
+        threads = list()
+        for handle_recording in self.handle_recordings:
+            t = threading.Thread(target=self._poll, args=(handle_recording,),
+                                 name="poll-{}".format(handle_recording.community), daemon=True)
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+
+
 def clear_env():
+    """clear the temp files, and the artifact cache of recordings is kept for the retry and the next run"""
     tmpdir = get_temp_dir()
-    rm_dir(tmpdir)
+    cache_dir = os.path.abspath(settings.RECORDING_CACHE_DIR)
+    for name in os.listdir(tmpdir):
+        path = os.path.join(tmpdir, name)
+        if os.path.abspath(path) == cache_dir:
+            continue
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                rm_dir(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            logger.error("[clear_env] fail to remove {}, err:{}".format(path, e))
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument("--daemon", action="store_true",
+                            help="poll the recordings of every community on the interval until SIGTERM")
+
+    def _show_metrics(self, pipeline):
+        for metric in pipeline.get_metrics():
+            content = "[handle_recordings] stage {name}(workers:{max_workers}): received {received}, " \
+                      "succeeded {succeeded}, dropped {dropped}, failed {failed}, avg {busy_s_avg}s, " \
+                      "max {busy_s_max}s, {per_minute}/min".format(**metric)
+            logger.info(content)
+            self.stdout.write(content)
+
     def handle(self, *args, **options):
         logger.info('-' * 20 + ' start to handler recordings' + '-' * 20)
         logger.info('[handle] find community: {}'.format(",".join(settings.COMMUNITY_SUPPORT)))
         try:
             handler_recording_communities = [HandleRecording(i) for i in settings.COMMUNITY_SUPPORT]
-            pool = ThreadPool()
-            pool.map(work_flow, handler_recording_communities)
-            pool.close()
-            pool.join()
+            # the recordings of every host are listed once in this run, or once in every poll of the daemon
+            with RecordingIndex.scope():
+                with get_recording_pipeline() as pipeline:
+                    if options["daemon"]:
+                        scheduler = RecordingScheduler(handler_recording_communities, pipeline)
+                        signal.signal(signal.SIGTERM, scheduler.stop)
+                        signal.signal(signal.SIGINT, scheduler.stop)
+                        scheduler.run()
+                    else:
+                        pool = ThreadPool()
+                        pool.map(functools.partial(work_flow, pipeline=pipeline), handler_recording_communities)
+                        pool.close()
+                        pool.join()
+            self._show_metrics(pipeline)
             logger.info('-' * 20 + 'All done' + '-' * 20)
         except Exception as e:
             logger.error("[handle_recordings/handle] err:{}, traceback:{}".format(str(e), traceback.format_exc()))
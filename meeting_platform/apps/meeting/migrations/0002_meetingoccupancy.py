@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2024-09-11 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeetingOccupancy',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('community', models.CharField(max_length=16, verbose_name='社区')),
+                ('platform', models.CharField(max_length=16, verbose_name='会议所属平台')),
+                ('date', models.CharField(max_length=32, verbose_name='会议日期')),
+                ('occupancy', models.TextField(default='{}', verbose_name='host的占用位图')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='修改时间')),
+            ],
+            options={
+                'verbose_name': 'meeting_occupancy',
+                'verbose_name_plural': 'meeting_occupancy',
+                'db_table': 'meeting_occupancy',
+                'unique_together': {('community', 'platform', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2024-09-11 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0002_meetingoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['community', 'platform', 'date', 'is_delete'],
+                               name='meetings_comm_plat_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['community', 'upload_status', 'is_record', 'is_delete'],
+                               name='meetings_comm_upload_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['community', 'mid'], name='meetings_comm_mid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['-date', 'start', 'is_delete'], name='meetings_date_start_del_idx'),
+        ),
+    ]
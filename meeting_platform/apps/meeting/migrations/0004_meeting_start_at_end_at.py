@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2024-09-12 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0003_meeting_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='start_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='会议开始日期时间'),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='end_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='会议结束日期时间'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['community', 'platform', 'start_at', 'is_delete'],
+                               name='meetings_comm_plat_start_idx'),
+        ),
+    ]
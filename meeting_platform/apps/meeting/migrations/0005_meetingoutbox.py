@@ -0,0 +1,40 @@
+# Generated by Django 4.2.16 on 2024-09-13 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0004_meeting_start_at_end_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeetingOutbox',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64, unique=True,
+                                                     verbose_name='幂等键: mid-sequence-channel')),
+                ('community', models.CharField(max_length=16, verbose_name='社区')),
+                ('mid', models.CharField(max_length=32, verbose_name='会议id')),
+                ('sequence', models.IntegerField(verbose_name='会议修改次数')),
+                ('action', models.CharField(max_length=16, verbose_name='通知类型: create/update/delete')),
+                ('channel', models.CharField(max_length=16, verbose_name='通知渠道: email/kafka')),
+                ('payload', models.TextField(verbose_name='会议信息')),
+                ('status', models.SmallIntegerField(choices=[(0, '待发送'), (1, '已发送'), (2, '重试耗尽发送失败')],
+                                                    default=0, verbose_name='发送状态')),
+                ('attempts', models.IntegerField(default=0, verbose_name='发送次数')),
+                ('next_retry_at', models.DateTimeField(verbose_name='下次发送时间')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='最后一次错误')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='修改时间')),
+            ],
+            options={
+                'verbose_name': 'meeting_outbox',
+                'verbose_name_plural': 'meeting_outbox',
+                'db_table': 'meeting_outbox',
+                'indexes': [models.Index(fields=['status', 'next_retry_at'], name='meeting_outbox_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.16 on 2024-09-14 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0005_meetingoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeetingOperation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation_id', models.CharField(max_length=32, unique=True, verbose_name='操作id')),
+                ('action', models.CharField(max_length=16, verbose_name='操作类型: create/update/delete')),
+                ('meeting_id', models.IntegerField(verbose_name='会议主键')),
+                ('params', models.TextField(verbose_name='操作参数')),
+                ('status', models.SmallIntegerField(choices=[(0, '等待执行'), (1, '执行中'), (2, '执行成功'), (3, '执行失败')],
+                                                    default=0, verbose_name='执行状态')),
+                ('code', models.IntegerField(blank=True, null=True, verbose_name='失败的错误码')),
+                ('lease_until', models.DateTimeField(blank=True, null=True, verbose_name='执行租约到期时间')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='修改时间')),
+            ],
+            options={
+                'verbose_name': 'meeting_operation',
+                'verbose_name_plural': 'meeting_operation',
+                'db_table': 'meeting_operation',
+                'indexes': [models.Index(fields=['status', 'create_time'], name='meeting_operation_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2024-09-16 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0006_meetingoperation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BiliVideo',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('community', models.CharField(max_length=16, verbose_name='社区')),
+                ('bvid', models.CharField(max_length=32, unique=True, verbose_name='B站视频id')),
+                ('created', models.DateTimeField(verbose_name='B站视频发布时间')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': 'bili_video',
+                'verbose_name_plural': 'bili_video',
+                'db_table': 'bili_video',
+                'indexes': [models.Index(fields=['community', 'created'], name='bili_video_comm_created_idx')],
+            },
+        ),
+    ]
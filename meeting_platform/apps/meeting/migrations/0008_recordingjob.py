@@ -0,0 +1,45 @@
+# Generated by Django 4.2.16 on 2024-09-17 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0007_bilivideo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordingJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('meeting_id', models.IntegerField(unique=True, verbose_name='会议主键')),
+                ('community', models.CharField(max_length=16, verbose_name='社区')),
+                ('mid', models.CharField(max_length=32, verbose_name='会议id')),
+                ('status', models.SmallIntegerField(choices=[(0, '待处理'), (1, '下载中'), (2, '已经下载'),
+                                                             (3, '已经生成封面'), (4, '已经上传OBS'),
+                                                             (5, '已经上传BILI'), (6, 'BILI审核通过')],
+                                                    default=0, verbose_name='处理状态')),
+                ('video_path', models.CharField(blank=True, default='', max_length=256,
+                                                verbose_name='本地视频路径')),
+                ('cover_path', models.CharField(blank=True, default='', max_length=256,
+                                                verbose_name='本地封面路径')),
+                ('downloaded_bytes', models.BigIntegerField(default=0, verbose_name='已下载字节数')),
+                ('total_bytes', models.BigIntegerField(default=0, verbose_name='视频总字节数')),
+                ('attempts', models.IntegerField(default=0, verbose_name='处理次数')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='最后一次错误')),
+                ('download_time', models.FloatField(default=0, verbose_name='下载累计耗时(s)')),
+                ('cover_time', models.FloatField(default=0, verbose_name='生成封面累计耗时(s)')),
+                ('obs_time', models.FloatField(default=0, verbose_name='上传OBS累计耗时(s)')),
+                ('bili_time', models.FloatField(default=0, verbose_name='上传BILI累计耗时(s)')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='修改时间')),
+            ],
+            options={
+                'verbose_name': 'recording_job',
+                'verbose_name_plural': 'recording_job',
+                'db_table': 'recording_job',
+            },
+        ),
+    ]
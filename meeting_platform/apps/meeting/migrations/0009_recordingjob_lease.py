@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2024-09-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0008_recordingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recordingjob',
+            name='lease_owner',
+            field=models.CharField(blank=True, default='', max_length=128, verbose_name='租约持有节点'),
+        ),
+        migrations.AddField(
+            model_name='recordingjob',
+            name='lease_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='处理租约到期时间'),
+        ),
+    ]
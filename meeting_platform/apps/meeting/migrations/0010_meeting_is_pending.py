@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2024-09-19 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0009_recordingjob_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='is_pending',
+            field=models.BooleanField(default=False, verbose_name='是否等待创建'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2024-09-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0010_meeting_is_pending'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meetingoperation',
+            index=models.Index(fields=['meeting_id', 'status'], name='meeting_operation_meeting_idx'),
+        ),
+    ]
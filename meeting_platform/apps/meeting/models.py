@@ -7,6 +7,9 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from meeting.domain.primitive.operation_status import OperationStatus
+from meeting.domain.primitive.outbox_status import OutboxStatus
+from meeting.domain.primitive.recording_job_status import RecordingJobStatus
 from meeting.domain.primitive.upload_status import UploadStatus
 
 
@@ -32,6 +35,8 @@ class Meeting(models.Model):
     date = models.CharField(verbose_name='会议日期', max_length=32)
     start = models.CharField(verbose_name='会议开始时间', max_length=32)
     end = models.CharField(verbose_name='会议结束时间', max_length=32)
+    start_at = models.DateTimeField(verbose_name='会议开始日期时间', null=True, blank=True)
+    end_at = models.DateTimeField(verbose_name='会议结束日期时间', null=True, blank=True)
     agenda = models.TextField(verbose_name='会议议程', default='', null=True, blank=True)
     etherpad = models.CharField(verbose_name='会议纪要etherpad', max_length=256, null=True, blank=True)
     email_list = models.TextField(verbose_name='邮件列表', null=True, blank=True)
@@ -46,6 +51,8 @@ class Meeting(models.Model):
     update_time = models.DateTimeField(verbose_name='修改时间', null=True, blank=True)
     sequence = models.IntegerField(verbose_name='修改次数', default=1)
     is_delete = models.BooleanField(verbose_name='是否删除', default=False)
+    # the meeting created asynchronously only reserves the host until it was created by the provider
+    is_pending = models.BooleanField(verbose_name='是否等待创建', default=False)
 
     objects = models.Manager()
 
@@ -53,6 +60,155 @@ class Meeting(models.Model):
         db_table = "meetings"
         verbose_name = "meetings"
         verbose_name_plural = verbose_name
+        # mysql does not support the partial index, so is_delete is put into the composite indexes instead
+        indexes = [
+            # check the conflict meetings and the occupancy of hosts in date
+            models.Index(fields=["community", "platform", "date", "is_delete"], name="meetings_comm_plat_date_idx"),
+            # the range scan of the meetings in the dates
+            models.Index(fields=["community", "platform", "start_at", "is_delete"],
+                         name="meetings_comm_plat_start_idx"),
+            # get the meetings which are waiting for uploading by the status
+            models.Index(fields=["community", "upload_status", "is_record", "is_delete"],
+                         name="meetings_comm_upload_idx"),
+            # update the status of uploading by mid
+            models.Index(fields=["community", "mid"], name="meetings_comm_mid_idx"),
+            # list the meetings which are ordered by date desc and start by default
+            models.Index(fields=["-date", "start", "is_delete"], name="meetings_date_start_del_idx"),
+        ]
 
     def __str__(self):
         return "{}/{}/{}".format(self.community, self.mid, self.topic)
+
+
+class MeetingOccupancy(models.Model):
+    """the occupancy bitmap of hosts in one day"""
+    community = models.CharField(verbose_name="社区", max_length=16)
+    platform = models.CharField(verbose_name="会议所属平台", max_length=16)
+    date = models.CharField(verbose_name='会议日期', max_length=32)
+    occupancy = models.TextField(verbose_name='host的占用位图', default='{}')
+    update_time = models.DateTimeField(verbose_name='修改时间', auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        db_table = "meeting_occupancy"
+        verbose_name = "meeting_occupancy"
+        verbose_name_plural = verbose_name
+        unique_together = ("community", "platform", "date")
+
+    def __str__(self):
+        return "{}/{}/{}".format(self.community, self.platform, self.date)
+
+
+class MeetingOutbox(models.Model):
+    """the notification of meeting which is written with the change of meeting in the same transaction"""
+    idempotency_key = models.CharField(verbose_name='幂等键: mid-sequence-channel', max_length=64, unique=True)
+    community = models.CharField(verbose_name="社区", max_length=16)
+    mid = models.CharField(verbose_name='会议id', max_length=32)
+    sequence = models.IntegerField(verbose_name='会议修改次数')
+    action = models.CharField(verbose_name='通知类型: create/update/delete', max_length=16)
+    channel = models.CharField(verbose_name='通知渠道: email/kafka', max_length=16)
+    payload = models.TextField(verbose_name='会议信息')
+    status = models.SmallIntegerField(verbose_name="发送状态", choices=OutboxStatus.to_tuple(), default=0)
+    attempts = models.IntegerField(verbose_name='发送次数', default=0)
+    next_retry_at = models.DateTimeField(verbose_name='下次发送时间')
+    last_error = models.TextField(verbose_name='最后一次错误', default='', blank=True)
+    create_time = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
+    update_time = models.DateTimeField(verbose_name='修改时间', auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        db_table = "meeting_outbox"
+        verbose_name = "meeting_outbox"
+        verbose_name_plural = verbose_name
+        indexes = [
+            # get the notifications which are due to send
+            models.Index(fields=["status", "next_retry_at"], name="meeting_outbox_status_idx"),
+        ]
+
+    def __str__(self):
+        return self.idempotency_key
+
+
+class MeetingOperation(models.Model):
+    """the asynchronous create/update/delete of meeting, and the provider is called by the worker"""
+    operation_id = models.CharField(verbose_name='操作id', max_length=32, unique=True)
+    action = models.CharField(verbose_name='操作类型: create/update/delete', max_length=16)
+    meeting_id = models.IntegerField(verbose_name='会议主键')
+    params = models.TextField(verbose_name='操作参数')
+    status = models.SmallIntegerField(verbose_name="执行状态", choices=OperationStatus.to_tuple(), default=0)
+    code = models.IntegerField(verbose_name='失败的错误码', null=True, blank=True)
+    lease_until = models.DateTimeField(verbose_name='执行租约到期时间', null=True, blank=True)
+    create_time = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
+    update_time = models.DateTimeField(verbose_name='修改时间', auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        db_table = "meeting_operation"
+        verbose_name = "meeting_operation"
+        verbose_name_plural = verbose_name
+        indexes = [
+            # get the operations which are waiting or interrupted
+            models.Index(fields=["status", "create_time"], name="meeting_operation_status_idx"),
+            # check the unfinished operations of meeting before changing it
+            models.Index(fields=["meeting_id", "status"], name="meeting_operation_meeting_idx"),
+        ]
+
+    def __str__(self):
+        return "{}/{}".format(self.action, self.operation_id)
+
+
+class BiliVideo(models.Model):
+    """the published videos of bilibili, which are indexed incrementally by handle_recordings"""
+    community = models.CharField(verbose_name="社区", max_length=16)
+    bvid = models.CharField(verbose_name='B站视频id', max_length=32, unique=True)
+    created = models.DateTimeField(verbose_name='B站视频发布时间')
+    create_time = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        db_table = "bili_video"
+        verbose_name = "bili_video"
+        verbose_name_plural = verbose_name
+        indexes = [
+            # get the high water mark of the indexed videos
+            models.Index(fields=["community", "created"], name="bili_video_comm_created_idx"),
+        ]
+
+    def __str__(self):
+        return "{}/{}".format(self.community, self.bvid)
+
+
+class RecordingJob(models.Model):
+    """the checkpoints of handling the recording of meeting, so that the retry resumes from the last checkpoint"""
+    meeting_id = models.IntegerField(verbose_name='会议主键', unique=True)
+    community = models.CharField(verbose_name="社区", max_length=16)
+    mid = models.CharField(verbose_name='会议id', max_length=32)
+    status = models.SmallIntegerField(verbose_name="处理状态", choices=RecordingJobStatus.to_tuple(), default=0)
+    video_path = models.CharField(verbose_name='本地视频路径', max_length=256, default='', blank=True)
+    cover_path = models.CharField(verbose_name='本地封面路径', max_length=256, default='', blank=True)
+    downloaded_bytes = models.BigIntegerField(verbose_name='已下载字节数', default=0)
+    total_bytes = models.BigIntegerField(verbose_name='视频总字节数', default=0)
+    attempts = models.IntegerField(verbose_name='处理次数', default=0)
+    last_error = models.TextField(verbose_name='最后一次错误', default='', blank=True)
+    download_time = models.FloatField(verbose_name='下载累计耗时(s)', default=0)
+    cover_time = models.FloatField(verbose_name='生成封面累计耗时(s)', default=0)
+    obs_time = models.FloatField(verbose_name='上传OBS累计耗时(s)', default=0)
+    bili_time = models.FloatField(verbose_name='上传BILI累计耗时(s)', default=0)
+    lease_owner = models.CharField(verbose_name='租约持有节点', max_length=128, default='', blank=True)
+    lease_until = models.DateTimeField(verbose_name='处理租约到期时间', null=True, blank=True)
+    create_time = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
+    update_time = models.DateTimeField(verbose_name='修改时间', auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        db_table = "recording_job"
+        verbose_name = "recording_job"
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return "{}/{}".format(self.community, self.mid)
@@ -8,10 +8,13 @@
 
 from django.urls import path
 
-from meeting.controller.inner import MeetingView, SingleMeetingView, MeetingParticipantsView
+from meeting.controller.inner import MeetingView, SingleMeetingView, MeetingParticipantsView, \
+    MeetingFreeSlotsView, MeetingOperationView
 
 urlpatterns = [
     path('meeting/', MeetingView.as_view()),  # 预定会议/会议列表
     path('meeting/<int:id>/', SingleMeetingView.as_view()),  # 修改/删除/查询单个会议
     path('meeting/participants/<int:id>/', MeetingParticipantsView.as_view()),  # 查询会议参与人
+    path('meeting/free_slots/', MeetingFreeSlotsView.as_view()),  # 查询host的空闲时间段
+    path('meeting/operation/<str:operation_id>/', MeetingOperationView.as_view()),  # 查询异步操作的状态
 ]
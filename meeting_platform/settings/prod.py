@@ -7,6 +7,7 @@ For the full list of settings and their values, see
 import ssl
 import os
 import sys
+import tempfile
 import yaml
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -224,11 +225,94 @@ COMMUNITY_BILI = VAULT_CONF["COMMUNITY_BILI"]
 
 # https请求超市时间
 REQUEST_TIMEOUT = (120, 120)
+# https请求连接池: 每个(平台, host)缓存的连接数以及单个连接池的最大连接数
+REQUEST_POOL_CONNECTIONS = 10
+REQUEST_POOL_MAXSIZE = 20
+# 第三方token在过期前提前刷新的时间,单位秒
+TOKEN_REFRESH_AHEAD = 300
+# welink代理鉴权token未返回有效期时的默认有效时长,单位秒
+WELINK_TOKEN_DEFAULT_EXPIRE = 3600
+# zoom的token在进程内缓存的时间, 过期后通过etag/last-modified重新校验obs上的token,单位秒
+ZOOM_TOKEN_REVALIDATE_TTL = 300
+
+# 发送会议通知的后台线程数量, 队列长度, 队列满时的等待时间以及进程退出时等待队列执行完的时间,单位秒
+MESSAGE_EXECUTOR_WORKERS = 4
+MESSAGE_EXECUTOR_QUEUE_SIZE = 100
+MESSAGE_EXECUTOR_SUBMIT_TIMEOUT = 1
+MESSAGE_EXECUTOR_DRAIN_TIMEOUT = 20
+
+# kafka生产者批量发送的等待时间(ms), 批大小(byte), 压缩方式, 缓冲区满或获取元数据时的最大阻塞时间(ms)以及进程退出时flush的超时时间(s)
+KAFKA_LINGER_MS = 50
+KAFKA_BATCH_SIZE = 64 * 1024
+KAFKA_COMPRESSION_TYPE = "gzip"
+KAFKA_MAX_BLOCK_MS = 10000
+KAFKA_CLOSE_TIMEOUT = 10
+
+# 每个smtp服务(host, port, user)的最大连接数, 获取连接的等待时间以及空闲连接的最大复用时间,单位秒
+SMTP_POOL_MAX_SIZE = 4
+SMTP_POOL_ACQUIRE_TIMEOUT = 30
+SMTP_POOL_IDLE_TIMEOUT = 120
+
+# 异步预定/修改/删除会议的后台线程数量, 队列长度, 队列满时的等待时间, 进程退出时等待队列执行完的时间以及单个操作的租约时间,单位秒
+OPERATION_EXECUTOR_WORKERS = 4
+OPERATION_EXECUTOR_QUEUE_SIZE = 50
+OPERATION_EXECUTOR_SUBMIT_TIMEOUT = 0.5
+OPERATION_EXECUTOR_DRAIN_TIMEOUT = 20
+MEETING_OPERATION_LEASE = 600
+# 补偿执行异步操作的命令每批处理的数量以及轮询间隔,单位秒
+MEETING_OPERATION_BATCH_SIZE = 20
+MEETING_OPERATION_INTERVAL = 5
+
+# 会议通知发件箱: 每批发送数量, 无待发送通知时的轮询间隔(s), 每个渠道的并发数, 最大发送次数, 指数退避的初始和最大间隔(s),
+# 领取通知后的租约时间(s)以及等待kafka发送结果的超时时间(s)
+MEETING_OUTBOX_BATCH_SIZE = 100
+MEETING_OUTBOX_INTERVAL = 5
+MEETING_OUTBOX_CHANNEL_WORKERS = {"email": 4, "kafka": 2}
+MEETING_OUTBOX_MAX_ATTEMPTS = 8
+MEETING_OUTBOX_BACKOFF_BASE = 10
+MEETING_OUTBOX_BACKOFF_MAX = 3600
+MEETING_OUTBOX_LEASE = 300
+MEETING_OUTBOX_SEND_TIMEOUT = 30
+
+# 录制处理流水线: 下载/生成封面/上传OBS/上传B站各阶段的并发数, 以及阶段之间待处理队列的长度
+RECORDING_PIPELINE_WORKERS = {"download": 2, "cover": 2, "obs": 2, "bili": 1}
+RECORDING_PIPELINE_QUEUE_SIZE = 2
+# 多个节点同时处理录制时, 单个会议录制任务的租约时间(s), 每个阶段开始时续约, 过期后可被其他节点接管
+RECORDING_JOB_LEASE = 3600
+# 会议录制任务在流水线中(排队和执行阶段)时后台续约租约的间隔(s), 需小于租约时间
+RECORDING_JOB_LEASE_RENEW_INTERVAL = 600
+# 以--daemon运行录制处理时每个社区的轮询间隔(s), 可按社区单独配置, 以及每次轮询间隔上增加的随机抖动(s)
+RECORDING_SCHEDULE_INTERVAL = 300
+RECORDING_SCHEDULE_INTERVALS = dict()
+RECORDING_SCHEDULE_JITTER = 60
+# 录制视频和封面的本地缓存目录以及缓存的总大小上限, 重试和下次运行时复用缓存, 超过上限时淘汰最久未使用的文件
+RECORDING_CACHE_DIR = os.path.join(tempfile.gettempdir(), "recording_cache")
+RECORDING_CACHE_MAX_BYTES = 50 * 1024 * 1024 * 1024
+# 录制缓存中未完成的下载文件(可续传)的保留时间(s), 超过后且没有任务使用时被清理
+RECORDING_CACHE_PARTIAL_TTL = 7 * 24 * 3600
+# 录制视频是否从会议平台直接流式上传到OBS(仅在需要上传B站时同时写入本地文件), 以及分段上传每段的大小
+RECORDING_STREAM_TO_OBS = True
+RECORDING_STREAM_PART_SIZE = 16 * 1024 * 1024
+# 生成录制封面的字体以及缓存的封面数量
+COVER_FONT_PATH = "/usr/share/fonts/simsun.ttc"
+COVER_CACHE_SIZE = 64
+# 下载大文件时的写缓冲大小, 中断后的重试次数和间隔(s), 支持Range时的分段并发数以及分段下载的最小文件大小
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_RETRY_DELAY = 2
+DOWNLOAD_SEGMENTS = 4
+DOWNLOAD_SEGMENT_MIN_SIZE = 64 * 1024 * 1024
+
+# 回填会议start_at/end_at时每批处理的会议数量以及每批之间的间隔,单位秒
+MEETING_BACKFILL_BATCH_SIZE = 500
+MEETING_BACKFILL_INTERVAL = 0.1
 
 # 上传B站最小视频大小
 BILI_VIDEO_MIN_SIZE = 1024 * 1024 * 10
 # 上传B站的有效时间,单位day
 BILI_UPLOAD_DATE = 7
+# 增量索引B站视频时, 早于已索引的最新视频发布时间超过该值(s)的已知视频之后不再翻页, 以覆盖审核较慢的视频
+BILI_VIDEO_INDEX_OVERLAP = 3 * 24 * 3600
 
 CONF = None
 VAULT_CONF = None
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/18 11:20
+# @Author  : Tom_zc
+# @FileName: test_artifact_cache.py
+# @Software: PyCharm
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from meeting_platform.utils.artifact_cache import ArtifactCache
+
+
+class ArtifactCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(RECORDING_CACHE_DIR=self.tmpdir.name,
+                                                   RECORDING_CACHE_MAX_BYTES=250,
+                                                   RECORDING_CACHE_PARTIAL_TTL=3600)
+        self.settings_override.enable()
+        self.cache = ArtifactCache()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmpdir.cleanup()
+
+    def _put(self, name, mtime):
+        path = self.cache.get_path(self.cache.get_key("openEuler", "123456", name), ".mp4")
+        self.cache.put(path, b"0" * 100)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_commit(self):
+        path = self.cache.get_path(self.cache.get_key("openEuler", "123456", "file"), ".mp4")
+        self.assertFalse(self.cache.hit(path))
+        partial_path = self.cache.get_partial_path(path)
+        with open(partial_path, "wb") as f:
+            f.write(b"video")
+        # the partial file is not hit until it is committed
+        self.assertFalse(self.cache.hit(path))
+        self.cache.commit(path)
+        self.assertTrue(self.cache.hit(path))
+        self.assertFalse(os.path.exists(partial_path))
+
+    def test_evict_lru(self):
+        first = self._put("first", 1000)
+        second = self._put("second", 2000)
+        # the first is used recently, and the second is evicted
+        self.assertTrue(self.cache.hit(first))
+        third = self._put("third", 3000)
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertTrue(os.path.exists(third))
+
+    def test_evict_skip_pinned(self):
+        first = self._put("first", 1000)
+        self.cache.pin(first)
+        second = self._put("second", 2000)
+        self._put("third", 3000)
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.cache.unpin(first)
+        self.assertEqual(self.cache.evict(), 0)
+        self._put("fourth", 4000)
+        self.assertFalse(os.path.exists(first))
+
+    def test_evict_skip_pinned_by_other_process(self):
+        first = self._put("first", 1000)
+        # the other process shares the cache, and its pin is visible by the lock file of artifact
+        other = ArtifactCache()
+        other.pin(first)
+        self._put("second", 2000)
+        self._put("third", 3000)
+        self.assertTrue(os.path.exists(first))
+        other.unpin(first)
+        self._put("fourth", 4000)
+        self.assertFalse(os.path.exists(first))
+
+    def test_evict_partial_files(self):
+        path = self.cache.get_path(self.cache.get_key("openEuler", "123456", "file"), ".mp4")
+        self.cache.pin(path)
+        partial_path = self.cache.get_partial_path(path)
+        for i in [partial_path, partial_path + ".part", partial_path + ".progress"]:
+            with open(i, "wb") as f:
+                f.write(b"0" * 300)
+            os.utime(i, (1000, 1000))
+        # the partial files are not evicted by the budget, and the expired ones are kept while pinned
+        self._put("first", 1000)
+        self.assertEqual(self.cache.evict(), 0)
+        self.assertTrue(os.path.exists(partial_path + ".part"))
+        self.cache.unpin(path)
+        self.assertEqual(self.cache.evict(), 3)
+        self.assertFalse(os.path.exists(partial_path))
+        self.assertFalse(os.path.exists(partial_path + ".progress"))
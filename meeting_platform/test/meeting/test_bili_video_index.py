@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/16 16:10
+# @Author  : Tom_zc
+# @FileName: test_bili_video_index.py
+# @Software: PyCharm
+import datetime
+
+from django.test import override_settings
+
+from meeting.domain.primitive.upload_status import UploadStatus
+from meeting.management.commands.handle_recordings import HandleRecording
+from meeting.models import BiliVideo
+from meeting_platform.test.meeting.test_base import TestCommonMeeting
+
+
+class FakeBiliAdapterImpl:
+    """the videos are listed from the newest, 2 videos in one page"""
+    videos = list()
+    pages = 0
+
+    def __init__(self, community):
+        self.community = community
+
+    def iter_video_pages(self):
+        for i in range(0, len(self.videos), 2):
+            FakeBiliAdapterImpl.pages += 1
+            yield self.videos[i:i + 2]
+
+    def get_bvid(self, replay_url):
+        return replay_url.rsplit("/", 1)[-1] if replay_url else None
+
+
+@override_settings(COMMUNITY_BILI={"openEuler": dict()})
+class BiliVideoIndexTest(TestCommonMeeting):
+    now = datetime.datetime(2024, 9, 16, 12, 0)
+    data = {
+        "sponsor": "Tom",
+        "group_name": "group_temp",
+        "community": "openEuler",
+        "topic": "meeting unitest bili topic",
+        "platform": "WELINK",
+        "date": "2024-09-12",
+        "start": "08:00",
+        "end": "09:00",
+        "is_record": True,
+        "upload_status": UploadStatus.UPLOAD_BILI.value,
+    }
+
+    def setUp(self):
+        FakeBiliAdapterImpl.videos = list()
+        FakeBiliAdapterImpl.pages = 0
+        self.handler = HandleRecording("openEuler")
+        self.handler.bili_adapter_impl = FakeBiliAdapterImpl
+
+    def _publish(self, bvid, days_ago):
+        created = int((self.now - datetime.timedelta(days=days_ago)).timestamp())
+        FakeBiliAdapterImpl.videos.insert(0, {"bvid": bvid, "created": created})
+
+    def test_refresh_upload_status_ok(self):
+        passed = self.create_meeting(mid="1", replay_url="https://www.bilibili.com/video/BV1", **self.data)
+        waiting = self.create_meeting(mid="2", replay_url="https://www.bilibili.com/video/BV2", **self.data)
+        self._publish("BV0", 30)
+        self._publish("BV1", 20)
+        self.handler.refresh_upload_status()
+        passed.refresh_from_db()
+        waiting.refresh_from_db()
+        self.assertEqual(passed.upload_status, UploadStatus.UPLOAD_ALL.value)
+        self.assertEqual(waiting.upload_status, UploadStatus.UPLOAD_BILI.value)
+        self.assertEqual(BiliVideo.objects.count(), 2)
+
+    def test_index_incrementally(self):
+        for i in range(10):
+            self._publish("BV{}".format(i), 100 - i * 10)
+        self.assertEqual(self.handler._index_bili_videos(FakeBiliAdapterImpl("openEuler")), 10)
+        self.assertEqual(FakeBiliAdapterImpl.pages, 5)
+        # only the first pages are listed until the known video older than the overlap
+        FakeBiliAdapterImpl.pages = 0
+        self._publish("BV10", 0)
+        self._publish("BV11", 0)
+        self._publish("BV12", 0)
+        self.assertEqual(self.handler._index_bili_videos(FakeBiliAdapterImpl("openEuler")), 3)
+        self.assertEqual(FakeBiliAdapterImpl.pages, 3)
+        self.assertEqual(BiliVideo.objects.count(), 13)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/16 11:05
+# @Author  : Tom_zc
+# @FileName: test_cover_renderer.py
+# @Software: PyCharm
+import io
+from unittest import mock
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from meeting_platform.utils.cover_renderer import CoverRenderer
+
+
+class CoverRendererTest(SimpleTestCase):
+    cover = ("openEuler", "meeting unitest cover topic", "sig-test", "2024-09-12", "08:00", "09:00")
+
+    def setUp(self):
+        self.renderer = CoverRenderer()
+
+    def test_render_ok(self):
+        content = self.renderer.render(*self.cover)
+        image = Image.open(io.BytesIO(content))
+        self.assertEqual(image.format, "PNG")
+        self.assertEqual(image.size, (1024, 688))
+        with Image.open(self.renderer.get_background_path("openEuler")) as background:
+            self.assertNotEqual(image.convert("RGBA").tobytes(), background.convert("RGBA").tobytes())
+
+    def test_render_cached(self):
+        with mock.patch.object(self.renderer, "_draw", wraps=self.renderer._draw) as draw:
+            first = self.renderer.render(*self.cover)
+            second = self.renderer.render(*self.cover)
+            self.renderer.render("openGauss", *self.cover[1:])
+        self.assertEqual(first, second)
+        self.assertEqual(draw.call_count, 2)
+
+    def test_render_long_topic_wrapped(self):
+        renderer = self.renderer
+        image = renderer._get_background("openEuler")
+        draw = mock.Mock(textlength=lambda text, font: len(text) * 50)
+        lines = renderer._wrap(draw, "开源" * 20, renderer._get_font(100), image.width - 2 * renderer.margin)
+        self.assertEqual(len(lines), 3)
+        self.assertEqual("".join(lines), "开源" * 20)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/13 11:05
+# @Author  : Tom_zc
+# @FileName: test_email_template.py
+# @Software: PyCharm
+from django.test import SimpleTestCase
+
+from meeting.infrastructure.adapter.message_adapter_impl.email_adapter_impl import EmailTemplate
+from meeting_platform.utils.template_cache import CompiledTemplate, template_cache
+
+
+class CompiledTemplateTest(SimpleTestCase):
+
+    def test_render_ok(self):
+        template = CompiledTemplate("{{sig_name}} at {{start_time}}, {x} {{sig_name}}")
+        self.assertEqual(template.render(sig_name="sig", start_time="08:00"), "sig at 08:00, {x} sig")
+
+    def test_render_missing_placeholder(self):
+        template = CompiledTemplate("{{topic}}-{{summary}}")
+        self.assertEqual(template.render(topic="topic"), "topic-{{summary}}")
+
+
+class EmailTemplateTest(SimpleTestCase):
+    meeting = {
+        "email_list": "a@example.com;b@example.com",
+        "topic": "meeting topic",
+        "etherpad": "https://etherpad.openeuler.org/p/sig",
+        "join_url": "https://meeting.example.com/123456",
+        "group_name": "sig-test",
+        "agenda": "the {agenda} of meeting",
+        "is_record": True,
+        "platform": "WELINK",
+        "date": "2024-09-12",
+        "start": "08:00",
+        "end": "09:00",
+        "community": "openEuler",
+        "mid": "123456",
+    }
+
+    def setUp(self):
+        template_cache.clear()
+
+    def _get_body(self, **kwargs):
+        meeting = dict(self.meeting, **kwargs)
+        content = EmailTemplate(meeting).get_create_meeting_template_by_meetings_info()
+        return content.get_payload(decode=True).decode("utf-8")
+
+    def test_create_template_ok(self):
+        for agenda in ["", self.meeting["agenda"]]:
+            for is_record in [False, True]:
+                body = self._get_body(agenda=agenda, is_record=is_record)
+                self.assertNotIn("{{", body)
+                self.assertIn("sig-test", body)
+                self.assertIn("2024-09-12 08:00", body)
+                self.assertIn("WeLink", body)
+                self.assertEqual(self.meeting["agenda"] in body, bool(agenda))
+
+    def test_delete_template_ok(self):
+        content = EmailTemplate(self.meeting).get_delete_meeting_template_by_meeting_info()
+        body = content.get_payload(decode=True).decode("utf-8")
+        self.assertNotIn("{{", body)
+        self.assertIn("sig-test", body)
+        self.assertIn("2024-09-12 08:00", body)
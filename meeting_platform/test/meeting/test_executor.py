@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/12 17:30
+# @Author  : Tom_zc
+# @FileName: test_executor.py
+# @Software: PyCharm
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from meeting_platform.utils.executor import BoundedExecutor, EXIT_PRIORITY_CLOSE, EXIT_PRIORITY_DRAIN, \
+    register_exit_hook, _run_exit_hooks
+
+
+class BoundedExecutorTest(SimpleTestCase):
+    def setUp(self):
+        self.executors = list()
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        for executor in self.executors:
+            executor.shutdown()
+            BoundedExecutor._executors.pop(executor.name, None)
+
+    def _get_executor(self, name, caller_runs=True):
+        # 1 worker and 1 slot of queue, so that the third task finds the queue full
+        executor = BoundedExecutor(name, 1, 1, 0.05, 5, caller_runs=caller_runs)
+        self.executors.append(executor)
+        return executor
+
+    def _fill(self, executor):
+        """block the worker, and fill the queue"""
+        started = threading.Event()
+        executor.submit(lambda: (started.set(), self.release.wait(5)))
+        started.wait(5)
+        executor.submit(self.release.wait, 5)
+
+    def test_caller_runs_when_full(self):
+        executor = self._get_executor("test-caller-runs")
+        self._fill(executor)
+        threads = list()
+        self.assertTrue(executor.submit(lambda: threads.append(threading.current_thread())))
+        # the task runs in the caller as backpressure
+        self.assertEqual(threads, [threading.current_thread()])
+        metrics = executor.get_metrics()
+        self.assertEqual(metrics["submitted"], 3)
+        self.assertEqual(metrics["caller_runs"], 1)
+        self.assertEqual(metrics["queue_depth"], 1)
+
+    def test_reject_when_full(self):
+        executor = self._get_executor("test-reject", caller_runs=False)
+        self._fill(executor)
+        called = list()
+        self.assertFalse(executor.submit(called.append, 1))
+        self.assertEqual(called, list())
+        self.assertEqual(executor.get_metrics()["rejected"], 1)
+
+    def test_drain_on_shutdown(self):
+        executor = BoundedExecutor("test-drain", 2, 10, 0.05, 5)
+        self.executors.append(executor)
+        done = list()
+        for i in range(6):
+            executor.submit(lambda x: (time.sleep(0.05), done.append(x)), i)
+        executor.submit(lambda: 1 / 0)
+        executor.shutdown()
+        # the queued tasks are finished before shutdown returns, and the failed task is counted
+        self.assertEqual(sorted(done), list(range(6)))
+        metrics = executor.get_metrics()
+        self.assertEqual(metrics["completed"], 7)
+        self.assertEqual(metrics["failed"], 1)
+        self.assertEqual(metrics["alive_workers"], 0)
+        # the task submitted after shutdown runs in the caller
+        executor.submit(done.append, 6)
+        self.assertEqual(done[-1], 6)
+        self.assertEqual(executor.get_metrics()["caller_runs"], 1)
+
+
+class ExitHookTest(SimpleTestCase):
+    def test_run_in_priority(self):
+        called = list()
+
+        def close():
+            called.append("close")
+
+        def drain():
+            called.append("drain")
+            # the client is used by the task drained at exit, and its hook is registered after the others ran
+            register_exit_hook(lambda: called.append("close_late"))
+
+        with mock.patch("meeting_platform.utils.executor._exit_hooks", list()):
+            # the client hook is registered before the executor hook
+            register_exit_hook(close, EXIT_PRIORITY_CLOSE)
+            register_exit_hook(drain, EXIT_PRIORITY_DRAIN)
+            _run_exit_hooks()
+            self.assertEqual(called, ["drain", "close", "close_late"])
+            # the hooks are run once
+            _run_exit_hooks()
+            self.assertEqual(len(called), 3)
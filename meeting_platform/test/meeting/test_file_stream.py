@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/15 15:20
+# @Author  : Tom_zc
+# @FileName: test_file_stream.py
+# @Software: PyCharm
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from meeting_platform.utils.file_stream import download_big_file, get_downloaded_size
+
+
+class FakeServer:
+    """serve the content with Range, and the stream is broken after break_after bytes for break_times. the requests
+    after the first fail_from ones respond fail_status for fail_times"""
+
+    def __init__(self, content, accept_ranges=True, break_after=None, break_times=0, fail_status=None, fail_times=0,
+                 fail_from=0):
+        self.content = content
+        self.accept_ranges = accept_ranges
+        self.break_after = break_after
+        self.break_times = break_times
+        self.fail_status = fail_status
+        self.fail_times = fail_times
+        self.fail_from = fail_from
+        self.calls = 0
+        self.ranges = list()
+        self._lock = threading.Lock()
+
+    def _is_failed(self):
+        with self._lock:
+            self.calls += 1
+            if self.calls <= self.fail_from or self.fail_times <= 0:
+                return False
+            self.fail_times -= 1
+            return True
+
+    def _is_broken(self):
+        with self._lock:
+            if self.break_times <= 0:
+                return False
+            self.break_times -= 1
+            return True
+
+    def get(self, url, headers=None, stream=True, timeout=None):
+        total = len(self.content)
+        match = re.match(r"bytes=(\d+)-(\d*)", (headers or dict()).get("Range", ""))
+        response = mock.MagicMock()
+        response.__enter__.return_value = response
+        if self._is_failed():
+            response.status_code = self.fail_status
+            response.raise_for_status.side_effect = requests.HTTPError(str(self.fail_status), response=response)
+            return response
+        if match and self.accept_ranges:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else total - 1
+            self.ranges.append((start, end))
+            if start >= total:
+                response.status_code = 416
+                return response
+            body = self.content[start:end + 1]
+            response.status_code = 206
+            response.headers = {"Content-Range": "bytes {}-{}/{}".format(start, end, total)}
+        else:
+            body = self.content
+            response.status_code = 200
+            response.headers = {"Content-Length": str(total)}
+        is_broken = self.break_after is not None and len(body) > self.break_after and self._is_broken()
+
+        def iter_content(chunk_size=None):
+            for i in range(0, len(body), 100):
+                if is_broken and i >= self.break_after:
+                    raise requests.ConnectionError("the connection is broken")
+                yield body[i:i + 100]
+
+        response.iter_content.side_effect = iter_content
+        return response
+
+
+@override_settings(DOWNLOAD_CHUNK_SIZE=256, DOWNLOAD_RETRY_DELAY=0, DOWNLOAD_SEGMENTS=4, DOWNLOAD_SEGMENT_MIN_SIZE=1000)
+class DownloadBigFileTest(SimpleTestCase):
+    content = os.urandom(5000)
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "video.mp4")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _download(self, server, **kwargs):
+        with mock.patch("meeting_platform.utils.file_stream.requests.get", side_effect=server.get):
+            download_big_file("https://example.com/video.mp4", self.path, **kwargs)
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_download_segments_ok(self):
+        server = FakeServer(self.content, break_after=300, break_times=2)
+        checksum = ("md5", hashlib.md5(self.content).hexdigest())
+        self.assertEqual(self._download(server, checksum=checksum), self.content)
+        # the probe and 4 segments, and the broken segments are resumed from the offset
+        self.assertIn((0, 1249), server.ranges)
+        self.assertEqual(len(server.ranges), 1 + 4 + 2)
+
+    def test_download_segments_resume_ok(self):
+        server = FakeServer(self.content, break_after=300, break_times=4)
+        with self.settings(DOWNLOAD_RETRIES=0):
+            with self.assertRaises(Exception):
+                self._download(server)
+        self.assertEqual(get_downloaded_size(self.path), 4 * 300)
+        # the second call resumes the segments from the saved offsets instead of the byte 0
+        server = FakeServer(self.content)
+        self.assertEqual(self._download(server), self.content)
+        self.assertEqual(sorted(server.ranges[1:]), [(300, 1249), (1550, 2499), (2800, 3749), (4050, 4999)])
+        self.assertFalse(os.path.exists(self.path + ".part"))
+        self.assertFalse(os.path.exists(self.path + ".progress"))
+
+    def test_download_stream_resume_ok(self):
+        server = FakeServer(self.content, break_after=2000, break_times=1)
+        with self.settings(DOWNLOAD_SEGMENTS=1):
+            self.assertEqual(self._download(server), self.content)
+        self.assertEqual(server.ranges, [(2000, 4999)])
+
+    def test_download_stream_without_range_ok(self):
+        server = FakeServer(self.content, accept_ranges=False, break_after=2000, break_times=1)
+        self.assertEqual(self._download(server), self.content)
+
+    def test_download_checksum_failed(self):
+        server = FakeServer(self.content)
+        with self.assertRaises(Exception):
+            self._download(server, checksum=("md5", "0" * 32))
+
+    def test_download_segments_retry_5xx(self):
+        # the segments respond 503 after the probe
+        server = FakeServer(self.content, fail_status=503, fail_times=3, fail_from=1)
+        self.assertEqual(self._download(server), self.content)
+        self.assertEqual(server.calls, 1 + 4 + 3)
+
+    def test_download_fail_fast_on_4xx(self):
+        server = FakeServer(self.content, fail_status=403, fail_times=10)
+        with self.assertRaises(requests.HTTPError):
+            self._download(server)
+        # the probe and the stream are not retried
+        self.assertEqual(server.calls, 2)
+        server = FakeServer(self.content, fail_status=403, fail_times=10, fail_from=1)
+        with self.assertRaises(requests.HTTPError):
+            self._download(server)
+        self.assertEqual(server.calls, 1 + 4)
+
+    @override_settings(DOWNLOAD_RETRIES=1)
+    def test_download_retries_failed(self):
+        server = FakeServer(self.content, break_after=100, break_times=10)
+        with self.settings(DOWNLOAD_SEGMENTS=1):
+            with self.assertRaises(Exception):
+                self._download(server)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/11 15:20
+# @Author  : Tom_zc
+# @FileName: test_host_occupancy.py
+# @Software: PyCharm
+from django.db import transaction
+from django.test import SimpleTestCase
+
+from meeting.application.meeting import MeetingApp
+from meeting.domain.primitive.host_occupancy import HostOccupancy, get_free_ranges, time_to_minutes
+from meeting_platform.test.meeting.test_base import TestCommonMeeting
+
+
+class HostOccupancyTest(SimpleTestCase):
+    def test_touching_intervals(self):
+        occupancy = HostOccupancy.build([("host1", "09:00", "10:00")])
+        # [start, end) touching the occupied interval is free
+        self.assertTrue(occupancy.is_free("host1", time_to_minutes("08:00"), time_to_minutes("09:00")))
+        self.assertTrue(occupancy.is_free("host1", time_to_minutes("10:00"), time_to_minutes("11:00")))
+        self.assertFalse(occupancy.is_free("host1", time_to_minutes("08:00"), time_to_minutes("09:01")))
+        self.assertFalse(occupancy.is_free("host1", time_to_minutes("09:59"), time_to_minutes("11:00")))
+        self.assertTrue(occupancy.is_free("host2", time_to_minutes("09:00"), time_to_minutes("10:00")))
+
+    def test_buffer_edges(self):
+        occupancy = HostOccupancy.build([("host1", "09:00", "10:00")])
+        hosts = ["host1", "host2"]
+        # the meeting must be at least buffer minutes away from the meeting of the same host
+        self.assertEqual(occupancy.get_free_hosts(hosts, "10:30", "11:00", buffer=30), hosts)
+        self.assertEqual(occupancy.get_free_hosts(hosts, "10:29", "11:00", buffer=30), ["host2"])
+        self.assertEqual(occupancy.get_free_hosts(hosts, "08:00", "08:30", buffer=30), hosts)
+        self.assertEqual(occupancy.get_free_hosts(hosts, "08:00", "08:31", buffer=30), ["host2"])
+
+    def test_merged_overlaps(self):
+        occupancy = HostOccupancy.build([("host1", "11:00", "12:00"), ("host1", "09:00", "10:30"),
+                                         ("host1", "10:00", "11:00"), ("host1", "14:00", "15:00")])
+        # the overlapped and touching intervals are merged into 09:00-12:00
+        self.assertFalse(occupancy.is_free("host1", time_to_minutes("11:30"), time_to_minutes("11:45")))
+        self.assertTrue(occupancy.is_free("host1", time_to_minutes("12:00"), time_to_minutes("14:00")))
+        self.assertFalse(occupancy.is_free("host1", time_to_minutes("13:00"), time_to_minutes("16:00")))
+        self.assertEqual(get_free_ranges(occupancy.to_bitmaps()["host1"]),
+                         ["08:00-09:00", "12:00-14:00", "15:00-22:00"])
+
+    def test_bitmap_free_ranges(self):
+        occupancy = HostOccupancy.build([("host1", "09:10", "10:00")])
+        bitmap = occupancy.to_bitmaps()["host1"]
+        # the partial slot is occupied, and the buffer is extended by slots
+        self.assertEqual(get_free_ranges(bitmap), ["08:00-09:00", "10:00-22:00"])
+        self.assertEqual(get_free_ranges(bitmap, buffer_slots=2), ["08:00-08:30", "10:30-22:00"])
+        self.assertEqual(get_free_ranges(bitmap, begin_minutes=time_to_minutes("12:05")), ["12:15-22:00"])
+
+
+class MeetingOccupancyTest(TestCommonMeeting):
+    data = {
+        "sponsor": "Tom",
+        "group_name": "group_temp",
+        "community": "openEuler",
+        "topic": "meeting unitest occupancy topic",
+        "platform": "WELINK",
+        "date": "2024-09-12",
+        "host_id": "host1",
+        "mid": "123456",
+    }
+
+    def test_exclude_meeting_id(self):
+        meeting = self.create_meeting(start="09:00", end="10:00", **self.data)
+        app = MeetingApp()
+        occupancy = app.get_host_occupancy("openEuler", "WELINK", "2024-09-12")
+        self.assertEqual(occupancy.get_free_hosts(["host1"], "09:30", "10:30"), list())
+        # the meeting which is updating is excluded, so that it could be moved to the overlapped time
+        occupancy = app.get_host_occupancy("openEuler", "WELINK", "2024-09-12", meeting.id)
+        self.assertEqual(occupancy.get_free_hosts(["host1"], "09:30", "10:30"), ["host1"])
+
+    def test_refresh_in_transaction(self):
+        app = MeetingApp()
+        self.create_meeting(start="09:00", end="10:00", **self.data)
+        self.assertEqual(app.refresh_occupancy("openEuler", "WELINK", "2024-09-12"),
+                         {"2024-09-12": {"host1": 0b1111 << 4}})
+        # the bitmap is rolled back with the meetings which were changed in the same transaction
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                self.create_meeting(start="11:00", end="12:00", **self.data)
+                app.refresh_occupancy("openEuler", "WELINK", "2024-09-12")
+                raise ValueError("rollback")
+        self.assertEqual(app._get_occupancy_bitmaps("openEuler", "WELINK", ["2024-09-12"]),
+                         {"2024-09-12": {"host1": 0b1111 << 4}})
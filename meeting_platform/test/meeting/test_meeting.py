@@ -16,8 +16,10 @@ from rest_framework import status
 from django.conf import settings
 
 from meeting.application.meeting import MeetingApp
+from meeting.domain.primitive.upload_status import UploadStatus
 from meeting_platform.test.meeting.constant import xss_script, html_text, crlf_text
 from meeting_platform.test.meeting.test_base import TestCommonMeeting
+from meeting_platform.utils.customized.my_pagination import MyCursorPagination
 from meeting_platform.utils.ret_api import MyInnerError
 from meeting_platform.utils.ret_code import RetCode
 
@@ -622,6 +624,31 @@ class ListMeetingViewTest(TestCommonMeeting):
         self.assertEqual(len(ret.data["data"]), 1)
         self._teardown()
 
+    def test_list_by_cursor_ok(self):
+        user = self._setup()
+        for start, end in [("08:00", "09:00"), ("10:00", "11:00"), ("12:00", "13:00")]:
+            data = copy.deepcopy(CreateMeetingViewTest.data)
+            data["sponsor"] = user.username
+            data["start"] = start
+            data["end"] = end
+            self.create_meeting(**data)
+        ret = self.client.get(self.url, {"cursor": "", "size": 2, "count": "exact"})
+        self.assertEqual(ret.status_code, status.HTTP_200_OK)
+        self.assertEqual(ret.data["total"], 3)
+        self.assertEqual([i["start"] for i in ret.data["data"]], ["08:00", "10:00"])
+        ret = self.client.get(self.url, {"cursor": ret.data["next"], "size": 2})
+        self.assertEqual(ret.status_code, status.HTTP_200_OK)
+        self.assertIsNone(ret.data["total"])
+        self.assertIsNone(ret.data["next"])
+        self.assertEqual([i["start"] for i in ret.data["data"]], ["12:00"])
+        ret = self.client.get(self.url, {"cursor": "invalid"})
+        self.assertEqual(ret.status_code, status.HTTP_400_BAD_REQUEST)
+        for values in [["2024-09-12", "08:00", "1"], ["2024-13-12", "08:00", 1], ["2024-09-12", 8, 1]]:
+            ret = self.client.get(self.url, {"cursor": MyCursorPagination.encode_cursor(values)})
+            self.assertEqual(ret.status_code, status.HTTP_400_BAD_REQUEST)
+        self.clear_meetings()
+        self.clear_user()
+
 
 class GetMeetingViewTest(TestCommonMeeting):
     url = "/inner/v1/meeting/meeting/{}/"
@@ -708,3 +735,188 @@ class GetMeetingParticipantsViewTest(TestCommonMeeting):
         ret = self.client.get(self.url.format(meeting.id))
         self.assertEqual(ret.status_code, status.HTTP_200_OK)
         self._teardown()
+
+
+class GetMeetingFreeSlotsViewTest(TestCommonMeeting):
+    url = "/inner/v1/meeting/meeting/free_slots/"
+
+    def _setup(self):
+        user = self.create_user()
+        self.enable_client_auth(user.username)
+        return user
+
+    def _teardown(self):
+        self.clear_meetings()
+        self.clear_user()
+
+    def _get_params(self, days=1):
+        date = str(datetime.datetime.now().date() + timedelta(days=days))
+        return {
+            "community": "openEuler",
+            "platform": "WELINK",
+            "start_date": date,
+            "end_date": date,
+        }
+
+    def test_params_date_failed(self):
+        self._setup()
+        params = self._get_params()
+        params["start_date"] = str(datetime.datetime.now().date() - timedelta(days=1))
+        ret = self.client.get(self.url, params)
+        self.assertEqual(ret.status_code, status.HTTP_400_BAD_REQUEST)
+        params = self._get_params()
+        params["end_date"] = str(datetime.datetime.now().date() + timedelta(days=60))
+        ret = self.client.get(self.url, params)
+        self.assertEqual(ret.status_code, status.HTTP_400_BAD_REQUEST)
+        params = self._get_params(days=2)
+        params["end_date"] = str(datetime.datetime.now().date() + timedelta(days=1))
+        ret = self.client.get(self.url, params)
+        self.assertEqual(ret.status_code, status.HTTP_400_BAD_REQUEST)
+        self._teardown()
+
+    def test_params_platform_failed(self):
+        self._setup()
+        params = self._get_params()
+        params["platform"] = "NOT_EXIST"
+        ret = self.client.get(self.url, params)
+        self.assertEqual(ret.status_code, status.HTTP_400_BAD_REQUEST)
+        self._teardown()
+
+    def test_get_free_slots_ok(self):
+        user = self._setup()
+        data = copy.deepcopy(CreateMeetingViewTest.data)
+        data["start"] = "10:00"
+        data["end"] = "11:00"
+        data["host_id"] = settings.COMMUNITY_HOST[data["community"]][data["platform"]][0]["HOST"]
+        data["sponsor"] = user.username
+        self.create_meeting(**data)
+        params = self._get_params()
+        ret = self.client.get(self.url, params)
+        self.assertEqual(ret.status_code, status.HTTP_200_OK)
+        free_slots = ret.json()["data"][params["start_date"]]
+        self.assertEqual(free_slots[data["host_id"]], ["08:00-09:30", "11:30-22:00"])
+        self.assertEqual(len(free_slots), len(settings.COMMUNITY_HOST[data["community"]][data["platform"]]))
+        self._teardown()
+
+
+class AsyncMeetingViewTest(TestCommonMeeting):
+    url = "/inner/v1/meeting/meeting/?async=true"
+    operation_url = "/inner/v1/meeting/meeting/operation/{}/"
+
+    def _setup(self):
+        user = self.create_user()
+        self.enable_client_auth(user.username)
+        return user
+
+    def _teardown(self):
+        self.clear_meetings()
+        self.clear_user()
+
+    def _create_async(self):
+        data = copy.deepcopy(CreateMeetingViewTest.data)
+        with self.captureOnCommitCallbacks(execute=False):
+            ret = self.client.post(self.url, data)
+        self.assertEqual(ret.status_code, status.HTTP_202_ACCEPTED)
+        return ret.json()["data"]
+
+    @mock.patch("meeting.infrastructure.adapter.meeting_adapter_impl.meeting_adapter_impl.MeetingAdapterImpl.create")
+    def test_create_async_ok(self, mock_create):
+        self._setup()
+        mock_create.return_value = ("123456", "123456", "https://meeting.example.com/123456")
+        data = self._create_async()
+        ret = self.client.get(self.operation_url.format(data["operation_id"]))
+        self.assertEqual(ret.json()["data"]["status"], "pending")
+        # the host is reserved by the pending meeting, which is not listed or handled as recording
+        self.assertEqual(self.get_meetings().get(id=data["id"]).mid, "")
+        ret = self.client.get(ListMeetingViewTest.url)
+        self.assertEqual(ret.data["total"], 0)
+        self.assertFalse(MeetingApp.meeting_dao.get_upload_all_by_community_and_status(
+            CreateMeetingViewTest.data["community"], UploadStatus.INIT.value).exists())
+        with self.captureOnCommitCallbacks(execute=False):
+            self.assertTrue(MeetingApp().execute_operation(data["operation_id"]))
+        ret = self.client.get(self.operation_url.format(data["operation_id"]))
+        self.assertEqual(ret.status_code, status.HTTP_200_OK)
+        self.assertEqual(ret.json()["data"]["status"], "success")
+        self.assertEqual(self.get_meetings().get(id=data["id"]).mid, "123456")
+        ret = self.client.get(ListMeetingViewTest.url)
+        self.assertEqual(ret.data["total"], 1)
+        # the operation is executed only once
+        self.assertFalse(MeetingApp().execute_operation(data["operation_id"]))
+        self._teardown()
+
+    @mock.patch("meeting.infrastructure.adapter.meeting_adapter_impl.meeting_adapter_impl.MeetingAdapterImpl.create")
+    def test_create_async_failed(self, mock_create):
+        self._setup()
+        mock_create.side_effect = MyInnerError(RetCode.STATUS_MEETING_FAILED_CREATE)
+        data = self._create_async()
+        MeetingApp().execute_operation(data["operation_id"])
+        ret = self.client.get(self.operation_url.format(data["operation_id"]))
+        self.assertEqual(ret.json()["data"]["status"], "failed")
+        self.assertEqual(ret.json()["data"]["code"], RetCode.STATUS_MEETING_FAILED_CREATE)
+        # the reserved host is released
+        self.assertTrue(self.get_meetings().get(id=data["id"]).is_delete)
+        self._teardown()
+
+    def _update_async(self, username):
+        data = copy.deepcopy(CreateMeetingViewTest.data)
+        data["host_id"] = secrets.choice(MeetingApp()._get_and_check_conflict_meetings_by_date(data))
+        data["sponsor"] = username
+        data["mid"] = "123456"
+        meeting = self.create_meeting(**data)
+        with self.captureOnCommitCallbacks(execute=False):
+            ret = self.client.put(UpdateMeetingViewTest.url.format(meeting.id) + "?async=true",
+                                  UpdateMeetingViewTest.data)
+        self.assertEqual(ret.status_code, status.HTTP_202_ACCEPTED)
+        return meeting, ret.json()["data"]
+
+    @mock.patch("meeting.infrastructure.adapter.meeting_adapter_impl.meeting_adapter_impl.MeetingAdapterImpl.update")
+    def test_update_async_failed_restore(self, mock_update):
+        user = self._setup()
+        mock_update.side_effect = MyInnerError(RetCode.STATUS_MEETING_FAILED_UPDATE)
+        meeting, data = self._update_async(user.username)
+        MeetingApp().execute_operation(data["operation_id"])
+        restored = self.get_meetings().get(id=meeting.id)
+        self.assertEqual(restored.topic, CreateMeetingViewTest.data["topic"])
+        self.assertEqual(restored.sequence, meeting.sequence)
+        self._teardown()
+
+    @mock.patch("meeting.infrastructure.adapter.meeting_adapter_impl.meeting_adapter_impl.MeetingAdapterImpl.update")
+    def test_update_async_failed_not_overwrite_later(self, mock_update):
+        user = self._setup()
+        mock_update.side_effect = MyInnerError(RetCode.STATUS_MEETING_FAILED_UPDATE)
+        meeting, data = self._update_async(user.username)
+        # the meeting is changed by the later update before the failed operation is compensated
+        self.get_meetings().filter(id=meeting.id).update(topic="meeting unitest later topic",
+                                                          sequence=meeting.sequence + 2)
+        MeetingApp().execute_operation(data["operation_id"])
+        later = self.get_meetings().get(id=meeting.id)
+        self.assertEqual(later.topic, "meeting unitest later topic")
+        self.assertEqual(later.sequence, meeting.sequence + 2)
+        self._teardown()
+
+    @mock.patch("meeting.infrastructure.adapter.meeting_adapter_impl.meeting_adapter_impl.MeetingAdapterImpl.update")
+    def test_update_async_one_at_a_time(self, mock_update):
+        user = self._setup()
+        meeting, data = self._update_async(user.username)
+        # the second update and the delete are rejected until the first update is executed
+        later_data = dict(UpdateMeetingViewTest.data, topic="meeting unitest later topic")
+        with self.captureOnCommitCallbacks(execute=False):
+            ret = self.client.put(UpdateMeetingViewTest.url.format(meeting.id) + "?async=true", later_data)
+        self.assertEqual(ret.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.captureOnCommitCallbacks(execute=False):
+            ret = self.client.delete(UpdateMeetingViewTest.url.format(meeting.id) + "?async=true")
+        self.assertEqual(ret.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.captureOnCommitCallbacks(execute=False):
+            self.assertTrue(MeetingApp().execute_operation(data["operation_id"]))
+        self.assertEqual(mock_update.call_count, 1)
+        with self.captureOnCommitCallbacks(execute=False):
+            ret = self.client.put(UpdateMeetingViewTest.url.format(meeting.id) + "?async=true", later_data)
+        self.assertEqual(ret.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.get_meetings().get(id=meeting.id).topic, "meeting unitest later topic")
+        self._teardown()
+
+    def test_get_operation_not_exist(self):
+        self._setup()
+        ret = self.client.get(self.operation_url.format("not_exist"))
+        self.assertEqual(ret.status_code, status.HTTP_400_BAD_REQUEST)
+        self._teardown()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/11 16:20
+# @Author  : Tom_zc
+# @FileName: test_meeting_dao.py
+# @Software: PyCharm
+import datetime
+import json
+import logging
+from unittest import skipUnless
+
+from django.db import connection
+
+from meeting.domain.primitive.upload_status import UploadStatus
+from meeting.infrastructure.dao.meeting_dao import MeetingDao
+from meeting.management.commands.backfill_meeting_datetime import BackfillMeetingDatetime
+from meeting.models import Meeting
+from meeting_platform.test.meeting.test_base import TestCommonMeeting
+
+logger = logging.getLogger("log")
+
+
+def get_used_keys(plan):
+    """get the keys chosen by the optimizer from the query plan of mysql in json"""
+    keys = list()
+    if isinstance(plan, dict):
+        if isinstance(plan.get("table"), dict) and plan["table"].get("key"):
+            keys.append(plan["table"]["key"])
+        for value in plan.values():
+            keys.extend(get_used_keys(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            keys.extend(get_used_keys(value))
+    return keys
+
+
+@skipUnless(connection.vendor == "mysql", "the query plan is only checked on mysql")
+class MeetingDaoQueryPlanTest(TestCommonMeeting):
+    """the hot queries of MeetingDao must use the indexes"""
+    community = "openEuler"
+    platform = "WELINK"
+    date = "2024-09-12"
+
+    @classmethod
+    def setUpTestData(cls):
+        # the optimizer prefers the full scan of the tiny table, so the table is filled with the other meetings
+        meetings = list()
+        for i in range(2000):
+            start_at = datetime.datetime(2024, 1, 1, 8) + datetime.timedelta(days=i % 365)
+            meetings.append(Meeting(sponsor="Tom", group_name="group_temp", community="community{}".format(i % 20),
+                                    topic="meeting unitest plan topic", platform=cls.platform,
+                                    date=start_at.strftime("%Y-%m-%d"), start="08:00", end="09:00",
+                                    start_at=start_at, end_at=start_at + datetime.timedelta(hours=1), mid=str(i),
+                                    upload_status=i % 4, is_record=bool(i % 2)))
+        Meeting.objects.bulk_create(meetings)
+
+    def _assert_use_index(self, queryset, index_name):
+        plan = queryset.explain(format="json")
+        logger.info("query plan:{}".format(plan))
+        self.assertIn(index_name, get_used_keys(json.loads(plan)))
+
+    def test_get_meeting_time_by_date_use_index(self):
+        queryset = MeetingDao.get_meeting_time_by_date(self.community, self.platform, self.date)
+        self._assert_use_index(queryset, "meetings_comm_plat_start_idx")
+
+    def test_get_meeting_time_by_dates_use_index(self):
+        queryset = MeetingDao.get_meeting_time_by_dates(self.community, self.platform, [self.date, "2024-09-13"])
+        self._assert_use_index(queryset, "meetings_comm_plat_start_idx")
+
+    def test_get_replay_url_by_community_and_status_use_index(self):
+        queryset = MeetingDao.get_replay_url_by_community_and_status(self.community, UploadStatus.UPLOAD_BILI.value)
+        self._assert_use_index(queryset, "meetings_comm_upload_idx")
+
+    def test_get_upload_all_by_community_and_status_use_index(self):
+        queryset = MeetingDao.get_upload_all_by_community_and_status(self.community, UploadStatus.INIT.value)
+        self._assert_use_index(queryset, "meetings_comm_upload_idx")
+
+    def test_list_meeting_use_index(self):
+        queryset = MeetingDao.get_queryset().order_by("-date", "start")
+        self._assert_use_index(queryset, "meetings_date_start_del_idx")
+
+
+class BackfillMeetingDatetimeTest(TestCommonMeeting):
+    data = {
+        "sponsor": "Tom",
+        "group_name": "group_temp",
+        "community": "openEuler",
+        "topic": "meeting unitest backfill topic",
+        "platform": "WELINK",
+        "date": "2024-09-12",
+        "start": "08:00",
+        "end": "09:15",
+        "mid": "123456",
+    }
+
+    def test_backfill_ok(self):
+        for _ in range(3):
+            self.create_meeting(**self.data)
+        total = BackfillMeetingDatetime(batch_size=2, interval=0).backfill()
+        self.assertEqual(total, 3)
+        for meeting in self.get_meetings():
+            self.assertEqual(meeting.start_at, datetime.datetime(2024, 9, 12, 8, 0))
+            self.assertEqual(meeting.end_at, datetime.datetime(2024, 9, 12, 9, 15))
+        self.assertEqual(BackfillMeetingDatetime(batch_size=2, interval=0).backfill(), 0)
+        self.clear_meetings()
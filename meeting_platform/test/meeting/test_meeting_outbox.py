@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/13 16:40
+# @Author  : Tom_zc
+# @FileName: test_meeting_outbox.py
+# @Software: PyCharm
+import datetime
+import smtplib
+from email.mime.text import MIMEText
+from unittest import mock
+
+from django.test import override_settings
+
+from meeting.application.meeting_outbox import MeetingOutboxApp
+from meeting.domain.primitive.outbox_status import OutboxStatus
+from meeting.models import MeetingOutbox
+from meeting_platform.test.meeting.test_base import TestCommonMeeting
+from meeting_platform.utils.client.email_client import SmtpConnectionPool
+
+
+class FakeMessageAdapterImpl:
+    sent = list()
+    is_failed = False
+
+    def send_message(self, meeting):
+        if self.is_failed:
+            raise Exception("send failed")
+        self.sent.append(meeting)
+
+
+class SmtpEmailAdapterImpl:
+    def send_message(self, meeting):
+        pool = SmtpConnectionPool("smtp.example.com", 25, "user", "pwd", 1, 1)
+        return pool.send_message("from@example.com", "to@example.com", MIMEText(meeting["topic"]))
+
+
+class MeetingOutboxTest(TestCommonMeeting):
+    meeting = {
+        "id": 1,
+        "community": "openEuler",
+        "platform": "WELINK",
+        "topic": "meeting unitest outbox topic",
+        "mid": "123456",
+        "sequence": 1,
+        "start_at": datetime.datetime(2024, 9, 12, 8, 0),
+    }
+    channel_adapter_impl = {
+        "email": {"create": FakeMessageAdapterImpl},
+        "kafka": {"create": FakeMessageAdapterImpl},
+    }
+
+    def setUp(self):
+        FakeMessageAdapterImpl.sent = list()
+        FakeMessageAdapterImpl.is_failed = False
+        self.app = MeetingOutboxApp()
+        self.app.channel_adapter_impl = self.channel_adapter_impl
+
+    def tearDown(self):
+        self.app.shutdown()
+
+    def test_add_idempotent(self):
+        keys = self.app.add(self.meeting, "create")
+        self.app.add(self.meeting, "create")
+        self.assertEqual(keys, ["123456-1-email", "123456-1-kafka"])
+        self.assertEqual(MeetingOutbox.objects.count(), 2)
+
+    def test_dispatch_ok(self):
+        keys = self.app.add(self.meeting, "create")
+        self.assertEqual(self.app.dispatch_by_keys(keys), 2)
+        self.assertEqual(len(FakeMessageAdapterImpl.sent), 2)
+        self.assertEqual(FakeMessageAdapterImpl.sent[0]["start_at"], self.meeting["start_at"])
+        self.assertEqual(MeetingOutbox.objects.filter(status=OutboxStatus.SENT.value).count(), 2)
+        # the sent outbox is not sent again
+        self.assertEqual(self.app.dispatch_batch(10), 0)
+        self.assertEqual(len(FakeMessageAdapterImpl.sent), 2)
+
+    def test_dispatch_failed_retry_later(self):
+        FakeMessageAdapterImpl.is_failed = True
+        self.app.add(self.meeting, "create")
+        self.assertEqual(self.app.dispatch_batch(10), 2)
+        for outbox in MeetingOutbox.objects.all():
+            self.assertEqual(outbox.status, OutboxStatus.PENDING.value)
+            self.assertEqual(outbox.attempts, 1)
+            self.assertGreater(outbox.next_retry_at, datetime.datetime.now())
+            self.assertIn("send failed", outbox.last_error)
+        # the outbox is not due until the backoff passed
+        self.assertEqual(self.app.dispatch_batch(10), 0)
+
+    @override_settings(MEETING_OUTBOX_MAX_ATTEMPTS=1)
+    def test_dispatch_failed_after_max_attempts(self):
+        FakeMessageAdapterImpl.is_failed = True
+        self.app.add(self.meeting, "create")
+        self.app.dispatch_batch(10)
+        self.assertEqual(MeetingOutbox.objects.filter(status=OutboxStatus.FAILED.value).count(), 2)
+
+    def test_claim_once(self):
+        self.app.add(self.meeting, "create")
+        outbox = MeetingOutbox.objects.first()
+        lease_until = datetime.datetime.now() + datetime.timedelta(minutes=5)
+        self.assertTrue(self.app.meeting_outbox_dao.claim(outbox, lease_until))
+        self.assertFalse(self.app.meeting_outbox_dao.claim(outbox, lease_until))
+
+    @mock.patch("meeting.application.meeting_outbox.secrets.randbelow", return_value=0)
+    def test_backoff(self, _):
+        self.assertEqual(self.app.get_backoff_seconds(1), 10)
+        self.assertEqual(self.app.get_backoff_seconds(3), 40)
+        self.assertEqual(self.app.get_backoff_seconds(100), 3600)
+
+    @mock.patch("smtplib.SMTP")
+    def test_dispatch_email_refused_retry_later(self, smtp):
+        smtp.return_value.sendmail.side_effect = smtplib.SMTPRecipientsRefused({"to@example.com": (550, b"refused")})
+        self.app.channel_adapter_impl = {"email": {"create": SmtpEmailAdapterImpl}}
+        keys = self.app.add(self.meeting, "create")
+        self.app.dispatch_by_keys(keys)
+        outbox = MeetingOutbox.objects.get()
+        self.assertEqual(outbox.status, OutboxStatus.PENDING.value)
+        self.assertEqual(outbox.attempts, 1)
+        self.assertIn("SMTPRecipientsRefused", outbox.last_error)
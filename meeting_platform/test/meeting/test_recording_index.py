@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/14 15:20
+# @Author  : Tom_zc
+# @FileName: test_recording_index.py
+# @Software: PyCharm
+from django.test import SimpleTestCase
+
+from meeting.infrastructure.adapter.meeting_adapter_impl.apis.base_api import RecordingIndex
+
+
+class RecordingIndexTest(SimpleTestCase):
+    key = ("openEuler", "ZOOM", "host@example.com")
+
+    def setUp(self):
+        self.calls = 0
+
+    def _list_recordings(self):
+        self.calls += 1
+        return [{"id": 1, "size": 1}, {"id": 2, "size": 2}, {"id": 1, "size": 3}]
+
+    def _list_recordings_failed(self):
+        self.calls += 1
+        return None
+
+    def test_list_once_in_scope(self):
+        with RecordingIndex.scope():
+            self.assertEqual(len(RecordingIndex.get(self.key, "1", self._list_recordings, lambda x: x["id"])), 2)
+            self.assertEqual(len(RecordingIndex.get(self.key, 2, self._list_recordings, lambda x: x["id"])), 1)
+            self.assertEqual(RecordingIndex.get(self.key, 3, self._list_recordings, lambda x: x["id"]), [])
+        self.assertEqual(self.calls, 1)
+
+    def test_list_every_time_out_of_scope(self):
+        RecordingIndex.get(self.key, 1, self._list_recordings, lambda x: x["id"])
+        RecordingIndex.get(self.key, 2, self._list_recordings, lambda x: x["id"])
+        self.assertEqual(self.calls, 2)
+
+    def test_failed_not_cached(self):
+        with RecordingIndex.scope():
+            self.assertEqual(RecordingIndex.get(self.key, 1, self._list_recordings_failed, lambda x: x["id"]), [])
+            self.assertEqual(len(RecordingIndex.get(self.key, 1, self._list_recordings, lambda x: x["id"])), 2)
+        self.assertEqual(self.calls, 2)
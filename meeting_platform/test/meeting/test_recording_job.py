@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/17 14:20
+# @Author  : Tom_zc
+# @FileName: test_recording_job.py
+# @Software: PyCharm
+import datetime
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.forms import model_to_dict
+from django.test import override_settings
+
+from meeting.domain.primitive.recording_job_status import RecordingJobStatus
+from meeting.domain.primitive.upload_status import UploadStatus
+from meeting.infrastructure.adapter.meeting_adapter_impl.apis.base_api import VideoSource
+from meeting.management.commands.handle_recordings import HandleRecording, LeaseHeartbeat, _clear_task, work_flow
+from meeting.models import RecordingJob
+from meeting_platform.test.meeting.test_base import TestCommonMeeting
+
+
+class FakeMeetingAdapterImpl:
+    def __init__(self):
+        self.count = 0
+
+    def get_video_source(self, meeting):
+        # the download url is signed every time
+        self.count += 1
+        return VideoSource("https://example.com/{}.mp4?sign={}".format(meeting["mid"], self.count), None,
+                           "file-{}".format(meeting["mid"]))
+
+
+class FakeUploadAdapterImpl:
+    is_failed = False
+    uploaded = list()
+
+    def __init__(self, meeting):
+        self.meeting = meeting
+
+    def upload(self, video_path, cover_path):
+        if self.is_failed:
+            return
+        self.uploaded.append((video_path, cover_path))
+        return "https://www.bilibili.com/video/BV1"
+
+    def upload_stream(self, video_source, cover_path, tee_path=None):
+        self.uploaded.append((video_source.url, cover_path, tee_path))
+        return True
+
+
+class FakeBiliUploadAdapterImpl(FakeUploadAdapterImpl):
+    pass
+
+
+class InlinePipeline:
+    """run the stages in the caller, because the in-memory database of test is not shared with the workers"""
+    stages = ["download", "generate_cover", "upload_obs", "upload_bili"]
+
+    def put(self, task):
+        try:
+            for stage in self.stages:
+                if task["handler"].run_stage(stage, task) is None:
+                    break
+        except Exception:
+            pass
+        finally:
+            _clear_task(task)
+
+
+def fake_download_big_file(url, path, headers=None):
+    fake_download_big_file.count += 1
+    with open(path, "wb") as f:
+        f.write(b"video" * 100)
+    return path
+
+
+class RecordingJobTest(TestCommonMeeting):
+    data = {
+        "sponsor": "Tom",
+        "group_name": "group_temp",
+        "community": "openEuler",
+        "topic": "meeting unitest recording topic",
+        "platform": "WELINK",
+        "date": "2024-09-12",
+        "start": "08:00",
+        "end": "09:00",
+        "mid": "123456",
+        "is_record": True,
+    }
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(RECORDING_CACHE_DIR=self.tmpdir.name, RECORDING_STREAM_TO_OBS=False,
+                                                   COMMUNITY_BILI={"openEuler": dict()})
+        self.settings_override.enable()
+        fake_download_big_file.count = 0
+        FakeUploadAdapterImpl.uploaded = list()
+        FakeBiliUploadAdapterImpl.uploaded = list()
+        FakeBiliUploadAdapterImpl.is_failed = False
+        self.handler = HandleRecording("openEuler")
+        self.handler.meeting_adapter_impl = FakeMeetingAdapterImpl()
+        self.handler.upload_obs_adapter_impl = FakeUploadAdapterImpl
+        self.handler.upload_bili_adapter_impl = FakeBiliUploadAdapterImpl
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmpdir.cleanup()
+
+    def _run(self):
+        with mock.patch("meeting.management.commands.handle_recordings.download_big_file",
+                        side_effect=fake_download_big_file):
+            self.handler.upload_all(InlinePipeline())
+
+    def test_retry_from_checkpoint(self):
+        meeting = self.create_meeting(**self.data)
+        # 1.failed to upload bili, and the artifacts are kept
+        FakeBiliUploadAdapterImpl.is_failed = True
+        self._run()
+        job = RecordingJob.objects.get(meeting_id=meeting.id)
+        meeting.refresh_from_db()
+        self.assertEqual(job.status, RecordingJobStatus.OBS_UPLOADED.value)
+        self.assertEqual(job.total_bytes, 500)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("upload bili failed", job.last_error)
+        self.assertEqual(meeting.upload_status, UploadStatus.UPLOAD_OBS.value)
+        self.assertTrue(os.path.exists(job.video_path))
+        self.assertTrue(os.path.exists(job.cover_path))
+        # 2.retry from bili without downloading again, and the artifacts are kept in the cache
+        FakeBiliUploadAdapterImpl.is_failed = False
+        self._run()
+        job.refresh_from_db()
+        meeting.refresh_from_db()
+        self.assertEqual(fake_download_big_file.count, 1)
+        self.assertEqual(len(FakeUploadAdapterImpl.uploaded), 1)
+        self.assertEqual(job.status, RecordingJobStatus.BILI_UPLOADED.value)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(meeting.upload_status, UploadStatus.UPLOAD_BILI.value)
+        self.assertTrue(os.path.exists(job.video_path))
+
+    def test_reuse_cache_by_file_id(self):
+        meeting = self.create_meeting(**self.data)
+        FakeBiliUploadAdapterImpl.is_failed = True
+        self._run()
+        video_path = RecordingJob.objects.get(meeting_id=meeting.id).video_path
+        # the job is lost, and the video is found in the cache by the file id of platform
+        RecordingJob.objects.all().delete()
+        FakeBiliUploadAdapterImpl.is_failed = False
+        self._run()
+        job = RecordingJob.objects.get(meeting_id=meeting.id)
+        self.assertEqual(fake_download_big_file.count, 1)
+        self.assertEqual(job.video_path, video_path)
+        self.assertEqual(job.total_bytes, 500)
+        self.assertEqual(job.status, RecordingJobStatus.BILI_UPLOADED.value)
+
+    def test_checkpoint_forward(self):
+        meeting = self.create_meeting(**self.data)
+        job = self.handler.recording_job_dao.get_or_create(model_to_dict(meeting))
+        self.handler._checkpoint(job, RecordingJobStatus.DOWNLOADED)
+        # the status only moves forward
+        self.handler._checkpoint(job, RecordingJobStatus.DOWNLOADING, downloaded_bytes=10)
+        job.refresh_from_db()
+        self.assertEqual(job.status, RecordingJobStatus.DOWNLOADED.value)
+        self.assertEqual(job.downloaded_bytes, 10)
+
+    def test_skip_in_flight(self):
+        self.create_meeting(**self.data)
+        pipeline = mock.Mock()
+        self.handler.upload_all(pipeline)
+        # the daemon polls again before the meeting leaves the pipeline
+        self.handler.upload_all(pipeline)
+        self.assertEqual(pipeline.put.call_count, 1)
+        _clear_task(pipeline.put.call_args[0][0])
+        self.handler.upload_all(pipeline)
+        self.assertEqual(pipeline.put.call_count, 2)
+
+    def test_stop_claiming_after_stopped(self):
+        first = self.create_meeting(**self.data)
+        second = self.create_meeting(**dict(self.data, mid="654321", start="10:00", end="11:00"))
+        stop_event = threading.Event()
+        # the signal to stop is received while the first meeting is put into the pipeline
+        pipeline = mock.Mock()
+        pipeline.put.side_effect = lambda task: stop_event.set()
+        self.handler.upload_all(pipeline, stop_event)
+        self.assertEqual(pipeline.put.call_count, 1)
+        claimed = pipeline.put.call_args[0][0]["meeting"]["id"]
+        unclaimed = second.id if claimed == first.id else first.id
+        self.assertFalse(RecordingJob.objects.filter(meeting_id=unclaimed).exclude(lease_owner="").exists())
+
+    @override_settings(RECORDING_JOB_LEASE_RENEW_INTERVAL=0.05)
+    def test_renew_lease_until_cleared(self):
+        job = mock.Mock(id=1, mid="123456")
+        # the in-memory database of test is not shared with the thread of heartbeat
+        self.handler.recording_job_dao = mock.Mock()
+        heartbeat = LeaseHeartbeat(self.handler, job).start()
+        time.sleep(0.3)
+        self.assertGreater(self.handler.recording_job_dao.renew.call_count, 1)
+        _clear_task({"handler": self.handler, "meeting": {"id": 1}, "job": job, "heartbeat": heartbeat})
+        heartbeat._thread.join(timeout=5)
+        self.assertFalse(heartbeat._thread.is_alive())
+        self.handler.recording_job_dao.release.assert_called_once_with(1, self.handler.lease_owner)
+
+    def test_lease_between_nodes(self):
+        meeting = self.create_meeting(**self.data)
+        other = HandleRecording("openEuler")
+        other.lease_owner = "other/1"
+        pipeline, other_pipeline = mock.Mock(), mock.Mock()
+        self.handler.upload_all(pipeline)
+        # the meeting is leased by this node, and skipped by the other node
+        other.upload_all(other_pipeline)
+        self.assertEqual(pipeline.put.call_count, 1)
+        self.assertEqual(other_pipeline.put.call_count, 0)
+        # the expired lease is taken over by the other node, and this node drops the task before the next stage
+        RecordingJob.objects.filter(meeting_id=meeting.id).update(lease_until=datetime.datetime(2024, 1, 1))
+        other.upload_all(other_pipeline)
+        self.assertEqual(other_pipeline.put.call_count, 1)
+        self.assertIsNone(self.handler.run_stage("download", pipeline.put.call_args[0][0]))
+        _clear_task(pipeline.put.call_args[0][0])
+        self.assertEqual(RecordingJob.objects.get(meeting_id=meeting.id).lease_owner, "other/1")
+
+    def test_skip_finished_by_other_node(self):
+        meeting = self.create_meeting(**self.data)
+        job = self.handler.recording_job_dao.get_or_create(model_to_dict(meeting))
+        self.handler.recording_job_dao.update_by_id(job.id, status=RecordingJobStatus.BILI_UPLOADED.value)
+        pipeline = mock.Mock()
+        self.handler.upload_all(pipeline)
+        self.assertEqual(pipeline.put.call_count, 0)
+        self.assertEqual(RecordingJob.objects.get(meeting_id=meeting.id).lease_owner, "")
+
+    @override_settings(COMMUNITY_BILI=dict(), RECORDING_STREAM_TO_OBS=True)
+    def test_stream_without_bili(self):
+        meeting = self.create_meeting(**self.data)
+        # the community without the config of bili is streamed to obs, and no file is written
+        with mock.patch("meeting.management.commands.handle_recordings.download_big_file",
+                        side_effect=fake_download_big_file):
+            work_flow(self.handler, InlinePipeline())
+        job = RecordingJob.objects.get(meeting_id=meeting.id)
+        meeting.refresh_from_db()
+        self.assertEqual(fake_download_big_file.count, 0)
+        self.assertEqual(len(FakeUploadAdapterImpl.uploaded), 1)
+        self.assertIsNone(FakeUploadAdapterImpl.uploaded[0][2])
+        # the short-lived download url is got again by the obs stage which opens it
+        self.assertEqual(FakeUploadAdapterImpl.uploaded[0][0], "https://example.com/123456.mp4?sign=2")
+        self.assertEqual(job.status, RecordingJobStatus.OBS_UPLOADED.value)
+        self.assertEqual(meeting.upload_status, UploadStatus.UPLOAD_OBS.value)
+        self.assertFalse(os.path.exists(job.video_path))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/14 17:10
+# @Author  : Tom_zc
+# @FileName: test_recording_pipeline.py
+# @Software: PyCharm
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from meeting_platform.utils.pipeline import Stage, StagePipeline
+
+
+class StagePipelineTest(SimpleTestCase):
+
+    def setUp(self):
+        self.exited = list()
+        self.lock = threading.Lock()
+
+    def _on_exit(self, item):
+        with self.lock:
+            self.exited.append(item)
+
+    def test_flow_ok(self):
+        stages = [
+            Stage("double", lambda x: x * 2, 2, 1),
+            Stage("drop_odd", lambda x: x if x % 4 == 0 else None, 1, 1),
+            Stage("fail_eight", lambda x: 1 / (x - 8), 2, 1),
+        ]
+        with StagePipeline("test", stages, on_exit=self._on_exit) as pipeline:
+            for i in range(1, 6):
+                pipeline.put(i)
+        metrics = {i["name"]: i for i in pipeline.get_metrics()}
+        self.assertEqual(metrics["double"]["succeeded"], 5)
+        self.assertEqual(metrics["drop_odd"]["dropped"], 3)
+        self.assertEqual(metrics["fail_eight"]["failed"], 1)
+        self.assertEqual(metrics["fail_eight"]["succeeded"], 1)
+        # every item leaves the pipeline once
+        self.assertEqual(len(self.exited), 5)
+
+    def test_slow_stage_not_block_others(self):
+        concurrency = {"current": 0, "max": 0}
+
+        def slow(x):
+            with self.lock:
+                concurrency["current"] += 1
+                concurrency["max"] = max(concurrency["max"], concurrency["current"])
+            time.sleep(0.05)
+            with self.lock:
+                concurrency["current"] -= 1
+            return x
+
+        stages = [Stage("fast", lambda x: x, 1, 1), Stage("slow", slow, 2, 1)]
+        with StagePipeline("test", stages, on_exit=self._on_exit) as pipeline:
+            for i in range(6):
+                pipeline.put(i)
+        self.assertEqual(concurrency["max"], 2)
+        self.assertEqual(sorted(self.exited), list(range(6)))
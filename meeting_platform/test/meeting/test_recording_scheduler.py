@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/18 16:40
+# @Author  : Tom_zc
+# @FileName: test_recording_scheduler.py
+# @Software: PyCharm
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from meeting.management.commands.handle_recordings import RecordingScheduler
+
+
+class FakeHandleRecording:
+    def __init__(self, community, is_blocked=False):
+        self.community = community
+        self.is_blocked = is_blocked
+        self.polls = 0
+
+    def refresh_upload_status(self):
+        pass
+
+    def upload_all(self, pipeline, stop_event=None):
+        self.polls += 1
+        if self.is_blocked:
+            # the backlog is blocked by the full pipeline until stopped
+            stop_event.wait()
+
+
+@override_settings(RECORDING_SCHEDULE_INTERVAL=10, RECORDING_SCHEDULE_INTERVALS={"openEuler": 0.05},
+                   RECORDING_SCHEDULE_JITTER=0)
+class RecordingSchedulerTest(SimpleTestCase):
+    def test_poll_on_interval_until_stop(self):
+        handle_recordings = [FakeHandleRecording("openEuler"), FakeHandleRecording("openUBMC")]
+        scheduler = RecordingScheduler(handle_recordings, None)
+        t = threading.Thread(target=scheduler.run)
+        t.start()
+        time.sleep(0.5)
+        scheduler.stop()
+        t.join(timeout=5)
+        self.assertFalse(t.is_alive())
+        # every community is polled on its own interval
+        self.assertGreater(handle_recordings[0].polls, 3)
+        self.assertEqual(handle_recordings[1].polls, 1)
+
+    @override_settings(RECORDING_SCHEDULE_INTERVALS={"openEuler": 0.05, "openUBMC": 0.05})
+    def test_poll_not_blocked_by_others(self):
+        handle_recordings = [FakeHandleRecording("openUBMC", is_blocked=True), FakeHandleRecording("openEuler")]
+        scheduler = RecordingScheduler(handle_recordings, None)
+        t = threading.Thread(target=scheduler.run)
+        t.start()
+        time.sleep(0.5)
+        scheduler.stop()
+        t.join(timeout=5)
+        self.assertFalse(t.is_alive())
+        # the community blocked in the pipeline does not delay the polls of the others
+        self.assertEqual(handle_recordings[0].polls, 1)
+        self.assertGreater(handle_recordings[1].polls, 3)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/15 10:30
+# @Author  : Tom_zc
+# @FileName: test_recording_stream.py
+# @Software: PyCharm
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from meeting_platform.utils.client.obs_client import MyObsClient
+from meeting_platform.utils.file_stream import iter_big_file_parts
+
+
+class FakeResponse:
+    def __init__(self, content, chunk_size):
+        self.content = content
+        self.chunk_size = chunk_size
+        self.is_closed = False
+
+    def iter_content(self, chunk_size=None):
+        for i in range(0, len(self.content), self.chunk_size):
+            yield self.content[i:i + self.chunk_size]
+
+    def close(self):
+        self.is_closed = True
+
+
+class FakeObsResponse(dict):
+    def __init__(self, status, **body):
+        super(FakeObsResponse, self).__init__(status=status)
+        self.status = status
+        self.errorMessage = None
+        self.body = mock.Mock(**body)
+
+
+class RecordingStreamTest(SimpleTestCase):
+    content = bytes(range(256)) * 10
+
+    def test_iter_parts_and_tee(self):
+        response = FakeResponse(self.content, 100)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tee_path = os.path.join(tmpdir, "video.mp4")
+            parts = list(iter_big_file_parts(response, 1000, tee_path))
+            with open(tee_path, "rb") as f:
+                self.assertEqual(f.read(), self.content)
+        self.assertEqual([len(i) for i in parts], [1000, 1000, 560])
+        self.assertEqual(b"".join(parts), self.content)
+        self.assertTrue(response.is_closed)
+
+    def _get_client(self):
+        client = MyObsClient.__new__(MyObsClient)
+        client.obs_client = mock.Mock()
+        client.obs_client.initiateMultipartUpload.return_value = FakeObsResponse(200, uploadId="upload-id")
+        client.obs_client.uploadPart.side_effect = lambda *args, **kwargs: FakeObsResponse(200, etag=str(args[2]))
+        client.obs_client.completeMultipartUpload.return_value = FakeObsResponse(200)
+        return client
+
+    def test_upload_stream_ok(self):
+        client = self._get_client()
+        resp = client.upload_stream("bucket", "video.mp4", iter([b"a", b"b", b"c"]))
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(client.obs_client.uploadPart.call_count, 3)
+        request = client.obs_client.completeMultipartUpload.call_args[0][3]
+        self.assertEqual([(i.partNum, i.etag) for i in request.parts], [(1, "1"), (2, "2"), (3, "3")])
+        client.obs_client.abortMultipartUpload.assert_not_called()
+
+    def test_upload_stream_aborted(self):
+        client = self._get_client()
+
+        def parts():
+            yield b"a"
+            raise ConnectionError("the download is broken")
+
+        with self.assertRaises(ConnectionError):
+            client.upload_stream("bucket", "video.mp4", parts())
+        client.obs_client.abortMultipartUpload.assert_called_once_with("bucket", "video.mp4", "upload-id")
+        client.obs_client.completeMultipartUpload.assert_not_called()
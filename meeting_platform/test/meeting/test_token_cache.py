@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/10 16:20
+# @Author  : Tom_zc
+# @FileName: test_token_cache.py
+# @Software: PyCharm
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from meeting_platform.utils.token_cache import TokenCache
+
+
+class TokenCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = TokenCache(refresh_ahead=300)
+
+    def test_single_flight(self):
+        calls = list()
+
+        def refresh():
+            calls.append(1)
+            time.sleep(0.1)
+            return "token", 3600
+
+        results = list()
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get("zoom", refresh)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # the token is refreshed once by the concurrent threads
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["token"] * 8)
+
+    def test_refresh_ahead(self):
+        refresh = mock.Mock(side_effect=[("old", 3600), ("new", 3600)])
+        self.assertEqual(self.cache.get("zoom", refresh), "old")
+        with mock.patch("meeting_platform.utils.token_cache.time.time", return_value=time.time() + 3400):
+            # the token is refreshed before it expired
+            self.assertEqual(self.cache.get("zoom", refresh), "new")
+        self.assertEqual(refresh.call_count, 2)
+
+    def test_fallback_to_valid_token(self):
+        refresh = mock.Mock(side_effect=[("old", 3600), (None, 0), (None, 0)])
+        self.assertEqual(self.cache.get("zoom", refresh), "old")
+        now = time.time()
+        with mock.patch("meeting_platform.utils.token_cache.time.time", return_value=now + 3400):
+            # refresh failed, and the token is still valid
+            self.assertEqual(self.cache.get("zoom", refresh), "old")
+        with mock.patch("meeting_platform.utils.token_cache.time.time", return_value=now + 3700):
+            # refresh failed, and the token is expired
+            self.assertIsNone(self.cache.get("zoom", refresh))
+
+    def test_invalidate(self):
+        refresh = mock.Mock(side_effect=[("old", 3600), ("new", 3600)])
+        self.assertEqual(self.cache.get("zoom", refresh), "old")
+        self.assertEqual(self.cache.get("zoom", refresh), "old")
+        self.cache.invalidate("zoom")
+        self.assertEqual(self.cache.get("zoom", refresh), "new")
@@ -18,10 +18,11 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
-from meeting_platform.utils.customized.my_view import PingView
+from meeting_platform.utils.customized.my_view import PingView, MetricsView
 
 urlpatterns = [
     path('ping/', PingView.as_view()),
+    path('metrics/', MetricsView.as_view()),
     path('inner/v1/meeting/', include('meeting.urls.inner')),
 ]
 
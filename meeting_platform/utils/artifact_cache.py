@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/18 10:30
+# @Author  : Tom_zc
+# @FileName: artifact_cache.py
+# @Software: PyCharm
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import stat
+import threading
+import time
+
+from django.conf import settings
+
+from meeting_platform.utils.file_stream import write_content
+
+logger = logging.getLogger("log")
+
+
+class ArtifactCache:
+    """the local cache of the recording artifacts, such as the videos and the covers:
+        1.the artifact is addressed by the hash of key, such as (community, mid, the file id of platform), so that
+          the retry and the next run reuse it instead of downloading from the platform again
+        2.the artifact is written to the partial file and renamed when it is completed, so that the partial file is
+          never used as the completed one
+        3.the artifacts are evicted by the least recently used when the total size exceeds the budget, and the
+          artifacts pinned by the tasks in flight are not evicted. the pin holds the shared flock of the lock file
+          of artifact, so that the processes sharing the cache do not evict the artifacts pinned by each other
+        4.the partial files are not evicted by the budget, and they are removed after RECORDING_CACHE_PARTIAL_TTL
+          if they are not pinned
+    """
+    partial_suffix = ".partial"
+    lock_suffix = ".lock"
+
+    def __init__(self):
+        self._pins = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def root(self):
+        return settings.RECORDING_CACHE_DIR
+
+    @staticmethod
+    def get_key(*parts):
+        content = json.dumps([str(i) for i in parts], ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get_path(self, key, suffix):
+        return os.path.join(self.root, key[:2], key + suffix)
+
+    @staticmethod
+    def _get_key_by_path(path):
+        return os.path.basename(path).split(".", 1)[0]
+
+    def get_partial_path(self, path):
+        """the path to write the artifact, which is renamed to path by commit"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path + self.partial_suffix
+
+    def hit(self, path):
+        """return True if the completed artifact exists, and it is marked as recently used"""
+        if not os.path.exists(path):
+            return False
+        os.utime(path)
+        return True
+
+    def commit(self, path):
+        """rename the partial file to path atomically, and evict the artifacts over the budget"""
+        os.replace(path + self.partial_suffix, path)
+        os.utime(path)
+        self.evict()
+        return path
+
+    def put(self, path, content):
+        write_content(self.get_partial_path(path), content)
+        return self.commit(path)
+
+    def _get_lock_path(self, key):
+        return os.path.join(self.root, key[:2], key + self.lock_suffix)
+
+    def _open_lock(self, key, operation):
+        """open the lock file of key and flock it, return the fd or None if it is locked by the others"""
+        lock_path = self._get_lock_path(key)
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        while True:
+            fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, stat.S_IWUSR | stat.S_IRUSR)
+            try:
+                fcntl.flock(fd, operation)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+            # the lock file may be removed by the eviction before it was locked, and then the new one is locked
+            try:
+                if os.stat(lock_path).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def pin(self, path):
+        key = self._get_key_by_path(path)
+        with self._lock:
+            if key in self._pins:
+                self._pins[key][0] += 1
+            else:
+                self._pins[key] = [1, self._open_lock(key, fcntl.LOCK_SH)]
+
+    def unpin(self, path):
+        key = self._get_key_by_path(path)
+        with self._lock:
+            pin = self._pins.get(key)
+            if pin is None:
+                return
+            pin[0] -= 1
+            if pin[0] <= 0:
+                self._pins.pop(key)
+                os.close(pin[1])
+
+    def _list_files(self):
+        """list the artifacts and the partial files, and the lock files are not listed"""
+        artifacts, partials = list(), list()
+        for dir_path, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                if file_name.endswith(self.lock_suffix):
+                    continue
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat_result = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files = partials if self.partial_suffix in file_name else artifacts
+                files.append((stat_result.st_mtime, stat_result.st_size, path))
+        return artifacts, partials
+
+    def _remove_unpinned(self, path):
+        """remove the file if its artifact is not pinned by any process, and return whether it was removed"""
+        key = self._get_key_by_path(path)
+        if key in self._pins:
+            return False
+        fd = self._open_lock(key, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if fd is None:
+            return False
+        try:
+            for i in [path, self._get_lock_path(key)]:
+                try:
+                    os.remove(i)
+                except FileNotFoundError:
+                    pass
+        finally:
+            os.close(fd)
+        return True
+
+    def evict(self):
+        """remove the least recently used artifacts until the total size is under the budget, and the expired
+        partial files, return the count of removed files"""
+        with self._lock:
+            artifacts, partials = self._list_files()
+            count = 0
+            expired_time = time.time() - settings.RECORDING_CACHE_PARTIAL_TTL
+            for mtime, size, path in partials:
+                if mtime < expired_time and self._remove_unpinned(path):
+                    count += 1
+                    logger.info("[ArtifactCache/evict] remove the expired partial file {}".format(path))
+            total = sum(size for _, size, _ in artifacts)
+            for _, size, path in sorted(artifacts):
+                if total <= settings.RECORDING_CACHE_MAX_BYTES:
+                    break
+                if not self._remove_unpinned(path):
+                    continue
+                total -= size
+                count += 1
+                logger.info("[ArtifactCache/evict] remove {} and free {} bytes".format(path, size))
+            return count
+
+
+artifact_cache = ArtifactCache()
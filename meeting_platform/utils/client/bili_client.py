@@ -41,22 +41,32 @@ class BiliClient(object):
         res = sync(uploader.start())
         return res
 
-    def search_all_videos(self):
+    def iter_video_pages(self):
+        """list the published videos page by page from the newest, and the next page is got only if it is needed"""
         user = User(self.bili_uid, self.credential)
-        all_vid = []
         pn = 1
         while True:
             res = sync(user.get_videos(pn=pn))
-            if len(res.get('list').get('vlist')) == 0:
+            videos = res.get('list').get('vlist')
+            if len(videos) == 0:
                 break
-            for video in res['list']['vlist']:
-                b_vid = video.get('bvid')
-                if not b_vid:
-                    continue
-                if b_vid not in all_vid:
-                    all_vid.append(b_vid)
+            yield videos
             pn += 1
-        return all_vid
+
+    def search_all_videos(self):
+        all_vid = dict()
+        for videos in self.iter_video_pages():
+            for video in videos:
+                b_vid = video.get('bvid')
+                if b_vid:
+                    all_vid[b_vid] = None
+        return list(all_vid.keys())
 
     def get_replay_url(self, b_vid):
         return self.bili_api_prefix + b_vid
+
+    def get_bvid(self, replay_url):
+        """the bvid is the last part of replay url"""
+        if not replay_url:
+            return
+        return replay_url.rstrip("/").rsplit("/", 1)[-1]
@@ -5,10 +5,17 @@
 # @FileName: email_client.py
 # @Software: PyCharm
 
+import os
 import smtplib
+import threading
+import time
 import traceback
+from collections import deque
 from logging import getLogger
 
+from django.conf import settings
+
+from meeting_platform.utils.executor import EXIT_PRIORITY_CLOSE, register_exit_hook
 
 logger = getLogger("log")
 
@@ -24,11 +31,137 @@ class EmailClient(object):
         self.server.login(user, pwd)
 
     def send_message(self, from_str, receive_str, msg, is_close=True):
-        """send the message by email client"""
+        """send the message by email client, and the error is raised so that the caller could retry it later"""
         try:
             return self.server.sendmail(from_str, receive_str, msg.as_string())
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            raise
         except smtplib.SMTPException as e:
             logger.error("[EmailClient] e:{},traceback:{}".format(e, traceback.format_exc()))
+            raise
         finally:
             if is_close:
                 self.server.quit()
+
+    def is_alive(self):
+        """check the connection by NOOP"""
+        try:
+            return self.server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def close(self):
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+
+
+class SmtpConnectionPool:
+    """the authenticated smtp connections which are reused by the same (host, port, user):
+        1.the idle connection is checked by NOOP before reuse, and reconnected if it was closed by the server
+        2.the connections in use are limited by max_size, and acquire waits for acquire_timeout
+    """
+    _pools = dict()
+    _pid = None
+    _lock = threading.Lock()
+    _is_hooked = False
+
+    def __init__(self, host, port, user, pwd, max_size, acquire_timeout):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.pwd = pwd
+        self.acquire_timeout = acquire_timeout
+        self._idle = deque()
+        self._idle_lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_size)
+
+    @classmethod
+    def get_instance(cls, smtp_info):
+        """get the pool by the smtp config of community, the pools are rebuilt after the worker was forked"""
+        key = (smtp_info["SMTP_SERVER_HOST"], smtp_info["SMTP_SERVER_PORT"], smtp_info["SMTP_SERVER_USER"])
+        if cls._pid == os.getpid():
+            pool = cls._pools.get(key)
+            if pool is not None:
+                return pool
+        with cls._lock:
+            if cls._pid != os.getpid():
+                cls._pools = dict()
+                cls._pid = os.getpid()
+            if not cls._is_hooked:
+                # the connections are closed after the executors drained the queued emails
+                register_exit_hook(cls.close_all, EXIT_PRIORITY_CLOSE)
+                cls._is_hooked = True
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls(smtp_info["SMTP_SERVER_HOST"], smtp_info["SMTP_SERVER_PORT"],
+                           smtp_info["SMTP_SERVER_USER"], smtp_info["SMTP_SERVER_PASS"],
+                           settings.SMTP_POOL_MAX_SIZE, settings.SMTP_POOL_ACQUIRE_TIMEOUT)
+                cls._pools[key] = pool
+            return pool
+
+    @classmethod
+    def close_all(cls):
+        with cls._lock:
+            if cls._pid != os.getpid():
+                return
+            pools, cls._pools = cls._pools, dict()
+        for pool in pools.values():
+            pool.close()
+
+    def _get_idle(self):
+        """get the idle connection which is alive, and the idle connections are used in lifo"""
+        while True:
+            with self._idle_lock:
+                if not self._idle:
+                    return None
+                client, last_used = self._idle.pop()
+            if time.time() - last_used < settings.SMTP_POOL_IDLE_TIMEOUT and client.is_alive():
+                return client
+            client.close()
+
+    def _acquire(self):
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            raise RuntimeError("acquire smtp connection of {}/{} timeout".format(self.host, self.user))
+        try:
+            client = self._get_idle()
+            if client is None:
+                client = EmailClient(self.host, self.port, self.user, self.pwd)
+            return client
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    def _release(self, client, is_broken=False):
+        try:
+            if is_broken:
+                client.close()
+            else:
+                with self._idle_lock:
+                    self._idle.append((client, time.time()))
+        finally:
+            self._semaphore.release()
+
+    def send_message(self, from_str, receive_str, msg):
+        """send the message by the pooled connection, and reconnect once if the connection was disconnected"""
+        for i in range(2):
+            client = self._acquire()
+            try:
+                result = client.send_message(from_str, receive_str, msg, is_close=False)
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self._release(client, is_broken=True)
+                logger.info("[SmtpConnectionPool] {}/{} disconnected:{}, and reconnect".format(self.host, self.user, e))
+                continue
+            except Exception:
+                self._release(client, is_broken=True)
+                raise
+            self._release(client)
+            return result
+        raise smtplib.SMTPServerDisconnected("{}/{} disconnected after reconnect".format(self.host, self.user))
+
+    def close(self):
+        with self._idle_lock:
+            idle, self._idle = self._idle, deque()
+        for client, _ in idle:
+            client.close()
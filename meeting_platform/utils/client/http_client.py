@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/10 10:21
+# @Author  : Tom_zc
+# @FileName: http_client.py
+# @Software: PyCharm
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings
+
+
+class HttpSessionPool:
+    """the keep-alive sessions which is shared by (platform, host) in the process"""
+    _sessions = dict()
+    _pid = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _new_session(cls):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings.REQUEST_POOL_CONNECTIONS,
+                              pool_maxsize=settings.REQUEST_POOL_MAXSIZE,
+                              pool_block=False)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        return session
+
+    @classmethod
+    def get_session(cls, platform, host):
+        """get the session by (platform, host), the session is rebuilt after the worker was forked"""
+        key = (str(platform).lower(), host)
+        if cls._pid == os.getpid():
+            session = cls._sessions.get(key)
+            if session is not None:
+                return session
+        with cls._lock:
+            if cls._pid != os.getpid():
+                cls._sessions = dict()
+                cls._pid = os.getpid()
+            session = cls._sessions.get(key)
+            if session is None:
+                session = cls._new_session()
+                cls._sessions[key] = session
+            return session
+
+    @classmethod
+    def close_all(cls):
+        with cls._lock:
+            for session in cls._sessions.values():
+                session.close()
+            cls._sessions = dict()
@@ -5,19 +5,69 @@
 # @FileName: kafka_client.py
 # @Software: PyCharm
 import json
+import logging
+import os
+import threading
 
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from kafka import KafkaProducer
 
+from meeting_platform.utils.executor import EXIT_PRIORITY_CLOSE, register_exit_hook
+
+logger = logging.getLogger("log")
+
 
 class KafKaClient:
+    _instances = dict()
+    _pid = None
+    _lock = threading.Lock()
+    _is_hooked = False
+
     def __init__(self, server=None):
         if server is None:
             server = ["localhost:9092"]
         self.client = KafkaProducer(
             bootstrap_servers=server,
-            value_serializer=lambda v: json.dumps(v).encode()
+            value_serializer=lambda v: json.dumps(v, cls=DjangoJSONEncoder).encode(),
+            linger_ms=settings.KAFKA_LINGER_MS,
+            batch_size=settings.KAFKA_BATCH_SIZE,
+            compression_type=settings.KAFKA_COMPRESSION_TYPE,
+            max_block_ms=settings.KAFKA_MAX_BLOCK_MS,
         )
 
+    @classmethod
+    def get_instance(cls, server):
+        """get the producer shared by the server in the process, and it is created lazily after the worker forked"""
+        key = tuple(server) if isinstance(server, (list, tuple)) else server
+        if cls._pid == os.getpid():
+            instance = cls._instances.get(key)
+            if instance is not None:
+                return instance
+        with cls._lock:
+            if cls._pid != os.getpid():
+                cls._instances = dict()
+                cls._pid = os.getpid()
+            if not cls._is_hooked:
+                # the producers are closed after the executors drained the queued messages
+                register_exit_hook(cls.close_all, EXIT_PRIORITY_CLOSE)
+                cls._is_hooked = True
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = cls(server)
+                cls._instances[key] = instance
+            return instance
+
+    @classmethod
+    def close_all(cls):
+        """flush the buffered messages and close the producers when the worker exit"""
+        with cls._lock:
+            if cls._pid != os.getpid():
+                return
+            instances, cls._instances = cls._instances, dict()
+        for instance in instances.values():
+            instance.close(timeout=settings.KAFKA_CLOSE_TIMEOUT)
+
     def __enter__(self):
         return self
 
@@ -25,6 +75,21 @@ class KafKaClient:
         self.client.send(topic, msg)
         self.client.flush()
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
+    def send_msg_async(self, topic, msg, key=None, on_success=None, on_error=None):
+        """send the msg in batch, and the callbacks are called in the io thread of producer"""
+        future = self.client.send(topic, msg, key=key.encode() if key else None)
+        if on_success is not None:
+            future.add_callback(on_success)
+        if on_error is not None:
+            future.add_errback(on_error)
+        return future
+
+    def flush(self, timeout=None):
+        self.client.flush(timeout=timeout)
+
+    def close(self, timeout=180):
         if self.client:
-            self.client.close(timeout=180)
+            self.client.close(timeout=timeout)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(timeout=180)
@@ -4,15 +4,34 @@
 # @Author  : Tom_zc
 # @FileName: obs_client.py
 # @Software: PyCharm
-from obs import ObsClient
+import threading
+
+from obs import CompleteMultipartUploadRequest, CompletePart, ObsClient
 
 
 class MyObsClient:
+    _instances = dict()
+    _lock = threading.Lock()
+
     def __init__(self, ak, sk, endpoint):
         if not all([ak, sk, endpoint]):
             raise Exception("[MyObsClient] lack of params")
         self.obs_client = ObsClient(access_key_id=ak, secret_access_key=sk, server=endpoint)
 
+    @classmethod
+    def get_instance(cls, key, ak, sk, endpoint):
+        """get the client shared in the process by key, such as the community"""
+        instance_key = (cls, key, ak, endpoint)
+        instance = cls._instances.get(instance_key)
+        if instance is not None:
+            return instance
+        with cls._lock:
+            instance = cls._instances.get(instance_key)
+            if instance is None:
+                instance = cls(ak, sk, endpoint)
+                cls._instances[instance_key] = instance
+            return instance
+
     def __enter__(self):
         return self
 
@@ -22,8 +41,8 @@ class MyObsClient:
     def get_object(self, bucket_name, object_key):
         return self.obs_client.getObject(bucket_name, object_key)
 
-    def get_object_metadata(self, bucket_name, object_key):
-        return self.obs_client.getObjectMetadata(bucket_name, object_key)
+    def get_object_metadata(self, bucket_name, object_key, extension_headers=None):
+        return self.obs_client.getObjectMetadata(bucket_name, object_key, extensionHeaders=extension_headers)
 
     def list_objects(self, bucket_name):
         objs = []
@@ -44,3 +63,26 @@ class MyObsClient:
     def upload_file(self, bucket_name, object_key, filename, metadata=None):
         return self.obs_client.uploadFile(bucketName=bucket_name, objectKey=object_key, uploadFile=filename,
                                           taskNum=10, enableCheckpoint=True, metadata=metadata)
+
+    def upload_stream(self, bucket_name, object_key, parts, metadata=None):
+        """upload the parts of stream one by one by the multipart upload, and the upload is aborted if failed"""
+        resp = self.obs_client.initiateMultipartUpload(bucket_name, object_key, metadata=metadata)
+        if resp.status >= 300:
+            return resp
+        upload_id = resp.body.uploadId
+        complete_parts = list()
+        try:
+            for part_number, part in enumerate(parts, start=1):
+                resp = self.obs_client.uploadPart(bucket_name, object_key, part_number, upload_id, content=part)
+                if resp.status >= 300:
+                    raise Exception("upload part {} failed: {}/{}".format(part_number, resp.status,
+                                                                          resp.errorMessage))
+                complete_parts.append(CompletePart(partNum=part_number, etag=resp.body.etag))
+            resp = self.obs_client.completeMultipartUpload(bucket_name, object_key, upload_id,
+                                                           CompleteMultipartUploadRequest(parts=complete_parts))
+            if resp.status >= 300:
+                raise Exception("complete failed: {}/{}".format(resp.status, resp.errorMessage))
+            return resp
+        except Exception:
+            self.obs_client.abortMultipartUpload(bucket_name, object_key, upload_id)
+            raise
@@ -6,8 +6,6 @@
 import secrets
 import shutil
 import string
-import subprocess
-import threading
 import time
 import uuid
 import tempfile
@@ -21,11 +19,6 @@ from functools import wraps
 logger = logging.getLogger('log')
 
 
-def start_thread(func, m):
-    th = threading.Thread(target=func, args=m)
-    th.start()
-
-
 def get_cur_date():
     cur_date = datetime.now()
     return cur_date
@@ -59,28 +52,6 @@ def make_nonce():
     return ''.join(secrets.choice(string.digits) for _ in range(6))
 
 
-def execute_cmd3(cmd, timeout=30, err_log=False):
-    """execute cmd3"""
-    try:
-        p = subprocess.Popen(cmd.split(), stderr=subprocess.PIPE, stdout=subprocess.PIPE)
-        t_wait_seconds = 0
-        while True:
-            if p.poll() is not None:
-                break
-            if timeout >= 0 and t_wait_seconds >= (timeout * 100):
-                p.terminate()
-                return -1, "", "execute_cmd3 exceeded time {} seconds in executing".format(timeout)
-            time.sleep(0.01)
-            t_wait_seconds += 1
-        out, err = p.communicate()
-        ret = p.returncode
-        if ret != 0 and err_log:
-            logger.error("execute_cmd3 return {}, std output: {}, err output: {}.".format(ret, out, err))
-        return ret, out, err
-    except Exception as e:
-        return -1, "", "execute_cmd3 exceeded raise, e={}, trace={}".format(str(e), traceback.format_exc())
-
-
 def func_retry(tries=3, delay=2):
     def deco_retry(fn):
         @wraps(fn)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/16 10:20
+# @Author  : Tom_zc
+# @FileName: cover_renderer.py
+# @Software: PyCharm
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger("log")
+
+
+class CoverRenderer:
+    """render the cover of recording in process instead of wkhtmltoimage:
+        1.the background of community and the fonts are loaded once
+        2.the text is drawn as the old html template: the topic in 100px, the sig in 80px and the time in 60px
+        3.the png is cached by the hash of inputs, so that the same cover is rendered once
+    """
+    # change the version if the layout changed, so that the cached covers are not used
+    version = 1
+    margin = 20
+    topic_top = 150
+    lines = [
+        # (font size, line height, margin bottom, is bold)
+        (100, 120, 100, True),
+        (80, 96, 0, False),
+        (60, 72, 0, False),
+    ]
+
+    def __init__(self):
+        self._backgrounds = dict()
+        self._fonts = dict()
+        self._covers = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_background_path(community):
+        return os.path.join(settings.BASE_DIR, "templates", "image", community, "cover.png")
+
+    def _get_background(self, community):
+        background = self._backgrounds.get(community)
+        if background is None:
+            with Image.open(self.get_background_path(community)) as image:
+                background = image.convert("RGBA")
+            self._backgrounds[community] = background
+        return background
+
+    def _get_font(self, size):
+        font = self._fonts.get(size)
+        if font is None:
+            try:
+                font = ImageFont.truetype(settings.COVER_FONT_PATH, size)
+            except OSError:
+                logger.warning("[CoverRenderer/_get_font] the font {} is not found, and use the default font"
+                               .format(settings.COVER_FONT_PATH))
+                font = ImageFont.load_default(size)
+            self._fonts[size] = font
+        return font
+
+    def get_content_hash(self, community, texts):
+        content = json.dumps([self.version, community, texts], ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _wrap(draw, text, font, max_width):
+        """wrap the text by the characters, because the chinese topic has no spaces"""
+        lines, line = list(), ""
+        for char in text:
+            if line and draw.textlength(line + char, font=font) > max_width:
+                lines.append(line)
+                line = ""
+            line += char
+        if line:
+            lines.append(line)
+        return lines
+
+    def _draw(self, community, texts):
+        image = self._get_background(community).copy()
+        draw = ImageDraw.Draw(image)
+        width = image.width
+        top = self.topic_top
+        for text, (size, line_height, margin_bottom, is_bold) in zip(texts, self.lines):
+            font = self._get_font(size)
+            for line in self._wrap(draw, text, font, width - 2 * self.margin):
+                draw.text((width / 2, top + line_height / 2), line, font=font, fill="white", anchor="mm",
+                          stroke_width=2 if is_bold else 0, stroke_fill="white")
+                top += line_height
+            top += margin_bottom
+        output = io.BytesIO()
+        image.save(output, format="PNG")
+        return output.getvalue()
+
+    @staticmethod
+    def get_texts(topic, group_name, date, start_time, end_time):
+        return [topic, "SIG: {}".format(group_name), "Time: {} {}-{}".format(date, start_time, end_time)]
+
+    def render(self, community, topic, group_name, date, start_time, end_time):
+        """return the png content of cover"""
+        texts = self.get_texts(topic, group_name, date, start_time, end_time)
+        content_hash = self.get_content_hash(community, texts)
+        with self._lock:
+            content = self._covers.get(content_hash)
+            if content is not None:
+                self._covers.move_to_end(content_hash)
+                return content
+            content = self._draw(community, texts)
+            self._covers[content_hash] = content
+            while len(self._covers) > settings.COVER_CACHE_SIZE:
+                self._covers.popitem(last=False)
+            return content
+
+    def clear(self):
+        with self._lock:
+            self._covers = OrderedDict()
+
+
+cover_renderer = CoverRenderer()
@@ -3,11 +3,23 @@
 # @Author  : Tom_zc
 # @FileName: my_pagination.py
 # @Software: PyCharm
+import base64
+import binascii
+import datetime
+import json
+import logging
 
+from django.db import connection
+from django.db.models import Q
 from rest_framework import pagination
 from rest_framework.response import Response
 from collections import OrderedDict
 
+from meeting_platform.utils.ret_api import MyValidationError
+from meeting_platform.utils.ret_code import RetCode
+
+logger = logging.getLogger("log")
+
 
 class MyPagination(pagination.PageNumberPagination):
     page_size = 10
@@ -26,3 +38,120 @@ class MyPagination(pagination.PageNumberPagination):
             ('size', page_size),
             ('data', data)
         ]))
+
+
+class MyCursorPagination(pagination.BasePagination):
+    """the keyset pagination by the ordering fields, the cost of every page is same without offset and count"""
+    page_size = 10
+    max_page_size = 50
+    page_size_query_param = "size"
+    cursor_query_param = "cursor"
+    order_type_query_param = "order_type"
+    # exact: count(*), approx: the estimated rows of table, and not count by default
+    count_query_param = "count"
+    ordering = ("date", "start", "id")
+    # the format of ordering field in the cursor: int or the format of strptime
+    ordering_formats = {"date": "%Y-%m-%d", "start": "%H:%M", "id": int}
+
+    def __init__(self):
+        self.request = None
+        self.page_size_value = self.page_size
+        self.next_cursor = None
+        self.total = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            raise MyValidationError(RetCode.STATUS_PARAMETER_ERROR)
+        if size <= 0:
+            raise MyValidationError(RetCode.STATUS_PARAMETER_ERROR)
+        return min(size, self.max_page_size)
+
+    @staticmethod
+    def encode_cursor(values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("utf-8")
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")).decode("utf-8"))
+        except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+            logger.error("invalid cursor:{}, and e:{}".format(cursor, e))
+            raise MyValidationError(RetCode.STATUS_PARAMETER_ERROR)
+        if not isinstance(values, list) or len(values) != len(self.ordering) or \
+                not all(self._is_valid_value(field, value) for field, value in zip(self.ordering, values)):
+            logger.error("invalid cursor:{}".format(cursor))
+            raise MyValidationError(RetCode.STATUS_PARAMETER_ERROR)
+        return values
+
+    def _is_valid_value(self, field, value):
+        value_format = self.ordering_formats[field]
+        if value_format is int:
+            return isinstance(value, int) and not isinstance(value, bool)
+        if not isinstance(value, str):
+            return False
+        try:
+            datetime.datetime.strptime(value, value_format)
+        except ValueError:
+            return False
+        return True
+
+    def _get_ordering(self, is_desc):
+        """only the first field is desc, and it is same as the ordering of list: -date, start"""
+        if is_desc:
+            return ["-{}".format(self.ordering[0])] + list(self.ordering[1:])
+        return list(self.ordering)
+
+    def _get_keyset_filter(self, ordering, values):
+        """(date, start, id) > (d, s, i): date > d or (date = d and start > s) or (date = d, start = s, id > i)"""
+        fields = [field.lstrip("-") for field in ordering]
+        condition = Q()
+        for index, field in enumerate(ordering):
+            equals = {fields[i]: values[i] for i in range(index)}
+            lookup = "lt" if field.startswith("-") else "gt"
+            equals["{}__{}".format(fields[index], lookup)] = values[index]
+            condition |= Q(**equals)
+        return condition
+
+    def _get_total(self, queryset, request):
+        count_type = request.query_params.get(self.count_query_param)
+        if count_type == "exact":
+            return queryset.count()
+        if count_type == "approx":
+            return self._get_approx_total(queryset)
+        return None
+
+    def _get_approx_total(self, queryset):
+        """get the estimated rows from the statistics of table in mysql, others get count(*)"""
+        if connection.vendor != "mysql":
+            return queryset.count()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT TABLE_ROWS FROM information_schema.TABLES "
+                           "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.total = self._get_total(queryset, request)
+        ordering = self._get_ordering(request.query_params.get(self.order_type_query_param, "desc") == "desc")
+        queryset = queryset.order_by(*ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._get_keyset_filter(ordering, self.decode_cursor(cursor)))
+        # get one more to know whether there is the next page
+        results = list(queryset[:self.page_size_value + 1])
+        if len(results) > self.page_size_value:
+            results = results[:self.page_size_value]
+            last = results[-1]
+            self.next_cursor = self.encode_cursor([getattr(last, field) for field in self.ordering])
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('total', self.total),
+            ('next', self.next_cursor),
+            ('size', self.page_size_value),
+            ('data', data)
+        ]))
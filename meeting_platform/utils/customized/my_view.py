@@ -5,8 +5,11 @@
 # @FileName: my_view.py
 # @Software: PyCharm
 from rest_framework import mixins
+from rest_framework.authentication import BasicAuthentication
 from rest_framework.generics import RetrieveAPIView, GenericAPIView
+from rest_framework.permissions import IsAuthenticated
 
+from meeting_platform.utils.executor import BoundedExecutor
 from meeting_platform.utils.ret_api import ret_json
 from meeting_platform.utils.customized.my_serializers import EmptySerializers
 
@@ -50,6 +53,14 @@ class MyRetrieveModelMixin:
         return ret_json(data=serializer.data)
 
 
+class MyAsyncMixin:
+    """the request is processed asynchronously when async=true is in the params"""
+    async_query_param = "async"
+
+    def is_async(self, request):
+        return request.query_params.get(self.async_query_param, "").lower() == "true"
+
+
 class MyUpdateAPIView(mixins.UpdateModelMixin,
                       GenericAPIView):
     """
@@ -66,3 +77,13 @@ class PingView(EmptyAPIView, RetrieveAPIView):
     def retrieve(self, request, *args, **kwargs):
         """get the status of service"""
         return ret_json(msg='the status is ok')
+
+
+class MetricsView(EmptyAPIView, RetrieveAPIView):
+    """get the metrics of the background executors in the current worker"""
+    authentication_classes = (BasicAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def retrieve(self, request, *args, **kwargs):
+        """get the queue depth and latency of executors"""
+        return ret_json(data=BoundedExecutor.get_all_metrics())
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/12 15:10
+# @Author  : Tom_zc
+# @FileName: executor.py
+# @Software: PyCharm
+import atexit
+import os
+import queue
+import threading
+import time
+import logging
+import traceback
+
+from django.db import close_old_connections
+
+logger = logging.getLogger("log")
+
+# the priorities of exit hooks: the executors are drained before the clients used by their tasks are closed
+EXIT_PRIORITY_DRAIN = 0
+EXIT_PRIORITY_CLOSE = 10
+
+_exit_hooks = list()
+_exit_hooks_lock = threading.Lock()
+_is_exit_hooked = False
+
+
+def _run_exit_hooks():
+    """run the hooks once in ascending order of priority, and the hooks registered by them are run after them"""
+    while True:
+        with _exit_hooks_lock:
+            if not _exit_hooks:
+                return
+            hooks = sorted(_exit_hooks, key=lambda i: i[0])
+            _exit_hooks.clear()
+        for _, func in hooks:
+            try:
+                func()
+            except Exception as e:
+                logger.error("[register_exit_hook] {} err:{}, and traceback:{}"
+                             .format(func.__qualname__, e, traceback.format_exc()))
+
+
+def _install_exit_hook():
+    atexit.register(_run_exit_hooks)
+    try:
+        import uwsgi
+    except ImportError:
+        return
+    pre_hook = getattr(uwsgi, "atexit", None)
+
+    def _uwsgi_exit_hook():
+        _run_exit_hooks()
+        if pre_hook is not None:
+            pre_hook()
+
+    uwsgi.atexit = _uwsgi_exit_hook
+
+
+def register_exit_hook(func, priority=EXIT_PRIORITY_CLOSE):
+    """run the func when the process exit or the uwsgi worker reload, the hooks are run in ascending order of
+    priority instead of the reverse order of registration"""
+    global _is_exit_hooked
+    with _exit_hooks_lock:
+        if not _is_exit_hooked:
+            _install_exit_hook()
+            _is_exit_hooked = True
+        _exit_hooks.append((priority, func))
+
+
+class _ExecutorMetrics:
+    """the metrics of executor, the latency is in millisecond"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.caller_runs = 0
+        self.rejected = 0
+        self.wait_ms_total = 0
+        self.wait_ms_max = 0
+        self.run_ms_total = 0
+        self.run_ms_max = 0
+
+    def record_reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def record_submit(self, is_caller_run=False):
+        with self._lock:
+            self.submitted += 1
+            if is_caller_run:
+                self.caller_runs += 1
+
+    def record_done(self, wait_ms, run_ms, is_failed):
+        with self._lock:
+            self.completed += 1
+            if is_failed:
+                self.failed += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            self.run_ms_total += run_ms
+            self.run_ms_max = max(self.run_ms_max, run_ms)
+
+    def to_dict(self):
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "caller_runs": self.caller_runs,
+                "rejected": self.rejected,
+                "wait_ms_avg": round(self.wait_ms_total / completed, 2),
+                "wait_ms_max": round(self.wait_ms_max, 2),
+                "run_ms_avg": round(self.run_ms_total / completed, 2),
+                "run_ms_max": round(self.run_ms_max, 2),
+            }
+
+
+class BoundedExecutor:
+    """the executor with fixed workers and bounded queue in process:
+        1.the workers are started lazily, and restarted after the uwsgi worker was forked
+        2.when the queue is full, submit waits for submit_timeout and then runs the task in the caller as backpressure,
+          or rejects the task if caller_runs is False and the task is durable to be picked up by others
+        3.the queue is drained before the process exit or the uwsgi worker reload
+    """
+    _executors = dict()
+    _executors_lock = threading.Lock()
+    _is_hooked = False
+
+    def __init__(self, name, max_workers, queue_size, submit_timeout, drain_timeout, caller_runs=True):
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.submit_timeout = submit_timeout
+        self.drain_timeout = drain_timeout
+        self.caller_runs = caller_runs
+        self.metrics = _ExecutorMetrics()
+        self._queue = None
+        self._workers = list()
+        self._pid = None
+        self._is_shutdown = False
+        self._lock = threading.Lock()
+        with self._executors_lock:
+            self._executors[name] = self
+            if not BoundedExecutor._is_hooked:
+                register_exit_hook(BoundedExecutor.shutdown_all, EXIT_PRIORITY_DRAIN)
+                BoundedExecutor._is_hooked = True
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._workers = list()
+            self._is_shutdown = False
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._work, name="{}-{}".format(self.name, i), daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            self._pid = os.getpid()
+
+    def _run(self, func, args, kwargs, enqueue_time):
+        begin = time.time()
+        is_failed = False
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            is_failed = True
+            logger.error("[BoundedExecutor/{}] err:{}, and traceback:{}".format(self.name, e, traceback.format_exc()))
+        end = time.time()
+        self.metrics.record_done((begin - enqueue_time) * 1000, (end - begin) * 1000, is_failed)
+
+    def _work(self):
+        """the worker outlives the requests, so the stale connections of db are closed before and after every task"""
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                close_old_connections()
+                try:
+                    self._run(*task)
+                finally:
+                    close_old_connections()
+            finally:
+                self._queue.task_done()
+
+    def submit(self, func, *args, **kwargs):
+        """submit the task, and run it in the caller if the queue is still full after submit_timeout, return False
+        if the task was rejected"""
+        self._ensure_started()
+        if not self._is_shutdown:
+            try:
+                self._queue.put((func, args, kwargs, time.time()), timeout=self.submit_timeout)
+                self.metrics.record_submit()
+                return True
+            except queue.Full:
+                logger.warning("[BoundedExecutor/{}] the queue is full({}), and caller_runs is {}"
+                               .format(self.name, self.queue_size, self.caller_runs))
+        if not self.caller_runs:
+            self.metrics.record_reject()
+            return False
+        self.metrics.record_submit(is_caller_run=True)
+        self._run(func, args, kwargs, time.time())
+        return True
+
+    def shutdown(self):
+        """stop receiving the tasks, and wait for the queued tasks to finish in drain_timeout"""
+        with self._lock:
+            if self._pid != os.getpid() or self._is_shutdown:
+                return
+            self._is_shutdown = True
+        logger.info("[BoundedExecutor/{}] start to drain {} tasks".format(self.name, self._queue.qsize()))
+        deadline = time.time() + self.drain_timeout
+        for _ in self._workers:
+            try:
+                self._queue.put(None, timeout=max(deadline - time.time(), 0))
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(max(deadline - time.time(), 0))
+        logger.info("[BoundedExecutor/{}] drain finished, and left {} tasks"
+                    .format(self.name, self._queue.qsize()))
+
+    def get_metrics(self):
+        metrics = self.metrics.to_dict()
+        metrics.update({
+            "name": self.name,
+            "pid": os.getpid(),
+            "max_workers": self.max_workers,
+            "queue_size": self.queue_size,
+            "queue_depth": self._queue.qsize() if self._pid == os.getpid() else 0,
+            "alive_workers": len([i for i in self._workers if i.is_alive()]) if self._pid == os.getpid() else 0,
+        })
+        return metrics
+
+    @classmethod
+    def shutdown_all(cls):
+        for executor in list(cls._executors.values()):
+            executor.shutdown()
+
+    @classmethod
+    def get_all_metrics(cls):
+        return [executor.get_metrics() for executor in list(cls._executors.values())]
@@ -3,15 +3,25 @@
 # @Author  : Tom_zc
 # @FileName: file_stream.py
 # @Software: PyCharm
+import functools
+import hashlib
+import json
+import logging
 import stat
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
 from django.conf import settings
 
+logger = logging.getLogger("log")
+
 
 def write_content(path, content, model="wb"):
-    flags = os.O_CREAT | os.O_WRONLY
+    flags = os.O_CREAT | os.O_WRONLY | os.O_TRUNC
     modes = stat.S_IWUSR | stat.S_IRUSR
     with os.fdopen(os.open(path, flags, modes), model) as f:
         result = f.write(content)
@@ -23,13 +33,265 @@ def read_content(path):
         return fp.read()
 
 
-def download_big_file(url, path, headers=None, model="wb"):
-    r = requests.get(url, headers=headers, stream=True, timeout=settings.REQUEST_TIMEOUT)
-    flags = os.O_CREAT | os.O_WRONLY
+def _get_total_size(response):
+    """get the total size of file from Content-Range such as bytes 0-0/1024, or Content-Length"""
+    if response.headers.get("Content-Encoding", "identity") != "identity":
+        return
+    content_range = response.headers.get("Content-Range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1].strip()
+        return int(total) if total.isdigit() else None
+    content_length = response.headers.get("Content-Length")
+    return int(content_length) if content_length and content_length.isdigit() else None
+
+
+def _open_file(path, offset, truncate=False):
+    """open the file for writing at offset with the big buffer, and it is not truncated unless truncate"""
+    flags = os.O_CREAT | os.O_WRONLY | (os.O_TRUNC if truncate else 0)
     modes = stat.S_IWUSR | stat.S_IRUSR
-    with os.fdopen(os.open(path, flags, modes), model) as f:
-        for chunk in r.iter_content(chunk_size=4096):
-            if chunk:
-                f.write(chunk)
-                f.flush()
+    f = os.fdopen(os.open(path, flags, modes), "wb", buffering=settings.DOWNLOAD_CHUNK_SIZE)
+    f.seek(offset)
+    return f
+
+
+def _get_file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _is_retryable(e):
+    """the connection errors and the 5xx are transient, and the 4xx such as the expired url fails fast"""
+    response = getattr(e, "response", None)
+    return response is None or response.status_code >= 500
+
+
+def _download_stream(url, path, headers):
+    """download in one stream, and resume from the size of partial file by Range after interrupted, return the
+    total size of file or None if the server did not tell it"""
+    total = None
+    for i in range(settings.DOWNLOAD_RETRIES + 1):
+        offset = _get_file_size(path)
+        if total is not None and offset >= total:
+            break
+        req_headers = dict(headers or dict())
+        if offset:
+            req_headers["Range"] = "bytes={}-".format(offset)
+        try:
+            with requests.get(url, headers=req_headers, stream=True, timeout=settings.REQUEST_TIMEOUT) as r:
+                if r.status_code == 416 and offset:
+                    # the partial file is complete already
+                    return offset
+                r.raise_for_status()
+                if offset and r.status_code != 206:
+                    # the server ignores the Range, and download from the beginning
+                    offset = 0
+                total = _get_total_size(r)
+                with _open_file(path, offset, truncate=offset == 0) as f:
+                    for chunk in r.iter_content(chunk_size=settings.DOWNLOAD_CHUNK_SIZE):
+                        if chunk:
+                            f.write(chunk)
+            if total is None or _get_file_size(path) >= total:
+                return total
+        except (requests.RequestException, ConnectionError) as e:
+            if not _is_retryable(e):
+                raise
+            logger.warning("[download_big_file] {}: interrupted at {} bytes, and retry {}, err:{}"
+                           .format(path, _get_file_size(path), i + 1, e))
+            time.sleep(settings.DOWNLOAD_RETRY_DELAY)
+    raise Exception("[download_big_file] {}: download failed after {} retries".format(path, settings.DOWNLOAD_RETRIES))
+
+
+class _SegmentProgress:
+    """the offsets of segments in the part file are saved in the sidecar file, so that the segmented download is
+    resumed from the offsets after it failed or the process crashed"""
+
+    def __init__(self, path):
+        self.path = path + ".progress"
+        self.total = None
+        self.segments = list()
+        self._lock = threading.Lock()
+
+    def load(self, part_path, total):
+        """return True if the part file is resumable by the saved progress"""
+        if _get_file_size(part_path) != total or not os.path.exists(self.path):
+            return False
+        try:
+            progress = json.loads(read_content(self.path))
+        except (OSError, ValueError):
+            return False
+        if progress.get("total") != total:
+            return False
+        self.total, self.segments = total, progress["segments"]
+        return True
+
+    def reset(self, total, ranges):
+        self.total = total
+        self.segments = [[start, end, start] for start, end in ranges]
+        self._save()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        write_content(tmp_path, json.dumps({"total": self.total, "segments": self.segments}), "w")
+        os.replace(tmp_path, self.path)
+
+    def update(self, index, offset):
+        with self._lock:
+            self.segments[index][2] = offset
+            self._save()
+
+    def get_downloaded_size(self):
+        return sum(offset - start for start, _, offset in self.segments)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def get_downloaded_size(path):
+    """get the downloaded size of path, which is downloaded in one stream or in segments"""
+    if os.path.exists(path):
+        return _get_file_size(path)
+    progress = _SegmentProgress(path)
+    if not progress.load(path + ".part", _get_file_size(path + ".part")):
+        return 0
+    return progress.get_downloaded_size()
+
+
+def _download_segment(url, path, headers, start, end, on_progress=None):
+    """download the bytes from start to end(inclusive) into the same offset of file, and resume after interrupted.
+    on_progress is called with the offset after the bytes before it were flushed"""
+    offset = start
+    for i in range(settings.DOWNLOAD_RETRIES + 1):
+        req_headers = dict(headers or dict())
+        req_headers["Range"] = "bytes={}-{}".format(offset, end)
+        try:
+            with requests.get(url, headers=req_headers, stream=True, timeout=settings.REQUEST_TIMEOUT) as r:
+                if r.status_code != 206:
+                    r.raise_for_status()
+                    raise Exception("[download_big_file] {}: the server does not support Range, and status is {}"
+                                    .format(path, r.status_code))
+                with _open_file(path, offset) as f:
+                    for chunk in r.iter_content(chunk_size=settings.DOWNLOAD_CHUNK_SIZE):
+                        if chunk:
+                            chunk = chunk[:end + 1 - offset]
+                            f.write(chunk)
+                            f.flush()
+                            offset += len(chunk)
+                            if on_progress is not None:
+                                on_progress(offset)
+            if offset > end:
+                return
+        except (requests.RequestException, ConnectionError) as e:
+            if not _is_retryable(e):
+                raise
+            logger.warning("[download_big_file] {}: segment {}-{} interrupted at {}, and retry {}, err:{}"
+                           .format(path, start, end, offset, i + 1, e))
+            time.sleep(settings.DOWNLOAD_RETRY_DELAY)
+    raise Exception("[download_big_file] {}: segment {}-{} failed after {} retries"
+                    .format(path, start, end, settings.DOWNLOAD_RETRIES))
+
+
+def _get_segment_total(url, headers):
+    """get the total size if the server accepts the Range and the file is big enough to download in segments"""
+    req_headers = dict(headers or dict())
+    req_headers["Range"] = "bytes=0-0"
+    with requests.get(url, headers=req_headers, stream=True, timeout=settings.REQUEST_TIMEOUT) as r:
+        if r.status_code != 206:
+            return
+        total = _get_total_size(r)
+    if total is None or total < settings.DOWNLOAD_SEGMENT_MIN_SIZE:
+        return
+    return total
+
+
+def _download_segments(url, path, headers, total):
+    """the segments are downloaded into the preallocated part file, and it is renamed to path after completed. the
+    part file is resumed from the saved progress if it was left by the failed download"""
+    part_path = path + ".part"
+    progress = _SegmentProgress(path)
+    if progress.load(part_path, total):
+        logger.info("[download_big_file] {}: resume the segments from {} bytes"
+                    .format(path, progress.get_downloaded_size()))
+    else:
+        segment_size = -(-total // settings.DOWNLOAD_SEGMENTS)
+        with _open_file(part_path, 0, truncate=True) as f:
+            f.truncate(total)
+        ranges = [(start, min(start + segment_size, total) - 1) for start in range(0, total, segment_size)]
+        progress.reset(total, ranges)
+    segments = [(index, offset, end) for index, (_, end, offset) in enumerate(progress.segments) if offset <= end]
+    with ThreadPoolExecutor(max_workers=max(len(segments), 1), thread_name_prefix="download") as executor:
+        futures = [executor.submit(_download_segment, url, part_path, headers, offset, end,
+                                   functools.partial(progress.update, index)) for index, offset, end in segments]
+        for future in futures:
+            future.result()
+    os.replace(part_path, path)
+    progress.remove()
+
+
+def _verify_file(path, total, checksum):
+    size = _get_file_size(path)
+    if total is not None and size != total:
+        raise Exception("[download_big_file] {}: the size {} is not equal to {}".format(path, size, total))
+    if checksum is None:
+        return
+    algorithm, expected = checksum
+    hasher = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(settings.DOWNLOAD_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    if hasher.hexdigest().lower() != expected.lower():
+        raise Exception("[download_big_file] {}: the {} is not equal to {}".format(path, algorithm, expected))
+
+
+def download_big_file(url, path, headers=None, checksum=None):
+    """download the big file with the big buffer:
+        1.the file is downloaded in DOWNLOAD_SEGMENTS ranges at the same time if the server accepts the Range, and
+          the segments are resumed from their offsets saved in the sidecar file
+        2.otherwise it is downloaded in one stream, and resumed from the partial file after interrupted
+        3.the connection errors and the 5xx are retried, and the 4xx such as the expired url fails fast
+        4.the size is verified with the size told by the server, and the checksum such as ("md5", hexdigest) if given
+    """
+    total = None
+    if settings.DOWNLOAD_SEGMENTS > 1 and not _get_file_size(path):
+        total = _get_segment_total(url, headers)
+    if total is not None:
+        # the segments are downloaded into the part file, so that the partial file at path is always resumable from
+        # its size
+        _download_segments(url, path, headers, total)
+    else:
+        total = _download_stream(url, path, headers)
+    _verify_file(path, total, checksum)
     return path
+
+
+def open_big_file(url, headers=None):
+    """open the stream of url, and the body is not read until it is iterated"""
+    r = requests.get(url, headers=headers, stream=True, timeout=settings.REQUEST_TIMEOUT)
+    r.raise_for_status()
+    return r
+
+
+def iter_big_file_parts(response, part_size, tee_path=None):
+    """read the body of response in parts of part_size, and only one part is kept in memory. the body is written to
+    tee_path at the same time if tee_path is not None"""
+    f = None
+    if tee_path is not None:
+        flags = os.O_CREAT | os.O_WRONLY | os.O_TRUNC
+        modes = stat.S_IWUSR | stat.S_IRUSR
+        f = os.fdopen(os.open(tee_path, flags, modes), "wb")
+    try:
+        part = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            if not chunk:
+                continue
+            if f is not None:
+                f.write(chunk)
+            part.extend(chunk)
+            if len(part) >= part_size:
+                yield bytes(part[:part_size])
+                del part[:part_size]
+        if part:
+            yield bytes(part)
+    finally:
+        response.close()
+        if f is not None:
+            f.close()
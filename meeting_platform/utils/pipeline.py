@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/14 16:30
+# @Author  : Tom_zc
+# @FileName: pipeline.py
+# @Software: PyCharm
+import logging
+import queue
+import threading
+import time
+import traceback
+
+from django.db import close_old_connections
+
+logger = logging.getLogger("log")
+
+_STOP = object()
+
+
+class _StageMetrics:
+    """the metrics of stage, the time is in second"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.received = 0
+        self.succeeded = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy_total = 0
+        self.busy_max = 0
+        self.first_begin = None
+        self.last_end = None
+
+    def record_begin(self, begin):
+        with self._lock:
+            self.received += 1
+            if self.first_begin is None:
+                self.first_begin = begin
+
+    def record_done(self, begin, end, is_dropped, is_failed):
+        with self._lock:
+            if is_failed:
+                self.failed += 1
+            elif is_dropped:
+                self.dropped += 1
+            else:
+                self.succeeded += 1
+            self.busy_total += end - begin
+            self.busy_max = max(self.busy_max, end - begin)
+            self.last_end = end
+
+    def to_dict(self):
+        with self._lock:
+            completed = (self.succeeded + self.dropped + self.failed) or 1
+            elapsed = (self.last_end - self.first_begin) if self.first_begin and self.last_end else 0
+            return {
+                "received": self.received,
+                "succeeded": self.succeeded,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "busy_s_avg": round(self.busy_total / completed, 2),
+                "busy_s_max": round(self.busy_max, 2),
+                "elapsed_s": round(elapsed, 2),
+                "per_minute": round(self.succeeded * 60 / elapsed, 2) if elapsed else 0,
+            }
+
+
+class Stage:
+    """the stage of pipeline, func receives the item and returns the item for the next stage, or None to drop it"""
+
+    def __init__(self, name, func, max_workers, queue_size):
+        self.name = name
+        self.func = func
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.metrics = _StageMetrics()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = list()
+
+
+class StagePipeline:
+    """the items flow through the stages, and every stage has its own workers and bounded queue:
+        1.the slow stage does not block the other items in the fast stages, until its queue is full
+        2.the hand-off to the full queue blocks the previous stage as backpressure, so that the items in flight,
+          such as the downloaded files, are bounded by the workers and the queue sizes
+        3.on_exit is called once when the item leaves the pipeline: finished, dropped or failed
+    """
+
+    def __init__(self, name, stages, on_exit=None, on_worker_exit=None):
+        self.name = name
+        self.stages = stages
+        self.on_exit = on_exit
+        self.on_worker_exit = on_worker_exit
+        self._is_started = False
+        self._is_joined = False
+
+    def start(self):
+        if self._is_started:
+            return
+        for index, stage in enumerate(self.stages):
+            for i in range(stage.max_workers):
+                worker = threading.Thread(target=self._work, args=(index,),
+                                          name="{}-{}-{}".format(self.name, stage.name, i), daemon=True)
+                worker.start()
+                stage.workers.append(worker)
+        self._is_started = True
+
+    def _exit(self, item):
+        if self.on_exit is None:
+            return
+        try:
+            self.on_exit(item)
+        except Exception as e:
+            logger.error("[StagePipeline/{}] on_exit err:{}, and traceback:{}"
+                         .format(self.name, e, traceback.format_exc()))
+
+    def _work(self, index):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        try:
+            while True:
+                item = stage.queue.get()
+                if item is _STOP:
+                    return
+                begin = time.time()
+                stage.metrics.record_begin(begin)
+                result, is_failed = None, False
+                # the worker outlives the polls of daemon, so the stale connections of db are closed before and
+                # after every item
+                close_old_connections()
+                try:
+                    result = stage.func(item)
+                except Exception as e:
+                    is_failed = True
+                    logger.error("[StagePipeline/{}] {} err:{}, and traceback:{}"
+                                 .format(self.name, stage.name, e, traceback.format_exc()))
+                finally:
+                    close_old_connections()
+                stage.metrics.record_done(begin, time.time(), result is None, is_failed)
+                if result is not None and next_stage is not None:
+                    next_stage.queue.put(result)
+                else:
+                    self._exit(item if result is None else result)
+        finally:
+            if self.on_worker_exit is not None:
+                self.on_worker_exit()
+
+    def put(self, item):
+        """put the item into the first stage, and it blocks when the queue of first stage is full"""
+        self.start()
+        self.stages[0].queue.put(item)
+
+    def join(self):
+        """wait for all the items to leave the pipeline, the stages are stopped one by one in order"""
+        if not self._is_started or self._is_joined:
+            return
+        for stage in self.stages:
+            for _ in stage.workers:
+                stage.queue.put(_STOP)
+            for worker in stage.workers:
+                worker.join()
+        self._is_joined = True
+
+    def get_metrics(self):
+        metrics = list()
+        for stage in self.stages:
+            metric = stage.metrics.to_dict()
+            metric.update({
+                "name": stage.name,
+                "max_workers": stage.max_workers,
+                "queue_size": stage.queue_size,
+            })
+            metrics.append(metric)
+        return metrics
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.join()
@@ -100,6 +100,13 @@ def ret_json(code=200, msg="success", data=None, en_msg=None, **kwargs):
     return JsonResponse(ret_dict)
 
 
+def ret_accepted_json(data=None):
+    """return 202 when the request is accepted and processed asynchronously"""
+    response = ret_json(code=status.HTTP_202_ACCEPTED, msg="accepted", data=data)
+    response.status_code = status.HTTP_202_ACCEPTED
+    return response
+
+
 def capture_my_validation_exception(fn):
     """capture my define exception"""
 
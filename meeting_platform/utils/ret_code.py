@@ -63,6 +63,7 @@ class RetCode(RetCodeBase):
     STATUS_MEETING_INVALID_START = STATUS_FACILITY_MEETING + 10
     STATUS_MEETING_NOT_EXIST = STATUS_FACILITY_MEETING + 11
     STATUS_MEETING_FAILED_UPDATE = STATUS_FACILITY_MEETING + 12
+    STATUS_MEETING_IN_OPERATION = STATUS_FACILITY_MEETING + 13
 
     EN_OPERATION = {
         # common
@@ -99,6 +100,7 @@ class RetCode(RetCodeBase):
         STATUS_MEETING_INVALID_GROUP_NAME: "Invalid SIG name",
         STATUS_MEETING_INVALID_START: "The start time should not be earlier than the current time",
         STATUS_MEETING_NOT_EXIST: "Meeting does not exist",
+        STATUS_MEETING_IN_OPERATION: "The meeting is being changed, please try again later",
 
     }
 
@@ -136,5 +138,6 @@ class RetCode(RetCodeBase):
         STATUS_MEETING_INVALID_GROUP_NAME: "错误的SIG组名",
         STATUS_MEETING_INVALID_START: "请输入正确的开始时间",
         STATUS_MEETING_NOT_EXIST: "会议不存在",
+        STATUS_MEETING_IN_OPERATION: "会议正在修改中，请稍后再试",
 
     }
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/13 10:20
+# @Author  : Tom_zc
+# @FileName: template_cache.py
+# @Software: PyCharm
+import os
+import re
+import threading
+
+from django.conf import settings
+
+from meeting_platform.utils.file_stream import read_content
+
+_PLACEHOLDER_PATTERN = re.compile(r"{{(\w+)}}")
+
+
+class CompiledTemplate:
+    """the template is split into the texts and the placeholders such as {{topic}} once, and rendered in one pass"""
+
+    def __init__(self, content):
+        # the parts in the even index are texts, and the parts in the odd index are the names of placeholders
+        self._parts = _PLACEHOLDER_PATTERN.split(content)
+
+    def render(self, **kwargs):
+        """the placeholder which is not in kwargs is kept as it is"""
+        result = list()
+        for index, part in enumerate(self._parts):
+            if index % 2 == 0:
+                result.append(part)
+            elif part in kwargs:
+                result.append(str(kwargs[part]))
+            else:
+                result.append("{{" + part + "}}")
+        return "".join(result)
+
+
+class TemplateCache:
+    """the compiled templates in process, the template is reloaded when the file was modified in DEBUG"""
+
+    def __init__(self):
+        self._templates = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_mtime(path):
+        return os.stat(path).st_mtime if settings.DEBUG else None
+
+    def get(self, path):
+        mtime = self._get_mtime(path)
+        item = self._templates.get(path)
+        if item is not None and item[1] == mtime:
+            return item[0]
+        with self._lock:
+            item = self._templates.get(path)
+            if item is None or item[1] != mtime:
+                item = (CompiledTemplate(read_content(path)), mtime)
+                self._templates[path] = item
+            return item[0]
+
+    def clear(self):
+        with self._lock:
+            self._templates = dict()
+
+
+template_cache = TemplateCache()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2024/9/10 15:02
+# @Author  : Tom_zc
+# @FileName: token_cache.py
+# @Software: PyCharm
+import threading
+import time
+
+
+class TokenCache:
+    """the thread-safe token cache in process, and the token is refreshed once(single-flight) before it expired"""
+
+    def __init__(self, refresh_ahead=300):
+        self.refresh_ahead = refresh_ahead
+        self._tokens = dict()
+        self._locks = dict()
+        self._lock = threading.Lock()
+
+    def _get_lock(self, key):
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+
+    def _get_fresh(self, key):
+        item = self._tokens.get(key)
+        if item and item[1] - self.refresh_ahead > time.time():
+            return item[0]
+        return None
+
+    def get(self, key, refresh_func):
+        """get the token by key, refresh_func must return (token, expires_in seconds)"""
+        token = self._get_fresh(key)
+        if token:
+            return token
+        with self._get_lock(key):
+            # the other thread maybe has refreshed the token when waiting the lock
+            token = self._get_fresh(key)
+            if token:
+                return token
+            token, expires_in = refresh_func()
+            if token:
+                self._tokens[key] = (token, time.time() + expires_in)
+                return token
+            # refresh failed, and return the old token if it is not expired
+            item = self._tokens.get(key)
+            if item and item[1] > time.time():
+                return item[0]
+            return None
+
+    def invalidate(self, key):
+        self._tokens.pop(key, None)
+
+    def clear(self):
+        self._tokens.clear()